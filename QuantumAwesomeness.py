@@ -1,21 +1,44 @@
 # first, some tools we'll need from this directory
-from devices import * # info on supported devices
-from devicePrep import *
+from devices import supportedDevices, getLayout # info on supported devices
 try:
     import mwmatching as mw # perfect matching
 except:
     pass
+import resultsCatalog as catalog # index of saved results
+import resultsFiles # safe writing of results files
+import mitigation # readout error mitigation
+import distributions # outcomes of circuits as arrays
+import profiling # optional timing of each stage of the game
+import simulator # ideal outputs of saved games
 
 # other tools
-import random, numpy, math, time, copy, os
-from IPython.display import clear_output
-import networkx as nx
-import matplotlib.pyplot as plt
-from itertools import product
+# note that networkx, matplotlib and IPython are only imported when something needs to be shown to screen,
+# so that runs without a screen (such as GetData and ProcessData) don't need to wait for them
+import random, numpy, math, time, copy, os, hashlib
 import warnings
 warnings.filterwarnings('ignore')
 
 path = os.path.dirname(os.path.abspath(__file__))
+resultsPath = path+'/results' # where results are saved and loaded (can be changed to use a different folder)
+
+# used to keep track of jobs sent to real devices (see getResults), so that they can be picked up again after a crash instead of being sent again
+# * 'resume' - ID of a job whose results should be retrieved, instead of submitting a new one
+# * 'submitted' - function called with the ID of each job that is submitted
+jobs = {'resume':None, 'submitted':None}
+
+# weights are multiplied by this and rounded before matching, since mwmatching only gives exact results (and passes its own checks) for integer weights
+matchingScale = 10**9
+
+
+def clearOutput ( ):
+    
+    # Clears the output of a Jupyter notebook cell. If IPython is not available, there is no cell to clear and so nothing is done.
+
+    try:
+        from IPython.display import clear_output
+    except ImportError:
+        return
+    clear_output()
 
 
 def importSDK ( device ):
@@ -218,7 +241,7 @@ def implementGate (device, gate, qubit, script, frac = None ):
                 
 
                 
-def resultsLoad ( fileType, move, shots, sim, device ) :
+def resultsLoad ( fileType, move, shots, sim, device, folder='' ) :
     
     # Input:
     # * *fileType* - String describing type of file to load.
@@ -226,6 +249,7 @@ def resultsLoad ( fileType, move, shots, sim, device ) :
     # * *shots* - Number of shots used in the results to be loaded.
     # * *sim* - Boolean denoting whether a simulator was used for the results to be loaded.
     # * *device* - String specifying the device on which the game is played.
+    # * *folder* - Subfolder of the device folder in which the file lives ('' if none, or something like 'downsampled').
     #
     # Process:
     # * A filename is created using the details given in the input. This file, which will contain and array of arrays, is then loaded, evalulated and stored as an which will contain and array of arrays.
@@ -235,7 +259,7 @@ def resultsLoad ( fileType, move, shots, sim, device ) :
     # * *samples* - Array of arrays of whatever it was the file contained.
     
     filename = 'move='+move+'_shots=' + str(shots) + '_sim=' + str(sim) + '.txt'
-    saveFile = open(path+'/results/' + device + '/'+fileType+'_'+filename)
+    saveFile = open( os.path.join( resultsPath, device, folder, fileType+'_'+filename ) )
     sampleStrings = saveFile.readlines()
     saveFile.close()
     
@@ -262,7 +286,8 @@ def getResults ( device, sim, shots, q, c, engine, script ):
     # * This function sends the quantum program to the desired backend to be run, and obtains results.
     # 
     # Output:
-    # * *resultsRaw* - A dictionary whose keys are the bit strings obtained as results, and the values are the fraction of shots for which they occurred.
+    # * *resultsRaw* - A distribution of the results (see distributions.py), giving the fraction of shots for which each outcome occurred (or the exact probabilities, for ProjectQ).
+    #                  For ManualQISKit, this can instead be a job id (or anything else that is typed in).
     
     num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
     
@@ -283,7 +308,14 @@ def getResults ( device, sim, shots, q, c, engine, script ):
                 
                 if not sim:
                     print('Status of device:',backend.status)
-                job = execute(script, backend, shots=shots, skip_translation=True)
+                if jobs['resume'] is not None and not sim:
+                    # a job for this circuit was submitted before a crash, so get the results of that instead of submitting again
+                    job = backend.retrieve_job( jobs['resume'] )
+                    jobs['resume'] = None
+                else:
+                    job = execute(script, backend, shots=shots, skip_translation=True)
+                    if jobs['submitted'] is not None and not sim:
+                        jobs['submitted']( job.job_id() if hasattr(job,'job_id') else job.id() )
                 resultsVeryRaw = job.result().get_counts()
                 noResults = False
                 
@@ -292,11 +324,9 @@ def getResults ( device, sim, shots, q, c, engine, script ):
                 print("Job failed. We'll wait and try again")
                 time.sleep(600)
                 
-        # invert order of the bit string and turn into probs
-        resultsRaw = {}
-        for string in resultsVeryRaw.keys():
-            invertedString = string[::-1]
-            resultsRaw[ invertedString ] = resultsVeryRaw[string]/shots
+        # the last character of QISKit's bit strings is for qubit 0, so they are already the binary form of the codes
+        strings = list( resultsVeryRaw.keys() )
+        resultsRaw = distributions.fromCounts( [ int( string.replace(' ',''), 2 ) for string in strings ], [ resultsVeryRaw[string] for string in strings ], num )
             
     elif sdk=="ManualQISKit":
         # add measurement for all qubits
@@ -306,18 +336,21 @@ def getResults ( device, sim, shots, q, c, engine, script ):
         input("\nHere is a QASM representation of the circuit you need to run\n"+qasm)
         input_data = input("Whatever you enter into the box below will go into the results file.\nObviously, it is best if you put the results. But you can also put a job ID that can be replaced with the results later.\n")
         try: # if the input successfully evaluates, we treat it as data
-            resultsRaw = eval(input_data)
+            resultsRaw = distributions.fromStrings( eval(input_data), num )
         except: # otherwise we treat it as a job ID
             resultsRaw = input_data
     
     elif sdk=="ProjectQ":
         engine.flush()
-        # list of bit strings
-        strings = [''.join(x) for x in product('01', repeat=num)]
-        # get prob for each bit string to make resultsRaw
-        resultsRaw = {}
-        for string in strings:
-            resultsRaw[ string ] = engine.backend.get_probability( string, q )
+        # get the statevector, along with the position of each qubit's bit in the positions of the statevector
+        mapping, amplitudes = engine.backend.cheat()
+        probs = numpy.abs( numpy.array( amplitudes ) )**2
+        positions = numpy.arange( len(probs), dtype=numpy.int64 )
+        # find the code (with bit v for qubit v) for each position
+        codes = numpy.zeros( len(probs), dtype=numpy.int64 )
+        for v in range(num):
+            codes |= ( ( positions >> mapping[ q[v].id ] ) & 1 ) << v
+        resultsRaw = distributions.makeDistribution( codes, probs, num )
             
     elif sdk=="Forest":
         
@@ -335,20 +368,8 @@ def getResults ( device, sim, shots, q, c, engine, script ):
                 print("\nJob failed. We'll wait and try again.\n")
                 time.sleep(300)
                 
-        # convert them the correct form
-        resultsRaw = {}
-        for sample in resultsVeryRaw:
-            bitString = ""
-            disabled_so_far = 0
-            for qubit in range(num):
-                if qubit in qubits_active:
-                    bitString += str(sample[qubit-disabled_so_far])
-                else:
-                    bitString += "0" # fake result for dead qubit
-                    disabled_so_far += 1
-            if bitString not in resultsRaw.keys():
-                resultsRaw[bitString] = 0
-            resultsRaw[bitString] += 1/shots 
+        # the results for each shot are in order of the active qubits, and dead qubits are given a fake result of 0
+        resultsRaw = distributions.fromMeasurements( resultsVeryRaw, num, sorted(qubits_active) )
     
     elif sdk=="Cirq":
                               
@@ -365,75 +386,56 @@ def getResults ( device, sim, shots, q, c, engine, script ):
 
         resultsExtremelyRaw = backend.run(script, repetitions=shots)              
 
-        resultsVeryRaw = []
-        for qubit in range(num):
-            resultsVeryRaw.append( resultsExtremelyRaw.measurements[qubit][:, 0] )
-
-        resultsRaw = {}
-        for shot in range(shots):
-            bitString = ""
-            for qubit in range(num):
-                if resultsVeryRaw[qubit][shot]:
-                    bitString += '1'
-                else:
-                    bitString += '0'
-            if bitString not in resultsRaw.keys():
-                resultsRaw[bitString] = 0
-            resultsRaw[bitString] += 1/shots                     
+        # the measurements for each qubit are a column of results for all shots
+        resultsVeryRaw = numpy.column_stack( [ resultsExtremelyRaw.measurements[qubit][:, 0] for qubit in range(num) ] )
+        resultsRaw = distributions.fromMeasurements( resultsVeryRaw, num )
 
     
     return resultsRaw
 
 
-def processResults ( resultsRaw, num, pairs, sim, shots ):
+def processResults ( resultsRaw, num, pairs, sim, shots, generator=numpy.random ):
     
     # Input:
-    # * *resultsRaw* - String specifying the device on which the game is played. Details about the device will be obtained using getLayout.
+    # * *resultsRaw* - Distribution of results from getResults() (or a dictionary with bit strings as keys and probabilities as values, as in results files).
     # * *num* - The number of qubits in the device.
     # * *pairs* - A dictionary of pairs of qubits for which an entagling gate is possible. The key is a string which serves as the name of the pair. The value is a two element list with the qubit numbers of the two qubits in the pair. For controlled-NOTs, the control qubit is listed first.
     # * *sim* - Boolean denoting whether a simulator was used.
     # * *shots* - Number of shots used for statistics.
+    # * *generator* - Random number generator used to sample shots for simulated results (numpy.random, or a numpy.random.RandomState).
     # 
     # Process:
     # * This function sends the quantum program to the desired backend to be run, and obtains results.
     # 
     # Output:
     # * *oneProb* - A list with an entry for each qubit. Each entry is the fraction of samples for which the measurement of that qubit returns *1*.
-    # * *sameProb* - A dictionary with pair names as keys, and probability that the two qubits each pair give the same results as values.
+    # * *sameProb* - An array with an entry for each pair (in the order given by getPairIndex() ), giving the probability that the two qubits of the pair give the same result. See pairDict() to get this as a dictionary with pair names as keys, as used in saved files.
     # * *results* - If results are not from a simulator, this is just resultsRaw. If they are, it is assumed that the simulated effectively gave results with no statistical noise, so a sampling process is used to simulate the effect of the required number of shots.
+    #               This is a distribution (see distributions.py), which is turned into a dictionary of bit strings with distributions.toStrings() when saved.
 
     
+    index = getPairIndex( pairs )
+    
     oneProb = [0]*num
-    sameProb = {p: 0 for p in pairs}
+    sameProb = numpy.zeros( len(index['names']) )
     
-    if type(resultsRaw) is dict: # try to process only if it is a dict (and so not if a job id)
+    # results given as bit strings (such as from a results file) are made into a distribution
+    if type(resultsRaw) is dict and not distributions.isDistribution( resultsRaw ):
+        resultsRaw = distributions.fromStrings( resultsRaw, num )
     
-        strings = list(resultsRaw.keys())
+    if distributions.isDistribution( resultsRaw ): # try to process only if it is a distribution (and so not if a job id)
 
         if sim==True:
             # sample from this prob dist shots times to get results
-            results = {}
-            for string in strings:
-                results[string] = 0
-            for shot in range(shots):
-                j = numpy.random.choice( len(strings), p=list(resultsRaw.values()) )
-                results[strings[j]] += 1/shots
+            results = distributions.sample( resultsRaw, shots, generator )
         else:
             results = resultsRaw
 
         # determine the fraction of results that came out as 1 (instead of 0) for each qubit
+        oneProb = distributions.oneProbs( results ).tolist()
         
-        for bitString in strings:
-            for v in range(num):
-                if (bitString[v]=="1"):
-                    oneProb[v] += results[bitString]
-
-
-        
-        for bitString in strings:
-            for p in pairs:
-                if bitString[pairs[p][0]]==bitString[pairs[p][1]]:
-                    sameProb[p] += results[bitString]
+        # and the fraction for which the two qubits of each pair agree
+        sameProb = distributions.sameProbs( results, index['q0'], index['q1'] )
                     
     else:
         results = resultsRaw
@@ -449,7 +451,7 @@ def printM ( string, move ):
         print(string)
 
 
-def entangle( device, move, shots, sim, gates, conjugates ):
+def entangle( device, move, shots, sim, gates, conjugates, generator=numpy.random ):
     
     # Input:
     # * *device* - String specifying the device on which the game is played.
@@ -458,7 +460,9 @@ def entangle( device, move, shots, sim, gates, conjugates ):
     # * *shots* - Number of shots to be taken.
     # * *sim* - Boolean denoting whether a simulator will be used.
     # * *gates* - Entangling gates applied so far. Each round of the game corresponds to two 'slices'. *gates* is a list with a dictionary for each slice. The dictionary has pairs of qubits as keys and fractions of pi defining a corresponding entangling gate as values.
+    #             Each slice can instead be an array with the frac for each pair in the order given by getPairIndex(), and nan for pairs with no gate.
     # * *conjugates* - List of single qubit gates to conjugate entangling gates of previous rounds. Each is specified by a two element list. First is a string specifying the rotation axis ('X' or 'Y'), and the second specifies the fraction of pi for the rotation.
+    # * *generator* - Random number generator used to sample shots for simulated results (see processResults() ).
     #
     # Process:
     # * Quantum circuit is created and run given the details (device, gates, etc) provided by the input. The results are then processed to give the final output.
@@ -474,6 +478,10 @@ def entangle( device, move, shots, sim, gates, conjugates ):
     # gates has two entries for each round, except for the current round which has only one
     rounds = int( (len(gates)+1)/2 )
     
+    # the gates of each slice as arrays, with nan for pairs that have no gate (see pairArray)
+    index = getPairIndex( pairs )
+    slices = [ pairArray( gates[s], pairs, default=math.nan ) for s in range(len(gates)) ]
+    
     # loop over past rounds and apply the required gates
     for r in range(rounds-1):
 
@@ -482,24 +490,16 @@ def entangle( device, move, shots, sim, gates, conjugates ):
             implementGate ( device, conjugates[r][n][0], q[n], script, frac=-conjugates[r][n][1] )
 
         # get the sets of gates that create and (attempt to) remove the puzzle for this round
-        gates_create = gates[2*r]
-        gates_remove = gates[2*r+1]
+        gates_create = slices[2*r]
+        gates_remove = slices[2*r+1]
         
-        # determine which pairs are for both, and which are unique
-        pairs_both = list( set(gates_create.keys()) & set(gates_remove.keys()) )
-        pairs_create = list( set(gates_create.keys()) - set(gates_remove.keys()) )
-        pairs_remove = list( set(gates_remove.keys()) - set(gates_create.keys()) )
+        # pairs that are in both are combined into a single gate
+        used = ~numpy.isnan(gates_create) | ~numpy.isnan(gates_remove)
+        fracs = numpy.where( numpy.isnan(gates_create), 0, gates_create ) + numpy.where( numpy.isnan(gates_remove), 0, gates_remove )
               
         # then do the exp[ i XX * frac ] gates accordingly
-        for p in pairs_both:
-            #print([r,p,gates_create[p]+gates_remove[p]] )
-            implementGate ( device, "XX", [ q[pairs[p][0]], q[pairs[p][1]] ], script, frac=(gates_create[p]+gates_remove[p]) )
-        for p in pairs_create:
-            #print([r,p,gates_create[p]] )
-            implementGate ( device, "XX", [ q[pairs[p][0]], q[pairs[p][1]] ], script, frac=(gates_create[p]) )
-        for p in pairs_remove:
-            #print([r,p,gates_remove[p]] )
-            implementGate ( device, "XX", [ q[pairs[p][0]], q[pairs[p][1]] ], script, frac=(gates_remove[p]) )
+        for k in numpy.nonzero( used )[0]:
+            implementGate ( device, "XX", [ q[ int(index['q0'][k]) ], q[ int(index['q1'][k]) ] ], script, frac=float( fracs[k] ) )
             
         # do the second part of conjugation
         for n in range(num):
@@ -507,19 +507,100 @@ def entangle( device, move, shots, sim, gates, conjugates ):
     
     # then the same for the current round (only needs the exp[ i XX * (frac - frac_inverse) ] )
     r = rounds-1
-    for p in gates[2*r].keys():
-        implementGate ( device, "XX", [ q[ pairs[p][0] ], q[ pairs[p][1] ] ], script, frac=gates[2*r][p] )
+    for k in numpy.nonzero( ~numpy.isnan( slices[2*r] ) )[0]:
+        implementGate ( device, "XX", [ q[ int(index['q0'][k]) ], q[ int(index['q1'][k]) ] ], script, frac=float( slices[2*r][k] ) )
     
     
     resultsRaw = getResults( device, sim, shots, q, c, engine, script )
     
-    oneProb, sameProb, results = processResults ( resultsRaw, num, pairs, sim, shots )
+    oneProb, sameProb, results = processResults ( resultsRaw, num, pairs, sim, shots, generator=generator )
 
     implementGate ( device, "finish", q, script )
     
     return oneProb, sameProb, results
 
 
+def runCalibration ( device, shots, sim ):
+    
+    # Input:
+    # * *device* - String specifying the device on which the game is played.
+    #              Details about the device will be obtained using getLayout.
+    # * *shots* - Number of shots to be taken.
+    # * *sim* - Boolean denoting whether a simulator will be used.
+    #
+    # Process:
+    # * Two circuits are run: one with nothing done to the qubits, and one with an X gate on every qubit. These show how often each qubit is read out wrongly when it should be 0 or 1.
+    #
+    # Output:
+    # * *calibration* - Two element list with the oneProb for each circuit (see processResults() for explanation of this).
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    
+    calibration = []
+    for bit in [0,1]:
+        
+        q, c, engine, script = initializeQuantumProgram(device,sim)
+        
+        if bit==1:
+            for n in range(num):
+                implementGate ( device, "X", q[n], script, frac=1 )
+        
+        resultsRaw = getResults( device, sim, shots, q, c, engine, script )
+        
+        oneProb, sameProb, results = processResults ( resultsRaw, num, pairs, sim, shots )
+        
+        implementGate ( device, "finish", q, script )
+        
+        calibration.append( oneProb )
+    
+    return calibration
+
+
+def getMitigatedProbs ( calibration, oneProbs, sameProbs, pairs ):
+    
+    # Input:
+    # * *calibration* - Output of runCalibration().
+    # * *oneProbs* - Array of oneProb arrays (see processResults() for explanation of these), with an element for each round of the game.
+    # * *sameProbs* - Array of sameProb arrays (see processResults() for explanation of these), with an element for each round of the game.
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    #
+    # Process:
+    # * The inverse of the confusion matrix for each qubit is found from the calibration, and applied to the oneProb and sameProb values of all rounds (see mitigation.py).
+    #
+    # Output:
+    # * *oneProbs*, *sameProbs* - The same as the input, but with readout errors mitigated.
+    
+    index = getPairIndex( pairs )
+    
+    inverses = mitigation.inverseMatrices( mitigation.confusionMatrices( calibration[0], calibration[1] ) )
+    
+    rawOneProbs = numpy.array( oneProbs, dtype=float )
+    rawSameProbs = numpy.array( [ pairArray( sameProb, pairs ) for sameProb in sameProbs ], dtype=float ).reshape( len(sameProbs), len(index['names']) )
+    
+    mitigatedOneProbs = mitigation.mitigateOneProbs( rawOneProbs, inverses ).tolist()
+    mitigatedSameProbs = mitigation.mitigateSameProbs( rawOneProbs, rawSameProbs, inverses, index['q0'], index['q1'] ).tolist()
+    
+    return mitigatedOneProbs, [ dict( zip( index['names'], sameProb ) ) for sameProb in mitigatedSameProbs ]
+
+
+def getMitigatedResults ( calibration, resultsDicts ):
+    
+    # Input:
+    # * *calibration* - Output of runCalibration().
+    # * *resultsDicts* - List of the results of each round of the game (see processResults() ).
+    #
+    # Process:
+    # * The inverse of the confusion matrix for each qubit is found from the calibration, and applied to the full distribution of results for each round (see mitigation.mitigateDistribution() ).
+    #   Results that are not distributions (such as job ids) are given as they are.
+    #
+    # Output:
+    # * *resultsDicts* - The same as the input, but with readout errors mitigated.
+    
+    inverses = mitigation.inverseMatrices( mitigation.confusionMatrices( calibration[0], calibration[1] ) )
+    
+    return [ mitigation.mitigateDistribution( results, inverses ) if distributions.isDistribution( results ) else results for results in resultsDicts ]
+
+
 def calculateEntanglement( oneProb ):
     
     # Input:
@@ -617,35 +698,18 @@ def calculateMutual ( oneProb, sameProb, pairs ):
     
     # Input:
     # * *oneProb* - A list with an entry for each qubit. Each entry is the fraction of samples for which the measurement of that qubit returns *1*.
-    # * *sameProb* - A dictionary with pair names as keys, and probability that the two qubits each pair give the same results as values.
+    # * *sameProb* - An array with the probability that the two qubits of each pair give the same result (see processResults() ), or a dictionary with pair names as keys and these probabilities as values.
     # * *pairs* - A dictionary of pairs of qubits for which an entagling gate is possible. The key is a string which serves as the name of the pair. The value is a two element list with the qubit numbers of the two qubits in the pair. For controlled-NOTs, the control qubit is listed first.
     #
     # Process:
     # * For each pair, the (classical) mutual information for the measurement results of the two qubits is calculated. This is done using oneProbs and sameProbs, which is a bit of a pain. But this information is sufficient to calculate the probability for the results '00', '01', '10' and '11' for the two qubits of each pair, which the probability distrubution required to calculate the mutual information.
+    # * The calculation is done by calculateMutualArray().
     # 
     # Output:
-    # * *I* - Dictionary with pair names as keys and corresponding values of the mutual information as values.
+    # * *I* - Array with the mutual information for each pair, in the order given by getPairIndex() (see pairDict() to get this as a dictionary).
     
-    I = {}
-    
-    for p in sameProb.keys():
-        
-        p0 = oneProb[pairs[p][0]]
-        p1 = oneProb[pairs[p][1]]
-        
-        expect = calculateExpect( [ p0, p1, 1-sameProb[p] ] )
-            
-        prob = [0]*4
-        prob[0] = ( 1 + expect[0] + expect[1] + expect[2] )/4
-        prob[1] = ( 1 - expect[0] + expect[1] - expect[2] )/4
-        prob[2] = ( 1 + expect[0] - expect[1] - expect[2] )/4
-        prob[3] = ( 1 - expect[0] - expect[1] + expect[2] )/4
-                                          
-        I[p] = calculateEntropy( [ 1-p0, p0 ] ) + calculateEntropy( [ 1-p1, p1 ] ) - calculateEntropy( prob )
-        if I[p]>1e-3:
-            I[p] = I[p] / min( calculateEntropy( [ 1-p0, p0 ] ) , calculateEntropy( [ 1-p1, p1 ] ) )
-        
-    return I
+    return calculateMutualArray( numpy.array( oneProb, dtype=float ), pairArray( sameProb, pairs ), pairs )
+
 
 def printPuzzle ( device, oneProb, move, ascii=False ):
     
@@ -717,6 +781,9 @@ def printPuzzle ( device, oneProb, move, ascii=False ):
         
         else:
         
+            import networkx as nx
+            from matplotlib import pyplot as plt
+
             # create a graph with qubits as vertices and possible entangling gates as edges
 
             G=nx.Graph()
@@ -788,40 +855,319 @@ def getDisjointPairs ( pairs, oneProb, weight ):
     # Input:
     # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
     # * *oneProb* - A list with an entry for each qubit. Each entry is the fraction of samples for which the measurement of that qubit returns 1.
-    # * *weight* - dictionary with pair names as keys and a weight assigned to each pair as the corresponding values.
+    # * *weight* - dictionary with pair names as keys and a weight assigned to each pair as the corresponding values (or an array of weights in the order given by getPairIndex() ).
     # 
     # Process:
     # * A minimum weight perfect matching of the qubits is performed, using the possible pairing and weights provided. If weights are not given, but oneProbs are, the weights are calculated from the oneProbs. If oneProbs aren't given either, the weights are chosen randomly to generate a random pairing.
+    # * This is done by getMatching(), which gives the positions of the pairs rather than their names.
     # 
     # Output:
     # * *matchingPairs* - A list of the names of a random set of disjoint pairs included in the matching.
 
-    if not weight:
-        for p in pairs.keys():
-            if oneProb:
-                weight[p] = -calculateFracDifference( calculateFrac( oneProb[ pairs[p][0] ] ) , calculateFrac( oneProb[ pairs[p][1] ] ) )
-            else:
-                weight[p] = random.randint(0,100)
+    names = getPairIndex( pairs )['names']
+
+    return [ names[k] for k in getMatching( pairs, oneProb, weight ) ]
+
+
+def getMatching ( pairs, oneProb, weights ):
+
+    # Input:
+    # * *pairs*, *oneProb* - See getDisjointPairs().
+    # * *weights* - Array of weights for each pair in the order given by getPairIndex() (or a dictionary with pair names as keys). If empty, they are found as described in getDisjointPairs().
+    # 
+    # Process:
+    # * See getDisjointPairs().
+    # 
+    # Output:
+    # * *matching* - Array of the positions (in the order given by getPairIndex() ) of the pairs included in the matching, not including fakes.
+
+    index = getPairIndex( pairs )
+
+    if len(weights)==0:
+        if len(oneProb)>0:
+            # the weight for each pair is minus the difference between the fracs of its qubits (see calculateFracDifference)
+            qubitFracs = numpy.array( [ calculateFrac( value ) for value in oneProb ], dtype=float )
+            delta = numpy.abs( qubitFracs[index['q0']] - qubitFracs[index['q1']] )
+            weights = -numpy.minimum( delta, 1-delta )
+        else:
+            weights = [ random.randint(0,100) for p in index['names'] ]
+    weights = numpy.round( pairArray( weights, pairs )*matchingScale ).astype(numpy.int64).tolist()
 
-    edges = []
-    for p in pairs.keys():
-        edges.append( ( pairs[p][0], pairs[p][1], weight[p] ) )
+    edges = list( zip( index['q0'].tolist(), index['q1'].tolist(), weights ) )
     
     # match[j] = k means that edge j and k are matched
     match = mw.maxWeightMatching(edges, maxcardinality=True)
     
-    # get a list of the pair names for each pair in the matching (not including fakes)
-    matchingPairs = []
+    # get the position of each pair in the matching (not including fakes)
+    matching = []
     for v in range(len(match)):
-        for p in pairs.keys():
-            if pairs[p]==[v,match[v]] and p[0:4]!='fake' :
-                matchingPairs.append(p)
+        k = index['edges'].get( (v,match[v]) )
+        if k is not None and not index['fake'][k]:
+            matching.append( k )
+    
+    return numpy.array( matching, dtype=int )
+
+
+def correctBot ( pairs, oneProb, sameProb, matching, generator ):
+    
+    # Input:
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    # * *oneProb*, *sameProb* - The puzzle for the round (see processResults() ).
+    # * *matching* - Positions of the pairs that were actually used to make the puzzle (in the order of getPairIndex() ).
+    # * *generator* - Random number generator, for bots that make random choices (the random module, or a random.Random).
+    #
+    # Process:
+    # * This is the form of all bots (see registerBot() ). This one cheats, and gives the pairs that were actually used.
+    #
+    # Output:
+    # * *guessed* - List of the positions of the guessed pairs.
+    
+    return list( matching )
+
+
+def randomBot ( pairs, oneProb, sameProb, matching, generator ):
+    
+    # A bot (see correctBot() ) that guesses a random set of pairs.
+    
+    return list( randomMatching( pairs, generator ) )
+
+
+def mwpmBot ( pairs, oneProb, sameProb, matching, generator ):
+    
+    # A bot (see correctBot() ) that uses MWPM with weights given by the differences between the fracs of the qubits of each pair (see getMatching() ).
+    
+    return list( getMatching( pairs, oneProb, [] ) )
+
+
+def mutualBot ( pairs, oneProb, sameProb, matching, generator ):
+    
+    # A bot (see correctBot() ) that uses MWPM with the mutual information of each pair as weights (see calculateMutual() ).
+    
+    return list( getMatching( pairs, [], calculateMutual( oneProb, sameProb, pairs ) ) )
+
+
+# the bots that can guess pairs, with the move that uses them as keys (see registerBot)
+bots = {}
+
+
+def registerBot ( move, bot, cache=True ):
+    
+    # Input:
+    # * *move* - String used as the move for games played with the bot (and to refer to it elsewhere, such as in RunTournament() ).
+    # * *bot* - Function that takes ( pairs, oneProb, sameProb, matching, generator ) and returns a list of the positions of the pairs it guesses (see correctBot() ).
+    #           For the bot to be used by many processes at once (such as by RunTournament() with *workers>1*), it must be defined at the top level of a module.
+    # * *cache* - Boolean determining whether the guesses of the bot are cached by RunTournament(). This should only be used for bots that always give the same guesses for the same puzzle.
+    #
+    # Process:
+    # * The bot is added to *bots*, so that runGame() (and everything else) can use it as a move.
+    
+    bots[move] = {'bot':bot, 'cache':cache}
+
+
+registerBot( 'C', correctBot, cache=False )
+registerBot( 'R', randomBot, cache=False )
+registerBot( 'B', mwpmBot )
+registerBot( 'I', mutualBot )
+
+
+def guessPairs ( move, pairs, oneProb, sameProb, matching, generator=random ):
+    
+    # Input:
+    # * *move* - String describing the way the pairs are chosen (one of the keys of *bots*, see registerBot() ).
+    # * *pairs*, *oneProb*, *sameProb*, *matching*, *generator* - See correctBot().
+    #
+    # Output:
+    # * *guessed* - List of the positions of the pairs guessed by the bot for the given move.
+    
+    if move not in bots:
+        raise ValueError( "There is no bot for move=" + move )
+    
+    return bots[move]['bot']( pairs, oneProb, sameProb, matching, generator )
+
+
+def guessGates ( move, guessed, pairs, oneProb, puzzle, sim, shots ):
+    
+    # Input:
+    # * *move*, *pairs*, *oneProb* - See guessPairs().
+    # * *guessed* - Positions of the guessed pairs.
+    # * *puzzle* - Array with the frac of the gate used to make the puzzle for each pair (nan for pairs with no gate).
+    # * *sim* - Boolean denoting whether a simulator was used.
+    # * *shots* - Number of shots used.
+    #
+    # Process:
+    # * The frac for each guessed pair is deduced from the oneProbs of its qubits (see calculateFrac() ). For move='C' on a real device, the correct frac is used instead (with a small error of the size expected from the number of shots).
+    #
+    # Output:
+    # * *guessedGates* - Array with the frac of the gate that the player applies for each pair (the opposite of the guessed frac, so that the puzzle is undone), and nan for pairs not guessed.
+    
+    index = getPairIndex( pairs )
+    
+    guessedGates = numpy.full( len(index['names']), math.nan )
+
+    for k in guessed:
+        
+        if (move=="C" and sim==False):
+            
+            guessedFrac = puzzle[k] + 0.1/math.sqrt(shots)
+        
+        else:
+
+            guessedOneProb = oneProb[ index['q0'][k] ] / 2 + oneProb[ index['q1'][k] ] / 2
+                
+            guessedFrac = calculateFrac( guessedOneProb )
+
+        # since the player wishes to apply the inverse gate, the opposite frac is stored
+        guessedGates[k] = -guessedFrac
+    
+    return guessedGates
+
+
+def randomPairs ( pairs, generator=random ):
+    
+    # Input:
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    # * *generator* - Random number generator used to choose the pairs (the random module, or a random.Random).
+    #
+    # Output:
+    # * *matchingPairs* - A list of the names of a random set of disjoint pairs (see getDisjointPairs() ).
+    
+    names = getPairIndex( pairs )['names']
+    
+    return [ names[k] for k in randomMatching( pairs, generator ) ]
+
+
+def randomMatching ( pairs, generator=random ):
+    
+    # As randomPairs(), but giving the positions of the pairs in the order of getPairIndex() (see getMatching() ).
+    
+    return getMatching( pairs, [], [ generator.randint(0,100) for p in pairs.keys() ] )
+
+
+def randomConjugates ( num, generator=None ):
+    
+    # Input:
+    # * *num* - The number of qubits in the device.
+    # * *generator* - A numpy.random.RandomState used to choose the conjugates. If not given, the global random number generators are used.
+    #
+    # Output:
+    # * *newconjugates* - List with a randomly chosen X or Y rotation for each qubit (see runGame() ).
+    
+    newconjugates = []
+    if generator is None:
+        for n in range(num):
+            newconjugates.append( [ str( numpy.random.choice(['X','Y']) ) , random.random() ] )
+    else:
+        axes = generator.randint( 2, size=num )
+        fracs = generator.random_sample( num )
+        for n in range(num):
+            newconjugates.append( [ 'XY'[axes[n]], float(fracs[n]) ] )
+    
+    return newconjugates
+
+
+def getGameSeed ( seed, device, move, shots, sim, sample, shard=None ):
+    
+    # Input:
+    # * *seed* - Seed for a whole run of games.
+    # * *device*, *move*, *shots*, *sim* - Details of the run.
+    # * *sample* - Number of the game within the run.
+    # * *shard* - Name of the shard to which the game is saved, if any (see GetData() ).
+    #
+    # Output:
+    # * *gameSeed* - Seed for the game, which is different for every game of every run (and every shard).
+    
+    string = str( [ seed, device, move, int(shots), bool(sim), sample ] + [shard]*(shard is not None) )
+    
+    return int( hashlib.md5( string.encode('utf-8') ).hexdigest()[0:8], 16 )
+
+
+def getGameGenerators ( gameSeed=None ):
+    
+    # Input:
+    # * *gameSeed* - Seed for the game, or None to use the global random number generators.
+    #
+    # Process:
+    # * A separate random number generator is made for each random part of the game, so that each can be regenerated without the others.
+    #   In particular, the pairs and fracs of the puzzles and the conjugates do not depend on the moves of the player or the results.
+    #
+    # Output:
+    # * *generators* - Dictionary with the generators for:
+    #     - 'pairs': the pairs used to make each puzzle (random.Random)
+    #     - 'fracs': the fracs for the gates of each puzzle (random.Random)
+    #     - 'guesses': the random pairs guessed for move='R' (random.Random)
+    #     - 'conjugates': the conjugates for each round (numpy.random.RandomState, or None for the global generators)
+    #     - 'shots': the sampling of shots for simulated results (numpy.random.RandomState)
+    
+    if gameSeed is None:
+        return { 'pairs':random, 'fracs':random, 'guesses':random, 'conjugates':None, 'shots':numpy.random }
+    
+    generators = {}
+    for stream in ['pairs','fracs','guesses','conjugates','shots']:
+        streamSeed = int( hashlib.md5( ( str(gameSeed) + stream ).encode('utf-8') ).hexdigest()[0:8], 16 )
+        if stream in ['pairs','fracs','guesses']:
+            generators[stream] = random.Random( streamSeed )
+        else:
+            generators[stream] = numpy.random.RandomState( streamSeed )
+    
+    return generators
+
+
+def regenerateConjugates ( gameSeed, num, rounds ):
     
+    # Returns the conjugates used by runGame() in a game with the given seed, for the given number of rounds.
     
-    return matchingPairs
+    generator = getGameGenerators( gameSeed )['conjugates']
+    
+    return [ randomConjugates( num, generator ) for _ in range(rounds) ]
+
+
+def regeneratePuzzles ( gameSeed, pairs, rounds ):
+    
+    # Returns the gates used to create the puzzle in each round (the even slices of *gates*, see runGame() ) in a game with the given seed, for the given number of rounds.
+    
+    generators = getGameGenerators( gameSeed )
+    
+    puzzles = []
+    for _ in range(rounds):
+        appliedGates = {}
+        for p in randomPairs( pairs, generators['pairs'] ):
+            appliedGates[p] = ( 0.1+0.9*generators['fracs'].random() ) / 2
+        puzzles.append( appliedGates )
+    
+    return puzzles
+
+
+def getGeneratorStates ( generators ):
+    
+    # Returns the states of the random number generators made by getGameGenerators(), as a dictionary that can be saved with str() and loaded with eval().
+    
+    states = {}
+    for stream, generator in generators.items():
+        if generator is None:
+            states[stream] = None
+        elif generator is numpy.random or type(generator) is numpy.random.RandomState:
+            state = generator.get_state()
+            states[stream] = ( state[0], state[1].tolist() ) + tuple( state[2:] )
+        else:
+            states[stream] = generator.getstate()
+    
+    return states
+
+
+def setGeneratorStates ( generators, states ):
+    
+    # Puts the random number generators made by getGameGenerators() back into the states given by getGeneratorStates().
+    
+    for stream, generator in generators.items():
+        if generator is not None:
+            if generator is numpy.random or type(generator) is numpy.random.RandomState:
+                state = states[stream]
+                generator.set_state( ( state[0], numpy.array( state[1], dtype=numpy.uint32 ) ) + tuple( state[2:] ) )
+            else:
+                generator.setstate( states[stream] )
 
 
-def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=False, game=None, ascii=False):
+def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=False, game=None, ascii=False, seed=None, state=None, checkpoint=None, folder='' ):
         
     # Input:
     # * *device* - String specifying the device on which the game is played.
@@ -834,6 +1180,11 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
     # * *cleanup* - Boolean determining whether error mitigation post-processing is used
     # * *game* - Integer identifiying a specific game to play from a file (can only be True if dataNeeded=True)
     # * *ascii* - Boolean to convey whether the image presented to the player should be purely ascii.
+    # * *seed* - Seed for the game (see getGameGenerators() ). If not given, the global random number generators are used.
+    # * *state* - If given, the game continues from this state (as given to *checkpoint* ) instead of starting from the beginning (can only be used if dataNeeded=True).
+    # * *checkpoint* - If given, this function is called at the start of each round with the state of the game: a dictionary with *gates*, *conjugates*, *oneProbs*, *sameProbs* and *resultsDicts* as they are at that point,
+    #                  as well as the states of the random number generators ('generators'). If this is given back as *state*, the game can be continued from the start of that round.
+    # * *folder* - Subfolder of the device folder from which old data is loaded when dataNeeded=False (such as 'synthetic' for games made by SyntheticData() ).
 
     #
     # Process:
@@ -844,10 +1195,16 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
     # * *conjugates* - List of single qubit gates to conjugate entangling gates of previous rounds. Each is specified by a two element list. First is a string specifying the rotation axis ('X' or 'Y'), and the second specifies the fraction of pi for the rotation.
     # * *oneProbs*: Array of oneProb arrays (see processResults() for explanation of these), with an element for each round of the game.
     # * *sameProbs*: Array of sameProb arrays (see processResults() for explanation of these), with an element for each round of the game.
-    # * *resultsDicts*: Array of results arrays (see processResults() for explanation of these), with an element for each round of the game.
+    # * *resultsDicts*: Array of results (see processResults() for explanation of these), with an element for each round of the game. These are distributions (see distributions.py), or job ids.
     
     num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
     
+    # within the game, the gates of each slice and the sameProbs are arrays with an entry for each pair (see pairArray)
+    # they are turned into dictionaries with pair names as keys only for checkpoints and the output
+    index = getPairIndex( pairs )
+    
+    generators = getGameGenerators( seed )
+    
     gates = []
     conjugates = []
     oneProbs = []
@@ -857,9 +1214,9 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
     # if we are running off data, load up oneProbs for a move='C' run and see what the right answers are
     if dataNeeded==False:
         
-        oneProbSamples = resultsLoad ( 'oneProbs', 'C', shots, sim, device )
-        sameProbSamples = resultsLoad ( 'sameProbs', 'C', shots, sim, device )
-        gateSamples = resultsLoad ( 'gates', 'C', shots, sim, device )
+        oneProbSamples = resultsLoad ( 'oneProbs', 'C', shots, sim, device, folder=folder )
+        sameProbSamples = resultsLoad ( 'sameProbs', 'C', shots, sim, device, folder=folder )
+        gateSamples = resultsLoad ( 'gates', 'C', shots, sim, device, folder=folder )
         
         if maxScore is None: # if a maxScore is not given, use the value from the first sample
             maxScore = len( oneProbSamples[ 0 ] )
@@ -876,17 +1233,33 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
             game = random.randint( 0, samples-1 )
         # get the data for this game
         oneProbs = oneProbSamples[ game ]
-        sameProbs = sameProbSamples[ game ] 
+        sameProbs = [ pairArray( sameProb, pairs ) for sameProb in sameProbSamples[ game ] ]
         originalOneProbs = copy.deepcopy( oneProbs )
-        gates = gateSamples[ game ]      
+        gates = [ pairArray( gate, pairs, default=math.nan ) for gate in gateSamples[ game ] ]
             
     
     gameOn = True
     restart = False
     score = 0
+    
+    # pick up from a saved state if one is given
+    if state is not None:
+        gates = [ pairArray( gate, pairs, default=math.nan ) for gate in state['gates'] ]
+        conjugates = copy.deepcopy( state['conjugates'] )
+        oneProbs = copy.deepcopy( state['oneProbs'] )
+        sameProbs = [ pairArray( sameProb, pairs ) for sameProb in state['sameProbs'] ]
+        resultsDicts = [ distributions.fromStrings( results, num ) if type(results) is dict and not distributions.isDistribution( results ) else results for results in state['resultsDicts'] ]
+        setGeneratorStates( generators, state['generators'] )
+        score = len(oneProbs)
+    
     while gameOn:
         
+        if checkpoint is not None and dataNeeded:
+            checkpoint( { 'gates':[ pairDict( gate, pairs ) for gate in gates ], 'conjugates':conjugates, 'oneProbs':oneProbs,
+                          'sameProbs':[ pairDict( sameProb, pairs ) for sameProb in sameProbs ], 'resultsDicts':resultsDicts, 'generators':getGeneratorStates( generators ) } )
+        
         score += 1
+        profiling.newRound( score )
         
         # Step 1: get a new puzzle
         
@@ -900,27 +1273,24 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
             # CNOT | (j,k)
             # and so are specified by a pair p=[j,k] and a random fraction frac
   
-            # first we generate a random set of edges
-            matchingPairs = getDisjointPairs( pairs, [], {} )
+            # first we generate a random set of edges (as positions in the order of getPairIndex)
+            matching = randomMatching( pairs, generators['pairs'] )
           
             # then we add gates these to the list of gates
-            appliedGates = {}
-            for p in matchingPairs:
-                frac = ( 0.1+0.9*random.random() ) / 2 # this will correspond to a e^(i theta \sigma_x) rotation with pi/20 \leq frac * pi/2 \leq pi/4
-                appliedGates[p] = frac
+            appliedGates = numpy.full( len(index['names']), math.nan )
+            for k in matching:
+                frac = ( 0.1+0.9*generators['fracs'].random() ) / 2 # this will correspond to a e^(i theta \sigma_x) rotation with pi/20 \leq frac * pi/2 \leq pi/4
+                appliedGates[k] = frac
             gates.append(appliedGates)
           
             # all gates so far are then run
-            oneProb, sameProb, results = entangle( device, move, shots, sim, gates, conjugates)
+            oneProb, sameProb, results = entangle( device, move, shots, sim, gates, conjugates, generator=generators['shots'] )
           
         else:
             
             oneProb = oneProbs[score-1]
             sameProb = sameProbs[score-1]
-            matchingPairs = list(gates[ 2*(score-1) ].keys())
-            
-            I = calculateMutual ( oneProb, sameProb, pairs )
-            correlatedPairs = getDisjointPairs( pairs, [], I )
+            matching = numpy.nonzero( ~numpy.isnan( gates[ 2*(score-1) ] ) )[0]
             
             rawOneProb = copy.deepcopy( oneProb )
             if cleanup:
@@ -933,17 +1303,12 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
         
         displayedOneProb = copy.copy( oneProb )
         
-        guessedPairs = []
-
-        # if choices are all correct, we just give the player the right answer
-        if (move=="C"):
-            guessedPairs = matchingPairs
-        # if choices are random, we generate a set of random pairs
-        if (move=="R"):
-            guessedPairs = getDisjointPairs( pairs, [], {} )
-        # if choices are via MWPM, we do this
-        if (move=="B"):
-            guessedPairs = getDisjointPairs( pairs, oneProb, {} )
+        # the guesses are positions of pairs in the order of getPairIndex()
+        guessed = []
+
+        # if choices are made by a bot, see guessPairs()
+        if move in bots:
+            guessed = guessPairs( move, pairs, oneProb, sameProb, matching, generators['guesses'] )
         # if choices are manual, let's get choosing
         if (move=="M"):
             
@@ -952,7 +1317,7 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
             restart = False
             while (unpaired>1):  
                 
-                clear_output()
+                clearOutput()
                 print("")
                 print("Round "+str(score))
                 if cleanup:
@@ -965,9 +1330,9 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
                 if num<=26 : # if there are few enough qubits, we don't need to be case sensitive
                     pairGuess = str.upper(pairGuess)
 
-                if (pairGuess in pairs.keys()) and (pairGuess not in guessedPairs) :
+                if (pairGuess in pairs.keys()) and (index['position'][pairGuess] not in guessed) :
 
-                    guessedPairs.append(pairGuess)
+                    guessed.append( index['position'][pairGuess] )
 
                     # set them both to grey on screen (set the corresponding oneProb value to >1)
                     for j in [0,1]:
@@ -991,44 +1356,23 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
         # store the oneProb and sameProb
         oneProbs.append( oneProb )
         sameProbs.append( sameProb )
-        # store the raw data (if it is not too big
-        if len(str(results)) < 10000:
-            resultsDicts.append( results )
+        # store the raw data (how much of it is saved to file is decided when it is saved, see resultsFiles.storeResults)
+        resultsDicts.append( results )
         
         # see whether the game over condition is satisfied
         gameOn = (score<maxScore) and restart==False
         
         # given the chosen pairs, the gates are now deduced from oneProb
-        guessedGates = {}
-
-        for p in guessedPairs:
-            
-            if (move=="C" and sim==False):
-                
-                guessedFrac = gates[ 2*(score-1) ][p] + 0.1/math.sqrt(shots)
-            
-            else:
-
-                guessedOneProb = 0
-                for j in range(2):
-                    guessedOneProb += oneProb[ pairs[p][j] ] / 2
-                    
-                guessedFrac = calculateFrac( guessedOneProb )
-
-            # since the player wishes to apply the inverse gate, the opposite frac is stored
-            guessedGates[p] = -guessedFrac
+        guessedGates = guessGates( move, guessed, pairs, oneProb, gates[ 2*(score-1) ], sim, shots )
 
         # now we can add to the list of all gates
         gates.append(guessedGates)
         
         # finally randomly generate X or Z rotation for each active qubit to conjugate this round with
-        newconjugates = []
-        for n in range(num):
-            newconjugates.append( [ numpy.random.choice(['X','Y']) , random.random() ] )
-        conjugates.append(newconjugates)
+        conjugates.append( randomConjugates( num, generators['conjugates'] ) )
              
         if move=='M':
-            clear_output()
+            clearOutput()
         
         if cleanup==True:
             printM("\nRaw puzzle",move)    
@@ -1041,13 +1385,13 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
         printM("Round "+str(score)+" complete", move)
         printM("", move)
         printM("Pairs you guessed for this round", move)
-        printM(sorted(guessedPairs), move)
+        printM(sorted( [ index['names'][k] for k in guessed ] ), move)
         printM("Pairs our bot would have guessed", move)
         printM(sorted(getDisjointPairs( pairs, oneProb, {} )), move )
         printM("Correct pairs for this round", move)
-        printM(sorted(matchingPairs), move)
-        correctGuesses = list( set(guessedPairs).intersection( set(matchingPairs) ) )
-        printM("\nYou guessed "+str(len(correctGuesses))+" out of "+str(len(matchingPairs))+" pairs correctly!", move)
+        printM(sorted( [ index['names'][k] for k in matching ] ), move)
+        correctGuesses = list( set(guessed).intersection( set(matching) ) )
+        printM("\nYou guessed "+str(len(correctGuesses))+" out of "+str(len(matching))+" pairs correctly!", move)
         printM("", move)
         printM("", move)
         if move=="M" and restart==False:
@@ -1056,50 +1400,201 @@ def runGame ( device, move, shots, sim, maxScore=None, dataNeeded=True, cleanup=
     if move=="M" and restart==False:
         input("> There is no more data on this game :( Press Enter to restart...\n")
     
-    return gates, conjugates, oneProbs, sameProbs, resultsDicts
+    return [ pairDict( gate, pairs ) for gate in gates ], conjugates, oneProbs, [ pairDict( sameProb, pairs ) for sameProb in sameProbs ], resultsDicts
 
 
-def MakeGraph(X,Y,y,axisLabel,labels=[],verbose=False,log=False,tall=False):
+def forkGame ( device, shots, maxScore, strategies, trunk, generators ):
     
     # Input:
-    # * *X* - array of x axis values
-    # * *Y* - array of arrays of y axis values for multiple series
-    # * *y* - array of arrays of error bar widths for the y axis values for multiple series
-    # * *axisLabel* - list of two strings: labels for the x and z axis
-    # * *labels* - list of strings, giving the names for each series
-    # * *verbose* - when True, the arrays X, Y and y will be printed to screen
-    # * *log* - When true, the plot will be a log plot (on the y axis)
-    # * *tall* - if true, the plot will be a square to spread out the y axis values a bit more
-    # 
+    # * *device* - String specifying the device on which the game is played (with no more than simulator.maxQubits qubits).
+    # * *shots* - Number of shots sampled for each puzzle.
+    # * *maxScore* - Number of rounds in the game.
+    # * *strategies* - List of moves whose guesses are compared (see guessPairs() ).
+    # * *trunk* - The move (which must be in *strategies*) used to carry on the game after each round.
+    # * *generators* - Random number generators for the game (see getGameGenerators() ).
+    #
     # Process:
-    # * Set up the required call to matplotlib and make the graph
-    # 
+    # * The game is played with simulator.py, which keeps the state at the start of each round (the prefix of the circuit) rather than running every circuit from the start.
+    # * At every round, each strategy makes its guess for the same puzzle. The game is then forked: the guesses of all strategies are applied to copies of the prefix state (all in one batch),
+    #   followed by the same conjugates and the same puzzle for the next round. So comparing k strategies costs k rounds of gates per round, rather than k separate games.
+    # * The puzzle for the next round shows how well each guess undid the last puzzle, and its quality is found (see calculateQualityArrays() ). The game then carries on from the branch of *trunk*.
+    # * The puzzles and conjugates come from the same random number streams as in runGame(), so a seeded game has the same ones as runGame() with that seed.
+    #
     # Output:
-    # * Nothing is returned, but the required graph is output to screen
+    # * *evaluation* - Dictionary with strategies as keys. Each value is a dictionary with a list of values for each round but the last:
+    #     - 'pairs': the fraction of the pairs of the puzzle that were guessed
+    #     - 'fuzz', 'correct', 'difference': the quality of the puzzle of the next round after the guess (see calculateQualityArrays() )
     
-    from matplotlib import pyplot as plt
-    plt.rcParams.update({'font.size': 30})
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    index = getPairIndex( pairs )
+    
+    # single qubit gates are only applied to active qubits (see implementGate)
+    active = [ v for v in range(num) if v in pos ]
+    
+    def newPuzzle ( ):
+        # the puzzle is made as in runGame
+        matching = randomMatching( pairs, generators['pairs'] )
+        puzzle = numpy.full( len(index['names']), math.nan )
+        for k in matching:
+            puzzle[k] = ( 0.1+0.9*generators['fracs'].random() ) / 2
+        return matching, puzzle
+    
+    def measure ( states ):
+        # oneProb and sameProb for each state, with the given number of shots
+        measured = []
+        for probs in simulator.probabilities( states ):
+            results = distributions.sample( {'num':num, 'codes':None, 'probs':probs, 'shots':None}, shots, generators['shots'] )
+            measured.append( [ distributions.oneProbs( results ), distributions.sameProbs( results, index['q0'], index['q1'] ) ] )
+        return measured
+    
+    evaluation = {}
+    for strategy in strategies:
+        evaluation[strategy] = { 'pairs':[], 'fuzz':[], 'correct':[], 'difference':[] }
+    
+    # the prefix state, and the puzzle of the first round
+    states = simulator.initialStates( 1, num )
+    matching, puzzle = newPuzzle()
+    puzzles = states.copy()
+    simulatePairs( puzzles, num, index, numpy.nan_to_num( puzzle )[None], entangleType )
+    oneProb, sameProb = measure( puzzles )[0]
+    
+    for score in range(1,maxScore):
+        
+        guesses = []
+        for strategy in strategies:
+            guessed = guessPairs( strategy, pairs, oneProb, sameProb, matching, generators['guesses'] )
+            guesses.append( numpy.nan_to_num( guessGates( strategy, guessed, pairs, oneProb, puzzle, True, shots ) ) )
+            evaluation[strategy]['pairs'].append( len( set(guessed).intersection( set(matching) ) )/len(matching) )
+        
+        conjugates = randomConjugates( num, generators['conjugates'] )
+        isX = numpy.array( [ [ conjugates[v][0]=='X' for v in range(num) ] ]*len(strategies) )
+        fracs = numpy.array( [ [ conjugates[v][1] for v in range(num) ] ]*len(strategies) )
+        nextMatching, nextPuzzle = newPuzzle()
+        
+        # fork the prefix state, and apply the conjugated gates of this round with each guess
+        branches = numpy.repeat( states, len(strategies), axis=0 )
+        for v in active:
+            simulator.rotate( branches, num, v, isX[:,v], -fracs[:,v] )
+        simulatePairs( branches, num, index, numpy.nan_to_num( puzzle )[None,:] + numpy.array( guesses ), entangleType )
+        for v in active:
+            simulator.rotate( branches, num, v, isX[:,v], fracs[:,v] )
+        
+        # then the puzzle of the next round
+        puzzles = branches.copy()
+        simulatePairs( puzzles, num, index, numpy.repeat( numpy.nan_to_num( nextPuzzle )[None,:], len(strategies), axis=0 ), entangleType )
+        measured = measure( puzzles )
+        
+        nextOneProbs = numpy.array( [ nextOneProb for nextOneProb, nextSameProb in measured ] )
+        fuzz, correct, difference = calculateQualityArrays( nextOneProbs, numpy.repeat( nextPuzzle[None,:], len(strategies), axis=0 ), pairs )
+        for b, strategy in enumerate(strategies):
+            for quantity, values in [ ['fuzz',fuzz], ['correct',correct], ['difference',difference] ]:
+                evaluation[strategy][quantity].append( float( values[b] ) )
+        
+        # carry on with the trunk
+        t = strategies.index( trunk )
+        states = branches[t:t+1]
+        oneProb, sameProb = measured[t]
+        matching, puzzle = nextMatching, nextPuzzle
     
-    markers = ["o","^","h","D","*"]
+    return evaluation
+
+
+def EvaluateStrategies ( device, shots, samples, maxScore, strategies=None, trunk='C', seed=None ):
     
-    # if verbose, print the numbers to screen
-    if verbose==True:
-        print("\nX values")
-        print(X)
-        for j in range(len(Y)):
+    # Input:
+    # * *device* - String specifying the device on which the game is played (with no more than simulator.maxQubits qubits).
+    # * *shots* - Number of shots sampled for each puzzle.
+    # * *samples* - Number of games to play.
+    # * *maxScore* - Number of rounds in each game.
+    # * *strategies* - List of moves whose guesses are compared (see guessPairs() ). By default, all the bots in *bots* are used.
+    # * *trunk* - The move used to carry on each game after each round (added to *strategies* if not there).
+    # * *seed* - If given, each game is played with its own seed made from this (see getGameSeed() ).
+    #
+    # Process:
+    # * Simulated games are played, in which each round is forked to try the guesses of every strategy (see forkGame() ).
+    #
+    # Output:
+    # * *evaluationAvs* - Dictionary with strategies as keys. Each value is a dictionary with 'pairs', 'fuzz', 'correct' and 'difference' as keys (see forkGame() ),
+    #                     and lists of the average and variance of these for each round but the last as values.
+    
+    if strategies is None:
+        strategies = list( bots.keys() )
+    strategies = list(strategies) + [trunk]*(trunk not in strategies)
+    
+    values = {}
+    for sample in range(samples):
+        gameSeed = None
+        if seed is not None:
+            gameSeed = getGameSeed( seed, device, trunk, shots, True, sample )
+        evaluation = forkGame( device, shots, maxScore, strategies, trunk, getGameGenerators( gameSeed ) )
+        for strategy in strategies:
+            for quantity in evaluation[strategy]:
+                values.setdefault( strategy, {} ).setdefault( quantity, [] ).append( evaluation[strategy][quantity] )
+    
+    evaluationAvs = {}
+    for strategy in values:
+        evaluationAvs[strategy] = {}
+        for quantity in values[strategy]:
+            array = numpy.array( values[strategy][quantity], dtype=float )
+            mean = array.mean( axis=0 )
+            evaluationAvs[strategy][quantity] = [ [ float(mean[score]), float( (array[:,score]**2).mean() - mean[score]**2 ) ] for score in range(array.shape[1]) ]
+    
+    return evaluationAvs
+
+
+def MakeGraph(X,Y,y,axisLabel,labels=[],verbose=False,log=False,tall=False,filename=None,intervals=None):
+    
+    # Input:
+    # * *X* - array of x axis values
+    # * *Y* - array of arrays of y axis values for multiple series
+    # * *y* - array of arrays of variances for the y axis values for multiple series (used to make error bars)
+    # * *axisLabel* - list of two strings: labels for the x and z axis
+    # * *labels* - list of strings, giving the names for each series
+    # * *verbose* - when True, the arrays X, Y and y will be printed to screen
+    # * *log* - When true, the plot will be a log plot (on the y axis)
+    # * *tall* - if true, the plot will be a square to spread out the y axis values a bit more
+    # * *filename* - if given, the graph is saved to this file instead of being shown on screen
+    # * *intervals* - if given, array of arrays of [lower,upper] confidence intervals for the y axis values for multiple series, which are used as the error bars instead of *y*
+    # 
+    # Process:
+    # * Set up the required call to matplotlib and make the graph
+    # 
+    # Output:
+    # * Nothing is returned, but the required graph is output to screen (or file)
+    
+    from matplotlib import pyplot as plt
+    plt.rcParams.update({'font.size': 30})
+    
+    markers = ["o","^","h","D","*"]
+    
+    # if verbose, print the numbers to screen
+    if verbose==True:
+        print("\nX values")
+        print(X)
+        for j in range(len(Y)):
             print("\nY values for "+labels[j])
             print(Y[j])
             print("\nError bars")
-            print(y[j])
+            if intervals is None:
+                print(y[j])
+            else:
+                print(intervals[j])
             print("")
     
-    # convert the variances of varY into widths of error bars
-    for j in range(len(y)):
-        for k in range(len(y[j])):
-            if y[j][k]>0: # avoiding domaning error for negative values (though they should only occur for numerical innacuracies anyway)
-                y[j][k] = math.sqrt(y[j][k]/2)
-            else:
-                y[j][k] = 0
+    if intervals is None:
+        # convert the variances of varY into widths of error bars
+        for j in range(len(y)):
+            for k in range(len(y[j])):
+                if y[j][k]>0: # avoiding domaning error for negative values (though they should only occur for numerical innacuracies anyway)
+                    y[j][k] = math.sqrt(y[j][k]/2)
+                else:
+                    y[j][k] = 0
+    else:
+        # convert the intervals into the distances below and above the y values
+        y = []
+        for j in range(len(intervals)):
+            y.append( [ [ max(0,Y[j][k]-interval[0]) for k, interval in enumerate(intervals[j]) ],
+                        [ max(0,interval[1]-Y[j][k]) for k, interval in enumerate(intervals[j]) ] ] )
             
     if tall:
         plt.figure(figsize=(20,20))
@@ -1117,75 +1612,1234 @@ def MakeGraph(X,Y,y,axisLabel,labels=[],verbose=False,log=False,tall=False):
             plt.legend(loc="upper left", bbox_to_anchor=(1,1))
 
     
-    # label the axes
-    plt.xlabel(axisLabel[0])
-    plt.ylabel(axisLabel[1])
+    # label the axes
+    plt.xlabel(axisLabel[0])
+    plt.ylabel(axisLabel[1])
+    
+    # make sure X axis is fully labelled
+    plt.xticks(X)
+    
+    
+    # logarithms if required
+    if log==True:
+        plt.yscale('log')
+
+    # make the graph
+    if filename is None:
+        plt.show()
+    else:
+        plt.savefig(filename, bbox_inches='tight')
+        plt.close()
+    
+    plt.rcParams.update(plt.rcParamsDefault)
+
+
+def checkpointFilename ( device, move, shots, sim, folder='', writer=None ):
+    
+    # Returns the filename of the checkpoint for GetData() with the given specs, and for the given writer (see GetData() ). This does not end in .txt, so that it is not mistaken for a results file.
+    
+    return os.path.join( resultsPath, device, folder, 'move=' + move + '_shots=' + str(shots) + '_sim=' + str(sim) + ('_writer='+str(writer))*(writer is not None) + '.checkpoint' )
+
+
+def saveCheckpoint ( device, move, shots, sim, checkpointData, folder='', writer=None ):
+    
+    # Writes a checkpoint to file (first to a temporary file, which then replaces the old one, so that the checkpoint is never left half written).
+    
+    filename = checkpointFilename( device, move, shots, sim, folder=folder, writer=writer )
+    
+    if not os.path.exists( os.path.dirname(filename) ):
+        os.makedirs( os.path.dirname(filename) )
+    
+    with open( filename+'.tmp', 'w' ) as saveFile:
+        saveFile.write( str(checkpointData)+'\n' )
+    os.replace( filename+'.tmp', filename )
+
+
+def loadCheckpoint ( device, move, shots, sim, folder='', writer=None ):
+    
+    # Returns the checkpoint saved by GetData() for the given specs and writer, or None if there isn't one.
+    
+    filename = checkpointFilename( device, move, shots, sim, folder=folder, writer=writer )
+    
+    if not os.path.exists( filename ):
+        return None
+    
+    with open( filename ) as saveFile:
+        return eval( saveFile.read() )
+
+
+def GetData ( device, move, shots, sim, samples, maxScore, mitigate=False, target=None, confidence=0.95, minSamples=10, seed=None, storeConjugates=True, resume=False, shard=None, correlations=False, writer=None ):
+    
+    # Input:
+    # * *device* - String specifying the device on which the game is played.
+    #              Details about the device will be obtained using getLayout.
+    # * *move* - String describing the way moves are chosen.
+    # * *shots* - Number of shots to be used for statistics.
+    # * *sim* - Boolean for whether the simulator is to be used.
+    # * *samples* - Number of full games to run (or the maximum number, if *target* is given)
+    # * *maxScore* - Number of rounds to run each game for
+    # * *mitigate* - Boolean determining whether calibration circuits are run with each game, so that readout errors can be mitigated
+    # * *target* - If given, games stop being run once the confidence intervals for the average fuzz and MWPM correctness of every round are narrower than this (on either side of the average)
+    # * *confidence* - Probability that the confidence intervals used with *target* should cover the true average
+    # * *minSamples* - Smallest number of games to run before stopping due to *target*
+    # * *seed* - If given, each game is played with its own seed made from this (see getGameSeed() ), and the game seeds are saved.
+    #            Games are numbered by resultsFiles.reserveSample(), so that processes adding to the same results with the same seed play different games
+    # * *storeConjugates* - Boolean determining whether conjugates are saved. When *seed* is given, they can instead be regenerated from the game seeds (see loadConjugates() )
+    # * *resume* - Boolean determining whether to first finish the game that was in progress when a previous call of GetData() stopped (which counts as one of the *samples* games)
+    # * *shard* - If given, the data is saved in the subfolder 'shards/<shard>' of the device folder instead of the main files. These can be merged later with resultsFiles.mergeShards()
+    # * *correlations* - Boolean determining whether the correlations between all pairs of qubits (not just those in *pairs*) are saved for each round (see getCorrelations() )
+    # * *writer* - Name for this process, which is used for its checkpoint. Processes that add to the same results at once (without shards) need different names, and a process must use the same name as before to resume
+    #
+    # Process:
+    # * The game is the required number of times with the given specs. The information supplied by runGame() is then saved to file.
+    #   The lines for each game are written to all files in a single step (see resultsFiles.appendSample() ), so that many processes can safely save to the same files.
+    # * If *mitigate=True*, the calibration circuits of runCalibration() are run before each game. Their results are saved, along with oneProbs and sameProbs after readout error mitigation (see getMitigatedProbs() ).
+    #   When results are saved (*sim=False*), the full results of each round are also mitigated and saved in the 'resultsMitigated' file, for devices with up to mitigation.maxQubits qubits (see getMitigatedResults() ).
+    # * If *target* is given, the fuzz and MWPM correctness are calculated for each round of each game as it is played. A running mean and variance is kept for each round (see updateRunningStats() ),
+    #   from which the width of the confidence intervals is found (see getHalfWidths() ).
+    # * If *correlations=True*, the results of each round are used to find how many shots gave the same result for every pair of qubits. These are saved in the 'correlations' file (see CorrelationData() ).
+    # * Games can only be added to saved results that have the same types of file (see getDataFileTypes() ), so that the files stay aligned. This is checked before any games are run, and a ValueError is raised if the options don't match.
+    # * At the start of each round, the state of the game is saved as a checkpoint (see checkpointFilename() ), along with how far through the *samples* games we are.
+    #   The ID of any job submitted to a real device is added to the checkpoint as soon as it is known. With *resume=True*, the game is picked up from the checkpoint,
+    #   and the results of the job are retrieved rather than it being submitted again. The checkpoint is removed once each game is saved.
+    #   There is a checkpoint for each *writer*, which is claimed by the process for as long as it runs (see resultsFiles.claimFile() ). So a ValueError is raised if another process is already running with the same name.
+    # 
+    # Output:
+    # * *samplesRun* - Number of games that were run. The collected data is saved to file.
+    
+    if target is not None:
+        num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+        stats = {'fuzz':None, 'correct':None}
+    
+    folder = ''
+    if shard is not None:
+        folder = os.path.join( 'shards', str(shard) )
+    
+    # games can't be added to results saved with different options (see resultsFiles.appendSample), so this is checked before any are run
+    existing = resultsFiles.getFileTypes( resultsPath, device, move, shots, sim, folder=folder )
+    fileTypes = getDataFileTypes( device, sim, mitigate=mitigate, seed=seed, storeConjugates=storeConjugates, correlations=correlations )
+    if existing and set(existing)!=set(fileTypes):
+        raise ValueError( "The options given would save the files " + str(fileTypes) + ", but the saved results for device=" + device + ", move=" + move + ", shots=" + str(shots) + ", sim=" + str(sim) + " have " + str(existing) )
+    
+    # the checkpoint of this writer is kept to this process while it runs
+    filename = checkpointFilename( device, move, shots, sim, folder=folder, writer=writer )
+    with resultsFiles.claimFile( filename ):
+            
+        # see if there is a game to pick up
+        resumed = None
+        if resume:
+            resumed = loadCheckpoint( device, move, shots, sim, folder=folder, writer=writer )
+            if resumed is not None:
+                print("Resuming game " + str(resumed['sample']+1) + " of " + str(resumed['samples']) + " from round " + str(len(resumed['state']['oneProbs'])+1) )
+        
+        samplesRun = 0
+        for sample in range(samples):
+
+            print("move="+move+", shots="+str(shots)+", sample=" + str(sample+1) )
+
+            if resumed is not None:
+                gameSeed = resumed['gameSeed']
+                calibration = resumed['calibration']
+                state = resumed['state']
+                state['resultsDicts'] = [ resultsFiles.loadResults( resultsPath, device, results, shots=shots ) for results in state['resultsDicts'] ]
+                jobs['resume'] = resumed['pending']
+                resumed = None
+            else:
+                gameSeed = None
+                if seed is not None:
+                    # games are numbered on from those already saved (or reserved by other processes), so that each call with the same seed adds different games
+                    gameSeed = getGameSeed( seed, device, move, shots, sim, resultsFiles.reserveSample( resultsPath, device, move, shots, sim, folder=folder ), shard=shard )
+                calibration = None
+                state = None
+                jobs['resume'] = None
+            if mitigate and calibration is None:
+                calibration = runCalibration( device, shots, sim )
+
+            # the checkpoint is updated at the start of each round, and when a job is submitted
+            checkpointData = { 'sample':sample, 'samples':samples, 'gameSeed':gameSeed, 'calibration':calibration, 'state':state, 'pending':jobs['resume'] }
+            def checkpoint ( state ):
+                # a copy is kept, since the game will go on to change the lists in state before the job is submitted
+                checkpointData['state'] = copy.deepcopy( state )
+                # results are kept in the form they are saved in (see resultsFiles.storeResults)
+                checkpointData['state']['resultsDicts'] = [ resultsFiles.storeResults( resultsPath, device, results ) for results in state['resultsDicts'] ]
+                checkpointData['pending'] = None
+                saveCheckpoint( device, move, shots, sim, checkpointData, folder=folder, writer=writer )
+            def submitted ( jobId ):
+                checkpointData['pending'] = jobId
+                saveCheckpoint( device, move, shots, sim, checkpointData, folder=folder, writer=writer )
+            jobs['submitted'] = submitted
+
+            try:
+                gates, conjugates, oneProbs, sameProbs, resultsDicts = runGame( device, move, shots, sim, maxScore=maxScore, seed=gameSeed, state=state, checkpoint=checkpoint )
+            finally:
+                jobs['submitted'] = None
+                jobs['resume'] = None
+
+            # the files written here should be those given by getDataFileTypes()
+            data = { 'oneProbs':oneProbs, 'sameProbs':sameProbs, 'gates':gates }
+            if storeConjugates or seed is None:
+                data['conjugates'] = conjugates
+            if seed is not None:
+                data['seeds'] = gameSeed
+            if sim==False:
+                data['results'] = [ resultsFiles.storeResults( resultsPath, device, results ) for results in resultsDicts ]
+            if mitigate:
+                num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+                data['calibration'] = calibration
+                data['oneProbsMitigated'], data['sameProbsMitigated'] = getMitigatedProbs( calibration, oneProbs, sameProbs, pairs )
+                if sim==False and num<=mitigation.maxQubits:
+                    data['resultsMitigated'] = [ resultsFiles.storeResults( resultsPath, device, results ) for results in getMitigatedResults( calibration, resultsDicts ) ]
+            if correlations:
+                data['correlations'] = [ getCorrelations( results, shots ) for results in resultsDicts ]
+
+            # save the game to all files at once (this also keeps the catalog of results up to date)
+            resultsFiles.appendSample( resultsPath, device, move, shots, sim, data, folder=folder )
+            
+            # the game is saved, so there is nothing to resume
+            if os.path.exists( filename ):
+                os.remove( filename )
+            
+            samplesRun += 1
+            
+            # see whether the statistics are good enough to stop
+            if target is not None:
+                
+                gameOneProbs, gameSameProbs, gameFracs = getDataArrays( [oneProbs], [sameProbs], [gates], pairs )
+                fuzz, correct, difference = calculateQualityArrays( gameOneProbs, gameFracs, pairs )
+                for quantity, values in [ ['fuzz',fuzz[0]], ['correct',correct[0]] ]:
+                    stats[quantity] = updateRunningStats( stats[quantity], values )
+                
+                halfWidth = max( getHalfWidths( stats['fuzz'], confidence ).max(), getHalfWidths( stats['correct'], confidence ).max() )
+                print("largest confidence interval half-width = " + str(round(halfWidth,4)) + " (target = " + str(target) + ")" )
+                
+                if samplesRun>=minSamples and halfWidth<target:
+                    break
+    
+    return samplesRun
+
+
+def getDataFileTypes ( device, sim, mitigate=False, seed=None, storeConjugates=True, correlations=False ):
+    
+    # Returns the types of file that GetData() saves a game to with the given options (in the order of resultsFiles.orderFileTypes() ).
+    # The device is needed since full results are only mitigated for up to mitigation.maxQubits qubits.
+    
+    fileTypes = ['oneProbs','sameProbs','gates']
+    if storeConjugates or seed is None:
+        fileTypes.append( 'conjugates' )
+    if seed is not None:
+        fileTypes.append( 'seeds' )
+    if sim==False:
+        fileTypes.append( 'results' )
+    if mitigate:
+        fileTypes += ['calibration','oneProbsMitigated','sameProbsMitigated']
+        if sim==False and getLayout(device)[0]<=mitigation.maxQubits:
+            fileTypes.append( 'resultsMitigated' )
+    if correlations:
+        fileTypes.append( 'correlations' )
+    
+    return resultsFiles.orderFileTypes( fileTypes )
+
+
+def loadConjugates ( move, shots, sim, device, folder='' ):
+    
+    # Input:
+    # * *move*, *shots*, *sim*, *device*, *folder* - See resultsLoad().
+    #
+    # Process:
+    # * The conjugates are loaded from file if it exists. If not, they are regenerated from the saved game seeds (see regenerateConjugates() ).
+    # * A ValueError is raised if there are not conjugates (or seeds) for exactly the games in the oneProbs file, since they could then not be matched to their games.
+    #
+    # Output:
+    # * *samples* - List of the conjugates for each game.
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    
+    oneProbSamples = resultsLoad( 'oneProbs', move, shots, sim, device, folder=folder )
+    
+    if catalog.dataAvailable( resultsPath, device, move, shots, sim, fileTypes=['conjugates'], folder=folder ):
+        conjugateSamples = resultsLoad( 'conjugates', move, shots, sim, device, folder=folder )
+        if len(conjugateSamples)!=len(oneProbSamples):
+            raise ValueError( "There are conjugates for " + str(len(conjugateSamples)) + " of " + str(len(oneProbSamples)) + " games, so they can't be matched to their games" )
+        return conjugateSamples
+    
+    seedSamples = resultsLoad( 'seeds', move, shots, sim, device, folder=folder )
+    if len(seedSamples)!=len(oneProbSamples) or None in seedSamples:
+        raise ValueError( "There are seeds for " + str( len(seedSamples)-seedSamples.count(None) ) + " of " + str(len(oneProbSamples)) + " games, so conjugates can't be regenerated for them" )
+    
+    return [ regenerateConjugates( gameSeed, num, len(oneProbs) ) for gameSeed, oneProbs in zip( seedSamples, oneProbSamples ) ]
+
+
+def verifySeeds ( device, move, shots, sim, folder='' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify saved results, which must include a seeds file.
+    #
+    # Process:
+    # * For each game, the puzzles (pairs and fracs) and conjugates are regenerated from the game seed and compared with those saved.
+    #   Conjugates are only compared if they were saved, but their structure (an X or Y rotation for each qubit in each round) is always checked.
+    # * If the seeds (or saved conjugates) are not for exactly the games in the gates file, line j can't be assumed to be for game j, and so only this is reported.
+    #
+    # Output:
+    # * *problems* - List of [ game, description ] for each game that does not match. This is empty if all is well.
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    
+    seedSamples = resultsLoad( 'seeds', move, shots, sim, device, folder=folder )
+    gateSamples = resultsLoad( 'gates', move, shots, sim, device, folder=folder )
+    conjugateSamples = None
+    if catalog.dataAvailable( resultsPath, device, move, shots, sim, fileTypes=['conjugates'], folder=folder ):
+        conjugateSamples = resultsLoad( 'conjugates', move, shots, sim, device, folder=folder )
+    
+    problems = []
+    
+    if len(seedSamples)!=len(gateSamples):
+        problems.append( [ None, 'there are ' + str(len(seedSamples)) + ' seeds for ' + str(len(gateSamples)) + ' games' ] )
+    if conjugateSamples is not None and len(conjugateSamples)!=len(gateSamples):
+        problems.append( [ None, 'there are conjugates for ' + str(len(conjugateSamples)) + ' of ' + str(len(gateSamples)) + ' games' ] )
+    if problems:
+        return problems
+    
+    for game, ( gameSeed, gates ) in enumerate( zip( seedSamples, gateSamples ) ):
+        
+        rounds = int( (len(gates)+1)/2 )
+        
+        puzzles = regeneratePuzzles( gameSeed, pairs, rounds )
+        for score in range(rounds):
+            if set(puzzles[score].keys())!=set(gates[2*score].keys()) or any( abs(puzzles[score][p]-gates[2*score][p])>1e-12 for p in puzzles[score] ):
+                problems.append( [ game, 'puzzle for round ' + str(score+1) + ' does not match' ] )
+        
+        conjugates = regenerateConjugates( gameSeed, num, rounds )
+        if len(conjugates)!=rounds or any( len(newconjugates)!=num or any( conjugate[0] not in ['X','Y'] or not 0<=conjugate[1]<1 for conjugate in newconjugates ) for newconjugates in conjugates ):
+            problems.append( [ game, 'regenerated conjugates have the wrong structure' ] )
+        if conjugateSamples is not None and conjugateSamples[game]!=conjugates:
+            problems.append( [ game, 'conjugates do not match' ] )
+    
+    return problems
+
+
+def updateRunningStats ( stats, values ):
+    
+    # Input:
+    # * *stats* - Dictionary with 'samples', 'mean' and 'm2' (the sum of squared differences from the mean) for the values so far, or None if there are none yet.
+    # * *values* - Array of new values, with one for each round.
+    #
+    # Process:
+    # * Welford's method is used to update the mean and variance, so that earlier values don't need to be kept.
+    #
+    # Output:
+    # * *stats* - The updated dictionary.
+    
+    values = numpy.asarray( values, dtype=float )
+    
+    if stats is None:
+        stats = {'samples':0, 'mean':numpy.zeros(values.shape), 'm2':numpy.zeros(values.shape)}
+    
+    stats['samples'] += 1
+    delta = values - stats['mean']
+    stats['mean'] = stats['mean'] + delta/stats['samples']
+    stats['m2'] = stats['m2'] + delta*( values - stats['mean'] )
+    
+    return stats
+
+
+def getHalfWidths ( stats, confidence ):
+    
+    # Input:
+    # * *stats* - Dictionary made by updateRunningStats().
+    # * *confidence* - Probability that the confidence interval should cover the true mean.
+    #
+    # Output:
+    # * *halfWidths* - Array with the distance from the mean to either end of the confidence interval for each round (using the normal approximation).
+    #                  This is infinite if there are fewer than two samples.
+    
+    if stats['samples']<2:
+        return numpy.full( stats['mean'].shape, math.inf )
+    
+    # find z such that a normally distributed value is within z standard deviations of the mean with probability confidence
+    low, high = 0, 10
+    for _ in range(60):
+        z = (low+high)/2
+        if math.erf( z/math.sqrt(2) )<confidence:
+            low = z
+        else:
+            high = z
+    
+    variance = stats['m2']/(stats['samples']-1)
+    
+    return z*numpy.sqrt( variance/stats['samples'] )
+        
+        
+def downsampleCounts ( results, newShots, generator ):
+    
+    # Input:
+    # * *results* - Distribution of the results for a round (see distributions.py), which must have a number of shots.
+    # * *newShots* - Number of shots to keep (no more than the number in *results*).
+    # * *generator* - numpy.random.RandomState used to choose which shots are kept.
+    #
+    # Process:
+    # * Keeping newShots of the shots at random without replacement gives counts from the multivariate hypergeometric distribution. These are drawn directly from the counts of the outcomes, without making a list of the shots.
+    # * The outcomes are split in half again and again (as a binary tree), and the number of kept shots that fall in the left half of each split is drawn from the hypergeometric distribution.
+    #   All splits at the same depth are drawn at once, so this takes a number of steps given by the log of the number of outcomes.
+    #
+    # Output:
+    # * *downsampled* - Distribution of the kept shots.
+    
+    codes, probs = distributions.getSupport( results )
+    counts = numpy.rint( probs*results['shots'] ).astype(numpy.int64)
+    
+    # the counts for each depth of the tree, from the whole (depth 0) down to single outcomes
+    depth = int( math.ceil( math.log2( max( len(counts), 1 ) ) ) )
+    tree = [ numpy.pad( counts, (0,2**depth-len(counts)) ) ]
+    for level in range(depth):
+        tree.insert( 0, tree[0].reshape(-1,2).sum(axis=1) )
+    
+    kept = numpy.array( [newShots], dtype=numpy.int64 )
+    for level in range(1,depth+1):
+        left = tree[level][0::2]
+        right = tree[level][1::2]
+        keptLeft = numpy.zeros( len(kept), dtype=numpy.int64 )
+        drawn = kept>0
+        if numpy.any( drawn ):
+            keptLeft[drawn] = generator.hypergeometric( left[drawn], right[drawn], kept[drawn] )
+        kept = numpy.stack( [ keptLeft, kept-keptLeft ], axis=1 ).reshape(-1)
+    
+    return distributions.fromCounts( codes, kept[0:len(codes)], results['num'] )
+
+
+def matchResults ( resultsSamples, oneProbSamples ):
+    
+    # Input:
+    # * *resultsSamples* - List with a list of the results of each round (distributions or job ids) for each line of a results file.
+    # * *oneProbSamples* - The oneProbs for each game, as loaded by resultsLoad().
+    #
+    # Process:
+    # * Results files do not always have a line for every game (or a result for every round), so each line is matched to its game by checking that it gives the saved oneProb values for the first round.
+    #
+    # Output:
+    # * *games* - List with the number of the game for each line, or None for lines that could not be matched (or do not have results for every round).
+    
+    games = []
+    for resultsDicts in resultsSamples:
+        game = None
+        if resultsDicts and all( distributions.isDistribution( results ) for results in resultsDicts ):
+            oneProb = distributions.oneProbs( resultsDicts[0] )
+            for j, oneProbs in enumerate(oneProbSamples):
+                if len(oneProbs)==len(resultsDicts) and j not in games and numpy.allclose( oneProb, oneProbs[0], atol=1e-9 ):
+                    game = j
+                    break
+        games.append( game )
+    
+    return games
+
+
+def DownsampleData ( device, move, shots, sim, newShotsList, seed=0, folder='downsampled' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim* - Details that specify saved results, for which the results files must exist (and so only real devices can be used).
+    # * *newShotsList* - List of shot numbers (smaller than *shots*) for which data is to be made.
+    # * *seed* - Seed for the random number generator, so that the same data is made every time (the generator for each shot number is made from this and the shot number).
+    # * *folder* - Subfolder of the device folder in which the new data is saved. Any data already there for the new shot numbers is replaced (see resultsFiles.replaceResults() ), so that readers never see part of the new data.
+    #
+    # Process:
+    # * For each game with results for every round, the stored counts for each round (read from their spill files where results were too large to keep in full, see resultsFiles.loadResults() ) are subsampled (see downsampleCounts() ) to get those for a run with fewer shots.
+    #   The oneProb and sameProb values are then found from these, and saved along with the gates and conjugates of the game. This gives the data that GetData() would have saved for the smaller number of shots, without needing to use the device again.
+    # * Each line of the results file is matched to its game (see matchResults() ), and games for which this cannot be done are skipped.
+    # * The data can be used by ProcessData() and others with *folder=folder*.
+    #
+    # Output:
+    # * *games* - Number of games for which data was made.
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    index = getPairIndex( pairs )
+    
+    resultsSamples = [ [ resultsFiles.loadResults( resultsPath, device, entry, num, shots ) for entry in resultsDicts ] for resultsDicts in resultsLoad ( 'results', move, shots, sim, device ) ]
+    oneProbSamples = resultsLoad ( 'oneProbs', move, shots, sim, device )
+    gateSamples = resultsLoad ( 'gates', move, shots, sim, device )
+    conjugateSamples = loadConjugates ( move, shots, sim, device )
+    
+    # find the game for each line of the results file
+    games = matchResults( resultsSamples, oneProbSamples )
+    
+    folderPath = os.path.join( resultsPath, device, folder )
+    if not os.path.isdir(folderPath):
+        os.makedirs(folderPath)
+    
+    for newShots in newShotsList:
+        
+        # the data is made afresh in temporary files, which replace any made before only once they are complete
+        generator = numpy.random.RandomState( [ seed, newShots ] )
+        saveFiles = {}
+        entries = {}
+        for fileType in ['oneProbs','sameProbs','gates','conjugates','results']:
+            saveFiles[fileType] = open( resultsFiles.getFilename( resultsPath, device, fileType, move, newShots, sim, folder=folder )+'.tmp', 'w' )
+            entries[fileType] = {'samples':0, 'rounds':0, 'bytes':0, 'checksum':''}
+        
+        for resultsDicts, game in zip( resultsSamples, games ):
+            
+            if game is None:
+                continue
+            
+            data = { 'oneProbs':[], 'sameProbs':[], 'gates':gateSamples[game], 'conjugates':conjugateSamples[game], 'results':[] }
+            for results in resultsDicts:
+                downsampled = downsampleCounts( results, newShots, generator )
+                data['oneProbs'].append( distributions.oneProbs( downsampled ).tolist() )
+                data['sameProbs'].append( pairDict( distributions.sameProbs( downsampled, index['q0'], index['q1'] ), pairs ) )
+                data['results'].append( resultsFiles.storeResults( resultsPath, device, downsampled ) )
+            
+            # the catalog entries are found as the lines are written (as by resultsCatalog.describeFile() )
+            for fileType in saveFiles:
+                line = str( data[fileType] )
+                saveFiles[fileType].write( line+'\n' )
+                entries[fileType]['samples'] += 1
+                entries[fileType]['rounds'] = max( entries[fileType]['rounds'], catalog.countRounds( fileType, data[fileType] ) )
+                entries[fileType]['checksum'] = catalog.chainChecksum( entries[fileType]['checksum'], line )
+        
+        for fileType in saveFiles:
+            saveFiles[fileType].close()
+            entries[fileType]['bytes'] = os.path.getsize( saveFiles[fileType].name )
+        
+        resultsFiles.replaceResults( resultsPath, device, move, newShots, sim, entries, folder=folder )
+    
+    return len(games) - games.count(None)
+
+
+def getIncidence ( index, num ):
+    
+    # Returns an array with a row for each pair (in the order of *index*, see getPairIndex() ) which is 1 for its two qubits, so that values for pairs can be taken to their qubits with a matrix product.
+    
+    incidence = numpy.zeros( ( len(index['names']), num ) )
+    incidence[ range(len(index['names'])), index['q0'] ] = 1
+    incidence[ range(len(index['names'])), index['q1'] ] = 1
+    
+    return incidence
+
+
+def getGhosts ( lastUsed, used, index, num ):
+    
+    # Returns a boolean array that is True for pairs in the last puzzle (where *lastUsed* is True) whose qubits are both left out of this one (where *used* is True for pairs), with pairs on the last axis.
+    
+    paired = numpy.dot( used, getIncidence( index, num ) )>0
+    
+    return lastUsed & ~paired[...,index['q0']] & ~paired[...,index['q1']]
+
+
+def fitSurrogate ( device, move, shots, sim, folder='', matchings=1000, seed=0 ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify saved data, whose oneProbs, sameProbs and gates files must exist.
+    # * *matchings* - Number of random matchings in the pool from which the puzzles of synthetic games are chosen.
+    # * *seed* - Seed for the random number generator used to make the pool of matchings.
+    #
+    # Process:
+    # * For every round of every saved game, the frac for each qubit (see calculateFrac() ) is compared to the frac of the gate that created the puzzle for its pair.
+    #   Noise pulls the fracs of real devices towards 0.5 (and more so in later rounds), so a straight line is fitted for each round to give the expected frac of the qubits for each gate.
+    #   The deviations from this are kept for each round, with those for the two qubits of a pair kept together so that the fuzz of synthetic games is like that of the real ones.
+    # * The fracs of qubits in no pair are kept as they are (since their ideal frac is 0).
+    # * Pairs of the last puzzle whose qubits are both left out of this one are also kept together, since gates that didn't quite remove the last puzzle leave them looking like a pair (which is what makes later rounds harder).
+    # * The sameProb of each pair in the puzzle is similarly given by a straight line fitted for each round (ideally it would be 1), and deviations from it. For the other pairs, the deviations from the value for independent qubits (given their oneProbs) are kept.
+    # * These deviations make up the noise model used by sampleSurrogate().
+    #
+    # Output:
+    # * *model* - Dictionary describing the noise for each round, as well as the device, the number of rounds and the pool of matchings.
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    index = getPairIndex( pairs )
+    
+    oneProbSamples = resultsLoad ( 'oneProbs', move, shots, sim, device, folder=folder )
+    sameProbSamples = resultsLoad ( 'sameProbs', move, shots, sim, device, folder=folder )
+    gateSamples = resultsLoad ( 'gates', move, shots, sim, device, folder=folder )
+    oneProbs, sameProbs, fracs = getDataArrays( oneProbSamples, sameProbSamples, gateSamples, pairs )
+    
+    qubitFracs = numpy.arcsin( numpy.sqrt( numpy.clip( oneProbs, 0, 1 ) ) ) * 2 / math.pi
+    used = ~numpy.isnan( fracs )
+    p0 = oneProbs[...,index['q0']]
+    p1 = oneProbs[...,index['q1']]
+    independent = p0*p1 + (1-p0)*(1-p1)
+    toQubits = getIncidence( index, num )
+    
+    def getPool ( values ):
+        # an empty pool is replaced by a single deviation of zero, so that it can still be sampled from
+        return values if len(values) else numpy.zeros( (1,)+values.shape[1:] )
+    
+    def getLine ( x, y, ideal ):
+        # the gradient and intercept of a line fitted to the points, or those of the ideal line if there are too few
+        return numpy.polyfit( x, y, 1 ) if len(numpy.unique(x))>1 else numpy.array( ideal, dtype=float )
+    
+    model = { 'device':device, 'rounds':oneProbs.shape[1], 'fracLines':[], 'pairResiduals':[], 'ghostResiduals':[], 'qubitResiduals':[], 'sameLines':[], 'sameResiduals':[], 'otherResiduals':[] }
+    for score in range(oneProbs.shape[1]):
+        
+        # pairs of the last puzzle with neither qubit in this one, and which qubits are in neither
+        ghosts = getGhosts( used[:,score-1] if score>0 else numpy.zeros( used.shape[::2], dtype=bool ), used[:,score], index, num )
+        alone = ( numpy.dot( used[:,score], toQubits ) + numpy.dot( ghosts, toQubits ) )==0
+        
+        games, ks = numpy.nonzero( used[:,score] )
+        gateFracs = fracs[games,score,ks]
+        pairFracs = numpy.stack( [ qubitFracs[games,score,index['q0'][ks]], qubitFracs[games,score,index['q1'][ks]] ], axis=1 )
+        model['fracLines'].append( getLine( gateFracs, pairFracs.mean(axis=1), [1,0] ) )
+        model['pairResiduals'].append( getPool( pairFracs - numpy.polyval( model['fracLines'][-1], gateFracs )[:,None] ) )
+        model['sameLines'].append( getLine( gateFracs, sameProbs[games,score,ks], [0,1] ) )
+        model['sameResiduals'].append( getPool( sameProbs[games,score,ks] - numpy.polyval( model['sameLines'][-1], gateFracs ) ) )
+        
+        games, ks = numpy.nonzero( ghosts )
+        model['ghostResiduals'].append( getPool( numpy.stack( [ qubitFracs[games,score,index['q0'][ks]], qubitFracs[games,score,index['q1'][ks]] ], axis=1 ) ) )
+        model['qubitResiduals'].append( getPool( qubitFracs[:,score][ alone ] ) )
+        model['otherResiduals'].append( getPool( ( sameProbs[:,score] - independent[:,score] )[ ~used[:,score] ] ) )
+    
+    generator = random.Random( seed )
+    model['matchings'] = numpy.zeros( ( matchings, len(index['names']) ), dtype=bool )
+    for m in range(matchings):
+        model['matchings'][ m, randomMatching( pairs, generator ) ] = True
+    
+    return model
+
+
+def sampleSurrogate ( model, games, generator ):
+    
+    # Input:
+    # * *model* - Noise model made by fitSurrogate().
+    # * *games* - Number of games to make.
+    # * *generator* - A numpy.random.RandomState used for all random choices.
+    #
+    # Process:
+    # * Each round of each game gets a matching chosen from the pool, with a random frac for each pair chosen as in runGame().
+    #   The oneProbs are found from the ideal fracs of the qubits plus deviations chosen from those seen in the same round of the real games (for pairs of this puzzle and the last, and single qubits), and similarly for the sameProbs.
+    # * The gates that remove each puzzle are those that a player who guessed correctly would use (as for move='C').
+    # * Everything is done for all games at once, with a matrix product to take values for pairs to their qubits.
+    #
+    # Output:
+    # * *oneProbs*, *sameProbs* - Arrays as made by getDataArrays().
+    # * *gates* - Array with gates[j,t,k] as the frac of the gate for the kth pair in slice t of game j, or nan for pairs without gates.
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout( model['device'] )
+    index = getPairIndex( pairs )
+    rounds = model['rounds']
+    
+    # matrices that take values for each pair to its first and second qubit
+    toQ0 = numpy.zeros( ( len(index['names']), num ) )
+    toQ0[ range(len(index['names'])), index['q0'] ] = 1
+    toQ1 = numpy.zeros( ( len(index['names']), num ) )
+    toQ1[ range(len(index['names'])), index['q1'] ] = 1
+    
+    def choose ( pool, mask ):
+        # deviations are only chosen where they are needed
+        return pool[ generator.randint( len(pool), size=numpy.count_nonzero(mask) ) ]
+    
+    oneProbs = numpy.zeros( ( games, rounds, num ) )
+    sameProbs = numpy.zeros( ( games, rounds, len(index['names']) ) )
+    gates = numpy.full( ( games, 2*rounds-1, len(index['names']) ), math.nan )
+    lastUsed = numpy.zeros( ( games, len(index['names']) ), dtype=bool )
+    for score in range(rounds):
+        
+        used = model['matchings'][ generator.randint( len(model['matchings']), size=games ) ]
+        fracs = ( 0.1+0.9*generator.random_sample( numpy.count_nonzero(used) ) ) / 2
+        gates[:,2*score][used] = fracs
+        
+        ghosts = getGhosts( lastUsed, used, index, num )
+        residuals = numpy.zeros( used.shape+(2,) )
+        residuals[used] = choose( model['pairResiduals'][score], used ) + numpy.polyval( model['fracLines'][score], fracs )[:,None]
+        residuals[ghosts] = choose( model['ghostResiduals'][score], ghosts )
+        qubitFracs = residuals[...,0].dot( toQ0 ) + residuals[...,1].dot( toQ1 )
+        alone = ( used | ghosts ).dot( toQ0+toQ1 )==0
+        qubitFracs[alone] = choose( model['qubitResiduals'][score], alone )
+        oneProbs[:,score] = numpy.sin( numpy.clip( qubitFracs, 0, 1 )*math.pi/2 )**2
+        lastUsed = used
+        
+        p0 = oneProbs[:,score,index['q0']]
+        p1 = oneProbs[:,score,index['q1']]
+        expected = p0*p1 + (1-p0)*(1-p1)
+        expected[used] = numpy.polyval( model['sameLines'][score], fracs ) + choose( model['sameResiduals'][score], used )
+        expected[~used] += choose( model['otherResiduals'][score], ~used )
+        sameProbs[:,score] = numpy.clip( expected, 0, 1 )
+        
+        if score<rounds-1:
+            gates[:,2*score+1][used] = -numpy.arcsin( numpy.sqrt( (p0[used]+p1[used])/2 ) ) * 2 / math.pi
+    
+    return oneProbs, sameProbs, gates
+
+
+def SyntheticData ( device, move, shots, sim, games, folder='synthetic', batch=10000, seed=0, sourceFolder='' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim* - Details that specify saved data, from which a noise model is made (see fitSurrogate() ). Only move='C' can be used (see below).
+    # * *games* - Number of synthetic games to make.
+    # * *folder* - Subfolder of the device folder in which the synthetic games are saved.
+    # * *batch* - Number of games made at once.
+    # * *seed* - Seed for the random number generators, so that the same games are made every time.
+    # * *sourceFolder* - Subfolder of the device folder from which the saved data is loaded.
+    #
+    # Process:
+    # * Games are made in batches by sampleSurrogate(), and saved in oneProbs, sameProbs and gates files with the same details as the original data (replacing any such files already in *folder*).
+    #   These can be used with *folder=folder* by ProcessData(), RunTournament() and runGame() (with *dataNeeded=False*), without needing to simulate any circuits.
+    # * The gates of synthetic games are always those of a player who guessed correctly, and runGame() only uses files for move='C' when *dataNeeded=False*. So a ValueError is raised for any other move.
+    # * The lines for each batch are made by formatRows(), and written to temporary files along with the catalog entries for them (which are known without reading the files again).
+    #   These then replace the old files all at once (see resultsFiles.replaceResults() ).
+    #
+    # Output:
+    # * *games* - Number of games that were saved.
+    
+    if move!='C':
+        raise ValueError( "Synthetic games can only be made for move='C', since they are those of a player who guessed correctly (not move=" + str(move) + ")" )
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    names = getPairIndex( pairs )['names']
+    
+    model = fitSurrogate( device, move, shots, sim, folder=sourceFolder, seed=seed )
+    generator = numpy.random.RandomState( seed )
+    rounds = model['rounds']
+    
+    folderPath = os.path.join( resultsPath, device, folder )
+    if not os.path.isdir(folderPath):
+        os.makedirs(folderPath)
+    
+    # the games are first written to temporary files, so that the lock is only needed while these replace the old files
+    filenames = {}
+    saveFiles = {}
+    entries = {}
+    for fileType in ['oneProbs','sameProbs','gates']:
+        filenames[fileType] = resultsFiles.getFilename( resultsPath, device, fileType, move, shots, sim, folder=folder )
+        saveFiles[fileType] = open( filenames[fileType]+'.tmp', 'w' )
+        entries[fileType] = {'samples':games, 'rounds':rounds*(games>0), 'bytes':0, 'checksum':''}
+    
+    for start in range(0,games,batch):
+        oneProbs, sameProbs, gates = sampleSurrogate( model, min(batch,games-start), generator )
+        rows = {
+            'oneProbs': formatRows( oneProbs.reshape( -1, num ) ),
+            'sameProbs': formatRows( sameProbs.reshape( -1, len(names) ), names ),
+            'gates': formatRows( gates.reshape( -1, len(names) ), names )
+            }
+        for fileType in rows:
+            slices = len(rows[fileType])//len(oneProbs)
+            lines = [ '[' + ', '.join( rows[fileType][j*slices:(j+1)*slices] ) + ']' for j in range(len(oneProbs)) ]
+            for line in lines:
+                entries[fileType]['checksum'] = catalog.chainChecksum( entries[fileType]['checksum'], line )
+            saveFiles[fileType].write( '\n'.join( lines )+'\n' )
+    
+    for fileType in saveFiles:
+        saveFiles[fileType].close()
+        entries[fileType]['bytes'] = os.path.getsize( filenames[fileType]+'.tmp' )
+    
+    resultsFiles.replaceResults( resultsPath, device, move, shots, sim, entries, folder=folder )
+    
+    return games
+
+
+def simulatePairs ( states, num, index, fracs, entangleType ):
+    
+    # Applies the entangling gates given by *fracs* (an array with fracs[b,k] as the frac for the kth pair in state b, or 0 for no gate) to the states (see simulator.py).
+    
+    for k in numpy.nonzero( numpy.any( fracs!=0, axis=0 ) )[0]:
+        if entangleType=='none':
+            for v in [ index['q0'][k], index['q1'][k] ]:
+                simulator.rotate( states, num, int(v), numpy.ones( len(states), dtype=bool ), fracs[:,k] )
+        else:
+            simulator.rotatePair( states, num, int(index['q0'][k]), int(index['q1'][k]), fracs[:,k] )
+
+
+def calculateXEB ( device, gateSamples, conjugateSamples, resultsSamples ):
+    
+    # Input:
+    # * *device* - String specifying the device on which the games were played.
+    # * *gateSamples*, *conjugateSamples* - The gates and conjugates of many games, as loaded by resultsLoad() and loadConjugates().
+    # * *resultsSamples* - List with a list of the results of each round (distributions or job ids) for each of these games.
+    #
+    # Process:
+    # * The circuits run in each round of each game are simulated (see simulator.py), with many games at once. The circuits for each round start with those of the last, so the state at the start of each round is kept and built on.
+    # * For each round, the ideal probabilities P(x) of the observed outcomes x are used to find the linear cross entropy benchmarking (XEB) fidelity
+    #     F = ( 2^n * <P(x)> - 1 ) / ( 2^n * sum P(x)^2 - 1 ),
+    #   where <P(x)> is the average over the observed shots, and n is the number of active qubits. This is 1 for a perfect device and 0 for one that gives random outcomes.
+    #   For random circuits (with Porter-Thomas outputs) the denominator is 1, and this is the usual linear XEB. The denominator is needed here since the circuits of the game are far from random.
+    #
+    # Output:
+    # * *xeb* - Array with xeb[j,s] as the fidelity for round s of game j (or nan if there are no results, or the ideal output is uniform).
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    index = getPairIndex( pairs )
+    
+    # single qubit gates are only applied to active qubits (see implementGate)
+    active = [ v for v in range(num) if v in pos ]
+    dimension = 2**len(active)
+    
+    rounds = max( [0] + [ len(resultsDicts) for resultsDicts in resultsSamples ] )
+    xeb = numpy.full( ( len(resultsSamples), rounds ), numpy.nan )
+    
+    def getSlice ( gateSample, s ):
+        return pairArray( gateSample[s], pairs ) if s<len(gateSample) else numpy.zeros( len(index['names']) )
+    
+    batch = simulator.batchSize( num )
+    for start in range( 0, len(resultsSamples), batch ):
+        
+        games = range( start, min( start+batch, len(resultsSamples) ) )
+        states = simulator.initialStates( len(games), num )
+        
+        for score in range(rounds):
+            
+            create = numpy.array( [ getSlice( gateSamples[j], 2*score ) for j in games ] )
+            
+            # the circuit for this round
+            puzzles = states.copy()
+            simulatePairs( puzzles, num, index, create, entangleType )
+            probs = simulator.probabilities( puzzles )
+            
+            for b, j in enumerate(games):
+                if score<len(resultsSamples[j]) and distributions.isDistribution( resultsSamples[j][score] ):
+                    codes, observed = distributions.getSupport( resultsSamples[j][score] )
+                    spread = dimension*( probs[b]**2 ).sum() - 1
+                    if spread>1e-9:
+                        xeb[j,score] = ( dimension*observed.dot( probs[b][codes] )/observed.sum() - 1 )/spread
+            
+            # the state at the start of the next round, with the conjugated gates of this round
+            if score<rounds-1:
+                remove = numpy.array( [ getSlice( gateSamples[j], 2*score+1 ) for j in games ] )
+                conjugates = [ conjugateSamples[j][score] if score<len(conjugateSamples[j]) else [['X',0]]*num for j in games ]
+                isX = numpy.array( [ [ conjugate[v][0]=='X' for v in range(num) ] for conjugate in conjugates ] )
+                fracs = numpy.array( [ [ conjugate[v][1] for v in range(num) ] for conjugate in conjugates ], dtype=float )
+                for v in active:
+                    simulator.rotate( states, num, v, isX[:,v], -fracs[:,v] )
+                simulatePairs( states, num, index, create+remove, entangleType )
+                for v in active:
+                    simulator.rotate( states, num, v, isX[:,v], fracs[:,v] )
+    
+    return xeb
+
+
+def getXEBArray ( device, move, shots, sim, folder='' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify saved data.
+    #
+    # Process:
+    # * The games with full results in the results file (see matchResults() ) are found, and the XEB fidelity is calculated for each of their rounds (see calculateXEB() ).
+    #
+    # Output:
+    # * *xeb* - Array with a row for each of these games and a column for each round (with no rows if there is no results file, such as for simulated runs).
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    
+    oneProbSamples = resultsLoad ( 'oneProbs', move, shots, sim, device, folder=folder )
+    rounds = max( [0] + [ len(oneProbs) for oneProbs in oneProbSamples ] )
+    
+    if not catalog.dataAvailable( resultsPath, device, move, shots, sim, fileTypes=['results'], folder=folder ):
+        return numpy.zeros( ( 0, rounds ) )
+    
+    resultsSamples = [ [ resultsFiles.loadResults( resultsPath, device, entry, num, shots ) for entry in resultsDicts ] for resultsDicts in resultsLoad ( 'results', move, shots, sim, device, folder=folder ) ]
+    gateSamples = resultsLoad ( 'gates', move, shots, sim, device, folder=folder )
+    conjugateSamples = loadConjugates ( move, shots, sim, device, folder=folder )
+    
+    matched = [ [ resultsDicts, game ] for resultsDicts, game in zip( resultsSamples, matchResults( resultsSamples, oneProbSamples ) ) if game is not None ]
+    
+    xeb = calculateXEB( device, [ gateSamples[game] for resultsDicts, game in matched ], [ conjugateSamples[game] for resultsDicts, game in matched ], [ resultsDicts for resultsDicts, game in matched ] )
+    
+    return numpy.concatenate( [ xeb, numpy.full( ( len(xeb), rounds-xeb.shape[1] ), numpy.nan ) ], axis=1 )
+
+
+def getCorrelations ( results, shots ):
+    
+    # Input:
+    # * *results* - Distribution of the results for a round (see distributions.py), or a job id.
+    # * *shots* - Number of shots used, for results that don't say.
+    #
+    # Process:
+    # * The probability that each pair of qubits gives the same result is found for all pairs at once (see distributions.sameMatrix() ), and turned into a number of shots.
+    #
+    # Output:
+    # * *correlations* - List of the number of shots for which qubits v0 and v1 gave the same result, for each v0<v1 (in the order v0=0,v1=1; v0=0,v1=2; ... v0=1,v1=2; ...). This is None if *results* is a job id.
+    
+    if not distributions.isDistribution( results ):
+        return None
+    
+    if results['shots'] is not None:
+        shots = results['shots']
+    
+    v0, v1 = numpy.triu_indices( results['num'], 1 )
+    
+    return numpy.rint( distributions.sameMatrix( results )[v0,v1]*shots ).astype(int).tolist()
+
+
+def getCorrelationArrays ( correlationSamples, num, shots, zz=False ):
+    
+    # Input:
+    # * *correlationSamples* - Correlations for many samples, as loaded by resultsLoad() (or as given by getCorrelations() for each round).
+    # * *num* - The number of qubits in the device.
+    # * *shots* - Number of shots used.
+    # * *zz* - Boolean determining whether the ZZ correlation ( 2*sameProb-1 ) is given instead of the sameProb.
+    #
+    # Output:
+    # * *same* - Array with same[j,s,v0,v1] as the sameProb for qubits v0 and v1 in round s of sample j (or nan for rounds with no results, or that the sample doesn't reach).
+    
+    rounds = max( [0] + [ len(correlationSample) for correlationSample in correlationSamples ] )
+    v0, v1 = numpy.triu_indices( num, 1 )
+    
+    same = numpy.full( ( len(correlationSamples), rounds, num, num ), numpy.nan )
+    for j, correlationSample in enumerate(correlationSamples):
+        for score, correlations in enumerate(correlationSample):
+            if correlations is not None:
+                same[j,score,v0,v1] = numpy.array( correlations )/shots
+                same[j,score,v1,v0] = same[j,score,v0,v1]
+                same[j,score,range(num),range(num)] = 1
+    
+    if zz:
+        same = 2*same - 1
+    
+    return same
+
+
+def CorrelationData ( device, move, shots, sim, zz=False, folder='' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify saved data.
+    # * *zz* - See getCorrelationArrays().
+    #
+    # Process:
+    # * The correlations between all pairs of qubits are loaded from the 'correlations' file (saved by GetData() with *correlations=True* ).
+    #   If there is no such file, they are found from the results file instead (see getCorrelations() ), for each game and round whose results were saved.
+    #   This shows crosstalk and leakage between qubits that are not in *pairs*, which the sameProbs do not cover.
+    #
+    # Output:
+    # * *same* - Array of the sameProb (or ZZ correlation) for every pair of qubits in every round of each sample (see getCorrelationArrays() ).
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    
+    if catalog.dataAvailable( resultsPath, device, move, shots, sim, fileTypes=['correlations'], folder=folder ):
+        correlationSamples = resultsLoad ( 'correlations', move, shots, sim, device, folder=folder )
+    else:
+        correlationSamples = [ [ getCorrelations( resultsFiles.loadResults( resultsPath, device, entry, num, shots ), shots ) for entry in resultsDicts ] for resultsDicts in resultsLoad ( 'results', move, shots, sim, device, folder=folder ) ]
+    
+    return getCorrelationArrays( correlationSamples, num, shots, zz=zz )
+
+
+def getSpectrumArrays ( resultsSamples, num ):
+    
+    # Input:
+    # * *resultsSamples* - List with a list of the results of each round (distributions or job ids) for many samples.
+    # * *num* - The number of qubits in the device.
+    #
+    # Output:
+    # * *weights* - Array with weights[j,s,k] as the total squared correlator for sets of k qubits in round s of sample j (see distributions.correlatorWeights() ), or nan for rounds with no results.
+    
+    rounds = max( [0] + [ len(resultsDicts) for resultsDicts in resultsSamples ] )
+    
+    weights = numpy.full( ( len(resultsSamples), rounds, num+1 ), numpy.nan )
+    for j, resultsDicts in enumerate(resultsSamples):
+        for score, results in enumerate(resultsDicts):
+            if distributions.isDistribution( results ):
+                weights[j,score] = distributions.correlatorWeights( results )
+    
+    return weights
+
+
+def SpectrumData ( device, move, shots, sim, folder='' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify saved results, for which the results file must exist (and so only real devices can be used).
+    #
+    # Process:
+    # * For the full results of each round, the Z correlators for all sets of qubits are found (with a Walsh-Hadamard transform), and their squares are added up for sets of each size k (see distributions.correlatorWeights() ).
+    #   As noise spreads correlations through the device, the weight moves to larger k. The average k, weighted by these, is found for each round of each game.
+    #   Unlike the fuzz (see calculateFuzz() ), which only looks at single qubits, this looks at correlations of all orders.
+    #
+    # Output:
+    # * *weightAvs* - List with an entry for each round, which is a list of the average weight for each k.
+    # * *orderAvs* - List of the average and variance of the average k (for k>0) for each round.
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    
+    resultsSamples = [ [ resultsFiles.loadResults( resultsPath, device, entry, num, shots ) for entry in resultsDicts ] for resultsDicts in resultsLoad ( 'results', move, shots, sim, device, folder=folder ) ]
+    weights = getSpectrumArrays( resultsSamples, num )
+    
+    # rounds for which the correlations have (within statistical noise) all gone have no average order
+    total = weights[:,:,1:].sum( axis=2 )
+    with numpy.errstate( invalid='ignore', divide='ignore' ):
+        orders = numpy.where( total>0, weights[:,:,1:].dot( numpy.arange(1,num+1) )/total, numpy.nan )
+    
+    weightAvs = []
+    orderAvs = []
+    for score in range(weights.shape[1]):
+        found = ~numpy.isnan( weights[:,score,0] )
+        weightAvs.append( weights[found,score].mean( axis=0 ).tolist() )
+        order = orders[:,score][ ~numpy.isnan( orders[:,score] ) ]
+        mean = order.mean() if len(order) else math.nan
+        orderAvs.append( [ float(mean), float( (order**2).mean() - mean**2 ) if len(order) else math.nan ] )
+    
+    return weightAvs, orderAvs
+
+
+def getDataArrays ( oneProbSamples, sameProbSamples, gateSamples, pairs ):
+    
+    # Input:
+    # * *oneProbSamples*, *sameProbSamples*, *gateSamples* - Data for many samples, as loaded by resultsLoad()
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    #
+    # Process:
+    # * The data is put into numpy arrays, with pair quantities in the order given by getPairIndex(). It is assumed that all samples have the same number of rounds.
+    # 
+    # Output:
+    # * *oneProbs* - Array with oneProbs[j,s,n] as the oneProb value for qubit n in round s (numbered from 0) of sample j
+    # * *sameProbs* - Array with sameProbs[j,s,k] as the sameProb value for the kth pair
+    # * *fracs* - Array with fracs[j,s,k] as the frac of the gate used to create the puzzle for the kth pair, or nan for pairs not in the puzzle
+    
+    index = getPairIndex( pairs )
+    
+    oneProbs = numpy.array( oneProbSamples, dtype=float )
+    sameProbs = numpy.array( [ [ [ sameProb[p] for p in index['names'] ] for sameProb in sameProbSample ] for sameProbSample in sameProbSamples ], dtype=float )
+    fracs = numpy.array( [ [ [ gateSample[2*score].get(p,math.nan) for p in index['names'] ] for score in range(oneProbs.shape[1]) ] for gateSample in gateSamples ], dtype=float )
+    
+    return oneProbs, sameProbs, fracs
+
+
+def getPairIndex ( pairs ):
+    
+    # Input:
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    #
+    # Process:
+    # * Arrays that describe the pairs are made (and remembered, so this is only done once for each set of pairs).
+    # 
+    # Output:
+    # * *index* - Dictionary containing
+    #     - 'names': list of pair names, giving the order used for pairs in arrays
+    #     - 'position': dictionary with pair names as keys and their position in 'names' as values
+    #     - 'q0', 'q1': arrays of the two qubits of each pair
+    #     - 'incident', 'neighbour': arrays with a row for each qubit, listing the pairs it is part of and the other qubit in each (padded with -1)
+    #     - 'fake': boolean array that is True for fake pairs (those whose names start with 'fake', see devices.py)
+    #     - 'edges': dictionary with tuples of the two qubits of each pair (in order) as keys and the position of the pair as values
+    
+    key = tuple( (p,pairs[p][0],pairs[p][1]) for p in pairs )
+    if key in pairIndices:
+        return pairIndices[key]
+    
+    names = list(pairs.keys())
+    q0 = numpy.array( [ pairs[p][0] for p in names ], dtype=int )
+    q1 = numpy.array( [ pairs[p][1] for p in names ], dtype=int )
+    
+    num = 1 + max( [0] + list(q0) + list(q1) )
+    incident = [ [] for _ in range(num) ]
+    neighbour = [ [] for _ in range(num) ]
+    for k, p in enumerate(names):
+        for j in range(2):
+            incident[ pairs[p][j] ].append( k )
+            neighbour[ pairs[p][j] ].append( pairs[p][(j+1)%2] )
+    degree = max( [1] + [ len(ks) for ks in incident ] )
+    for n in range(num):
+        incident[n] += [-1]*( degree-len(incident[n]) )
+        neighbour[n] += [-1]*( degree-len(neighbour[n]) )
+    
+    index = { 'names':names, 'position':{ p:k for k,p in enumerate(names) }, 'q0':q0, 'q1':q1,
+              'incident':numpy.array( incident, dtype=int ), 'neighbour':numpy.array( neighbour, dtype=int ),
+              'fake':numpy.array( [ p[0:4]=='fake' for p in names ], dtype=bool ).reshape(len(names)),
+              'edges':{ (pairs[p][0],pairs[p][1]):k for k,p in enumerate(names) } }
+    pairIndices[key] = index
+    
+    return index
+
+# indices made by getPairIndex()
+pairIndices = {}
+
+
+def pairArray ( values, pairs, default=0.0 ):
+    
+    # Input:
+    # * *values* - Dictionary with pair names as keys (such as a sameProb, or the gates of a slice), or an array that is already in the order of getPairIndex().
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    # * *default* - Value used for pairs that are not in *values* (such as nan for the pairs without gates in a slice).
+    #
+    # Output:
+    # * *array* - Array of floats with an entry for each pair, in the order given by getPairIndex().
+    
+    if not isinstance( values, dict ):
+        return numpy.asarray( values, dtype=float )
+    
+    return numpy.array( [ values.get(p,default) for p in getPairIndex( pairs )['names'] ], dtype=float ).reshape( len(pairs) )
+
+
+def pairDict ( array, pairs, order=None ):
+    
+    # Input:
+    # * *array* - Array with an entry for each pair, in the order given by getPairIndex(). Entries that are nan are left out (as for pairs without gates in a slice).
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    # * *order* - Positions of the pairs in the order they should appear in the dictionary (by default, all in the order given by getPairIndex()).
+    #
+    # Output:
+    # * *values* - Dictionary with pair names as keys, and the values as Python floats (so that it can be saved with str() and loaded with eval()).
+    
+    names = getPairIndex( pairs )['names']
+    if order is None:
+        order = range(len(names))
+    
+    return { names[k]: float( array[k] ) for k in order if not math.isnan( array[k] ) }
+
+
+def formatRows ( values, names=None ):
+    
+    # Input:
+    # * *values* - 2D array with a row for each string to be made. Entries that are nan are left out (as for pairs without gates in a slice).
+    # * *names* - Names for the columns, such as those of the pairs in the order given by getPairIndex() (or None).
+    #
+    # Process:
+    # * Rows are grouped by which of their entries are nan, and all the rows of each group are formatted by a single string formatting operation.
+    #
+    # Output:
+    # * *rows* - List of strings for the rows, the same as str() would give for the list of each row (if *names* is None) or for the dictionary given by pairDict() (if not).
+    
+    values = numpy.asarray( values, dtype=float )
+    
+    rows = [None]*len(values)
+    if len(values)==0:
+        return rows
+    
+    # rows are grouped using the bits of which entries are present, packed into 64 bit words
+    present = ~numpy.isnan( values )
+    packed = numpy.packbits( present, axis=1 )
+    packed = numpy.pad( packed, ( (0,0), (0,-packed.shape[1]%8) ) ).view( numpy.uint64 )
+    if packed.shape[1]==1:
+        keys, groups = numpy.unique( packed[:,0], return_inverse=True )
+    else:
+        keys, groups = numpy.unique( packed, axis=0, return_inverse=True )
+    groups = groups.reshape(-1)
+    
+    order = numpy.argsort( groups, kind='stable' )
+    ends = numpy.cumsum( numpy.bincount( groups ) )
+    for group in range(len(keys)):
+        members = order[ ends[group-1] if group>0 else 0 : ends[group] ]
+        columns = numpy.nonzero( present[ members[0] ] )[0]
+        if names is None:
+            template = '[' + ', '.join( ['%r']*len(columns) ) + ']'
+        else:
+            template = '{' + ', '.join( [ repr( names[k] ).replace('%','%%') + ': %r' for k in columns ] ) + '}'
+        text = ( (template+'\n')*len(members) ) % tuple( values[ numpy.ix_( members, columns ) ].ravel().tolist() )
+        for j, row in zip( members.tolist(), text.split('\n') ):
+            rows[j] = row
+    
+    return rows
+
+
+def calculateMutualArray ( oneProbs, sameProbs, pairs ):
+    
+    # As calculateMutual(), but for arrays of oneProb and sameProb values (with pairs in the order of getPairIndex()) in which the last axis is for qubits or pairs, and the others can be for any number of samples and rounds.
+    # The mutual information is returned as an array of the same shape as sameProbs.
     
-    # make sure X axis is fully labelled
-    plt.xticks(X)
+    index = getPairIndex( pairs )
     
+    p0 = oneProbs[...,index['q0']]
+    p1 = oneProbs[...,index['q1']]
     
-    # logarithms if required
-    if log==True:
-        plt.yscale('log')
-
-    # make the graph
-    plt.show()
+    e0 = 1-2*p0
+    e1 = 1-2*p1
+    e2 = 1-2*(1-sameProbs)
+    prob = numpy.stack( [ (1+e0+e1+e2)/4, (1-e0+e1-e2)/4, (1+e0-e1-e2)/4, (1-e0-e1+e2)/4 ] )
     
-    plt.rcParams.update(plt.rcParamsDefault)
+    def entropy ( probs ):
+        with numpy.errstate(divide='ignore',invalid='ignore'):
+            terms = numpy.where( probs>0, -probs*( numpy.log(probs)/math.log(2) ), 0 )
+        return terms.sum(axis=0)
+    
+    H0 = entropy( numpy.stack( [1-p0,p0] ) )
+    H1 = entropy( numpy.stack( [1-p1,p1] ) )
+    I = H0 + H1 - entropy( prob )
+    
+    Hmin = numpy.minimum( H0, H1 )
+    with numpy.errstate(divide='ignore',invalid='ignore'):
+        I = numpy.where( (I>1e-3) & (Hmin>0), I/Hmin, I )
+    
+    return I
 
 
-def GetData ( device, move, shots, sim, samples, maxScore ):
+def getCleaningPartners ( rawOneProbs, sameProbs, pairs ):
     
     # Input:
-    # * *device* - String specifying the device on which the game is played.
-    #              Details about the device will be obtained using getLayout.
-    # * *move* - String describing the way moves are chosen.
-    # * *shots* - Number of shots to be used for statistics.
-    # * *sim* - Boolean for whether the simulator is to be used.
-    # * *samples* - Number of full games to run
-    # * *maxScore* - Number of rounds to run each game for
+    # * *rawOneProbs*, *sameProbs* - Arrays of oneProb and sameProb values, as made by getDataArrays(), or for any number of samples and rounds
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
     #
     # Process:
-    # * The game is the required number of times with the given specs. The information supplied by runGame() is then saved to file.
+    # * For each qubit, the neighbour with which it has the highest mutual information is found. This is done for all samples and rounds at once.
     # 
     # Output:
-    # * Nothing is returned, but the collected data is saved to file.
+    # * *partners* - Array of the same shape as rawOneProbs, giving the most correlated neighbour of each qubit (or the qubit itself if it has no correlated neighbour).
     
-    for sample in range(samples):
-
-        print("move="+move+", shots="+str(shots)+", sample=" + str(sample+1) )
+    index = getPairIndex( pairs )
+    num = rawOneProbs.shape[-1]
+    
+    I = calculateMutualArray( rawOneProbs, sameProbs, pairs )
+    
+    # the mutual information for each pair of each qubit (with 0 for padding, since only positive values count)
+    incident = -numpy.ones( (num,index['incident'].shape[1]), dtype=int )
+    neighbour = -numpy.ones( (num,index['incident'].shape[1]), dtype=int )
+    incident[:len(index['incident'])] = index['incident'][:num]
+    neighbour[:len(index['neighbour'])] = index['neighbour'][:num]
+    incidentI = I[...,incident]
+    incidentI = numpy.where( (incident>=0) & ~numpy.isnan(incidentI), incidentI, 0 )
+    best = numpy.argmax( incidentI, axis=-1 )
+    bestI = numpy.max( incidentI, axis=-1 )
+    
+    partners = neighbour[ numpy.arange(num), best ]
+    partners = numpy.where( bestI>0, partners, numpy.arange(num) )
+    
+    return partners
 
-        gates, conjugates, oneProbs, sameProbs, resultsDicts = runGame( device, move, shots, sim, maxScore=maxScore )
 
-        # make a directory for this device if it doesn't already exist
-        if not os.path.exists(path+'/results/' + device):
-            os.makedirs(path+'/results/' + device)
+def cleanOneProbs ( x, rawOneProbs, partners ):
+    
+    # Input:
+    # * *x* - Cleaning profile (see CleanData()), or an array of them whose shape matches the start of the shape of rawOneProbs (such as one for each round)
+    # * *rawOneProbs* - Array of oneProb values, with the last axis for qubits
+    # * *partners* - The corresponding output of getCleaningPartners()
+    #
+    # Output:
+    # * *oneProbs* - The oneProb values after the transform described in CleanData() has been applied
+    
+    x = numpy.array( x, dtype=float )
+    x = x.reshape( x.shape[:-1] + (-1,3) )
+    
+    # get the oneProb of each partner (for all samples and rounds)
+    positions = list( numpy.indices( partners.shape ) )
+    positions[-1] = partners
+    partnerOneProbs = rawOneProbs[ tuple(positions) ]
+    
+    oneProbs = x[...,0] * rawOneProbs + x[...,1] * partnerOneProbs + x[...,2]
+    
+    return numpy.clip( oneProbs, 0, 1 )
 
-        filename = 'move=' + move + '_shots=' + str(shots) + '_sim=' + str(sim) + '.txt'
 
-        saveFile = open(path+'/results/' + device + '/oneProbs_'+filename, 'a')
-        saveFile.write( str(oneProbs)+'\n' )
-        saveFile.close()
-        
-        saveFile = open(path+'/results/' + device + '/sameProbs_'+filename, 'a')
-        saveFile.write( str(sameProbs)+'\n' )
-        saveFile.close()
+def calculateQualityArrays ( oneProbs, fracs, pairs ):
+    
+    # Input:
+    # * *oneProbs* - Array of oneProb values, with the last axis for qubits (such as made by getDataArrays(), and perhaps cleaned by cleanOneProbs())
+    # * *fracs* - Corresponding array of fracs for the puzzles (as made by getDataArrays())
+    # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
+    #
+    # Process:
+    # * For every sample and round, the fuzz (see calculateFuzz()), and the fraction of correct MWPM guesses and difference of frac values (see CalculateQuality()) are calculated.
+    #   Everything but the matching itself is done for all samples and rounds at once.
+    # 
+    # Output:
+    # * *fuzz*, *correct*, *difference* - Arrays of the above quantities, with the shape of oneProbs without its last axis
+    
+    index = getPairIndex( pairs )
+    
+    p0 = oneProbs[...,index['q0']]
+    p1 = oneProbs[...,index['q1']]
+    used = ~numpy.isnan( fracs )
+    counts = used.sum(axis=-1)
+    
+    fuzz = numpy.where( used, numpy.abs( p0-p1 ), 0 ).sum(axis=-1) / counts
+    
+    guessedFracs = numpy.arcsin( numpy.sqrt( numpy.clip( (p0+p1)/2, 0, 1 ) ) ) * 2 / math.pi
+    difference = numpy.where( used, numpy.abs( guessedFracs - numpy.where(used,fracs,0) ), 0 ).sum(axis=-1) / counts
+    
+    # weights for MWPM (see getDisjointPairs)
+    qubitFracs = numpy.arcsin( numpy.sqrt( numpy.clip( oneProbs, 0, 1 ) ) ) * 2 / math.pi
+    delta = numpy.abs( qubitFracs[...,index['q0']] - qubitFracs[...,index['q1']] )
+    weights = -numpy.minimum( delta, 1-delta )
+    
+    correct = numpy.zeros( counts.shape )
+    flatWeights = weights.reshape( -1, weights.shape[-1] )
+    flatUsed = used.reshape( -1, used.shape[-1] )
+    flatCorrect = correct.reshape(-1)
+    for j in range(len(flatCorrect)):
+        flatCorrect[j] = flatUsed[ j, getMatching( pairs, [], flatWeights[j] ) ].sum() / flatUsed[j].sum()
+    
+    return fuzz, correct, difference
 
-        saveFile = open(path+'/results/' + device + '/gates_'+filename, 'a')
-        saveFile.write( str(gates)+'\n' )
-        saveFile.close()
 
-        saveFile = open(path+'/results/' + device + '/conjugates_'+filename, 'a')
-        saveFile.write( str(conjugates)+'\n' )
-        saveFile.close()
-        
-        if sim==False:
-            saveFile = open(path+'/results/' + device + '/results_'+filename, 'a')
-            saveFile.write( str(resultsDicts)+'\n' )
-            saveFile.close()
-        
-        
 def CalculateQuality ( x, oneProbSamples, sameProbSamples, gateSamples, pairs, score ) :
         
     # Input:
@@ -1201,102 +2855,69 @@ def CalculateQuality ( x, oneProbSamples, sameProbSamples, gateSamples, pairs, s
     #     * The average fraction of pairs that are guessed correctly by MWPM (see getDisjointPairs() for how this is done)
     #     * The average difference between the frac value we get from calculateFrac(oneProb) and the actual value of frac used
     #       (actually it is the average oneProb for the two qubits in each correct pair that is used)
+    # * The calculations are done for all samples at once using calculateQualityArrays()
     # 
     # Output:
     # * *fractionCorrect* - Array of two values: the mean of the fraction of pairs that are correct, and the variance of this
     # * *fracDifference* - Array of two values: the mean of the difference between measured and correct frac values, and the variance of this
-        
-    # see what fraction of the matchings we have correct
     
-    fractionCorrect = [0 for _ in range(2)]
-    fracDifference = [0 for _ in range(2)]
-    for oneProbs, sameProbs, gates in zip(oneProbSamples, sameProbSamples, gateSamples):
-        
-        oneProb = oneProbs[score-1]
-        sameProb = sameProbs[score-1]
-        
-        if x!=[]:
-            rawOneProb = copy.deepcopy(oneProb)
-            oneProb = CleanData ( x, rawOneProb, sameProb, pairs )
-
-        gate = gates[ 2*(score-1) ]
-        
-        matchingPairs = list(gate.keys())
-        guessedPairs = getDisjointPairs( pairs, oneProb, {} )
-        correctGuesses = list( set(guessedPairs).intersection( set(matchingPairs) ) )
-        dC = len(correctGuesses) / len(matchingPairs)
-        fractionCorrect[0] += dC # for mean
-        fractionCorrect[1] += ( dC )**2 # for variance
- 
-        dD = 0
-        for p in gate.keys():
-            
-            guessedOneProb = 0
-            for j in range(2):
-                guessedOneProb += oneProb[ pairs[p][j] ]/2
-            
-            dD += abs( calculateFrac(guessedOneProb)-gate[p] ) / len(gate)
-        
-        fracDifference[0] += dD # for mean
-        fracDifference[1] += ( dD )**2 # for variance
-            
-    sample_num = len( oneProbSamples )
+    oneProbs, sameProbs, fracs = getDataArrays( [ oneProbs[score-1:score] for oneProbs in oneProbSamples ],
+                                                [ sameProbs[score-1:score] for sameProbs in sameProbSamples ],
+                                                [ gates[2*(score-1):2*score] for gates in gateSamples ], pairs )
     
-    fractionCorrect[0] = fractionCorrect[0] / sample_num
-    fractionCorrect[1] = fractionCorrect[1] / sample_num
-    fractionCorrect[1] -= fractionCorrect[0]**2
+    if x!=[]:
+        oneProbs = cleanOneProbs( x, oneProbs, getCleaningPartners( oneProbs, sameProbs, pairs ) )
         
-    fracDifference[0] = fracDifference[0] / sample_num
-    fracDifference[1] = fracDifference[1] / sample_num
-    fracDifference[1] -= fracDifference[0]**2
+    fuzz, correct, difference = calculateQualityArrays( oneProbs, fracs, pairs )
+    
+    fractionCorrect = [ correct.mean(), (correct**2).mean() - correct.mean()**2 ]
+    fracDifference = [ difference.mean(), (difference**2).mean() - difference.mean()**2 ]
                 
     return fractionCorrect, fracDifference
 
 
+def getCleaningMatches ( rawOneProb, sameProb, pairs ):
+    
+    # Input:
+    # * *rawOneProb*, *sameProb*, *pairs* - See CleanData()
+    #
+    # Process:
+    # * For each qubit, the neighbour with which it has the highest mutual information is found (using getCleaningPartners()).
+    # 
+    # Output:
+    # * *matches* - Dictionary with qubits as keys and their most correlated neighbour as values. Qubits with no correlated neighbour are not included.
+    
+    partners = getCleaningPartners( numpy.array( rawOneProb, dtype=float ), pairArray( sameProb, pairs ), pairs )
+    
+    matches = {}
+    for n in range(len(rawOneProb)):
+        if partners[n]!=n:
+            matches[n] = int(partners[n])
+                        
+    return matches
+
+
 def CleanData ( x, rawOneProb, sameProb, pairs ):
     
     # Input:
     # * **x* - Array of values used to perform an independent linear transformation on each qubit
     # * *rawOneProb* - A list with an entry for each qubit. Each entry is the fraction of samples for which the measurement of that qubit returns *1*.
-    # * *sameProb* - A dictionary with pair names as keys, and probability that the two qubits each pair give the same results as values.
+    # * *sameProb* - An array with the probability that the two qubits of each pair give the same result (see processResults() ), or a dictionary with pair names as keys and these probabilities as values.
     # * *pairs* - A dictionary with names of pairs as keys and lists of the two qubits of each pair as values
     #
     # Process:
     # * Each oneProb in the input is transformed according to the following linear transformation, given values from x
     # * oneProb[n] = x[3*n] * rawOneProb[n] + x[3*n+1] * rawOneProb[match] + x[3*n+2]
     # * Here n is the qubit to which we are applying the tranformation, and match is the qubit that is most correlated with n
+    # * To clean many samples and rounds at once, use getCleaningPartners() and cleanOneProbs() directly
     # 
     # Output:
     # * *oneProb* - The oneProb values after the transform has been applied
     
-    I = calculateMutual ( rawOneProb, sameProb, pairs )
-    
-    matches = {}
-    for n in range(len(rawOneProb)):
-        maxI = 0
-        for p in pairs:
-            for j in range(2):
-                if n==pairs[p][j]:
-                    if I[p]>maxI:
-                        maxI = I[p]
-                        matches[n] = pairs[p][(j+1)%2]
-
-    oneProb = []
-        
-    for n in range(len(rawOneProb)):
-        
-        if n in matches.keys():
-            match = matches[n]
-        else:
-            match = n
-
-        newOneProb = x[3*n] * rawOneProb[n] + x[3*n+1] * rawOneProb[match] + x[3*n+2]
-        newOneProb = min(1,newOneProb)
-        newOneProb = max(0,newOneProb)
+    rawOneProbs = numpy.array( rawOneProb, dtype=float )
+    partners = getCleaningPartners( rawOneProbs, pairArray( sameProb, pairs ), pairs )
 
-        oneProb.append( newOneProb )
-
-    return oneProb
+    return cleanOneProbs( x, rawOneProbs, partners ).tolist()
 
 
 def getCleaningProfile ( device, move, shots, sim, num, maxScore, gritty=False ):
@@ -1309,15 +2930,15 @@ def getCleaningProfile ( device, move, shots, sim, num, maxScore, gritty=False )
     #
     # Process:
     # * This function obtains an array of cleaning profiles x (see CleanData() for more details on these).
-    # * This is done by loading them from a save file if one exists
+    # * This is done by loading them from a save file if the catalog says that one exists
     # * If not, a generic one is made. This made to not make things look artificially perfect when a human is playing.
     # 
     # Output:
     # * An arrays of cleaning profiles x, with one for each round
     
-    try: # see if a specific cleaner file has been made
+    if catalog.dataAvailable( resultsPath, device, move, shots, sim, fileTypes=['cleaner'] ): # see if a specific cleaner file has been made
         cleaner = resultsLoad( 'cleaner', move, shots, sim, device )[0]
-    except: # if not, go with the default
+    else: # if not, go with the default
         if gritty:
             cleaner = [[0.5,0.5,0]*num]*maxScore
         else:
@@ -1326,78 +2947,473 @@ def getCleaningProfile ( device, move, shots, sim, num, maxScore, gritty=False )
     return cleaner
     
 
-def ProcessData ( device, move, shots, sim, cleanup):
+# data used by the processes that evaluate cleaning profiles (see CreateCleaningProfile), set by setCleaningData
+cleaningData = {}
+
+def setCleaningData ( data ):
+    
+    # Stores the data required by cleaningCorrectness(), so that it doesn't need to be sent to worker processes for every evaluation.
+    
+    cleaningData.clear()
+    cleaningData.update( data )
+
+
+def cleaningCorrectness ( task ):
     
     # Input:
-    # * *device* - String specifying the device on which the game is played.
-    # * *move* - String describing the way moves were chosen for the results to be loaded.
-    # * *shots* - Number of shots used in the results to be loaded.
-    # * *sim* - Boolean denoting whether a simulator was used for the results to be loaded.- 
-    # * *cleanup* - Boolean determining whether error mitigation post-processing is used
+    # * *task* - List of [ score, x ], where *score* is the round (numbered from 0) and *x* is a cleaning profile (see CleanData()).
     #
     # Process:
-    # * The inputs specify data for a given set of runs that are loaded from file, and then used to calculate quantities that tell us how well the game was implemented. These are then returned as outputs.
+    # * The cleaning profile is applied to the oneProbs of all samples for the given round at once, using the data stored by setCleaningData().
+    #   The result is used to calculate the fraction of correct MWPM guesses with calculateQualityArrays().
+    #
+    # Output:
+    # * *correctness* - The average fraction of pairs that MWPM guesses correctly (as in CalculateQuality()).
+    
+    score, x = task
+    
+    oneProbs = cleanOneProbs( x, cleaningData['oneProbs'][:,score], cleaningData['partners'][:,score] )
+    
+    fuzz, correct, difference = calculateQualityArrays( oneProbs, cleaningData['fracs'][:,score], cleaningData['pairs'] )
+    
+    return float( correct.mean() )
+
+
+def CreateCleaningProfile ( device, move, shots, sim, sweeps=4, step=0.2, workers=None ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim* - Details that specify the saved results for which the profile is made (see resultsLoad())
+    # * *sweeps* - Number of times to go through all qubits when looking for improvements
+    # * *step* - Initial size of the changes made to the values of the cleaning profile
+    # * *workers* - Number of processes to use (by default, one for each CPU)
+    #
+    # Process:
+    # * A cleaning profile x (see CleanData()) is found for each round, to maximize the fraction of pairs guessed correctly by MWPM (as calculated by CalculateQuality()).
+    # * The most correlated neighbour of each qubit doesn't depend on x, so this is found for all samples and rounds only once. Each x is then evaluated for all samples at once (see cleaningCorrectness()).
+    # * The search starts from whichever of the default profile and no cleaning is best. Then for each active qubit, small changes are tried for each of its three values.
+    #   All these changes, for all qubits and rounds, are evaluated in parallel. For each round, the best change for each qubit are then combined, and kept if that helps.
+    #   If no change helps, the step size is halved.
+    # * The profiles are saved to a 'cleaner' file, for use by getCleaningProfile().
     # 
     # Output:
-    # * *fuzzAvs* - Array of the average and variance of the fuzz (see calculateFuzz() ) for each round
-    # * *correctFracs* - Array of fractionCorrect (see calculateQuality() ) for each round
-    # * *differenceFracs* - Array of fracDifference (see calculateQuality() ) for each round
+    # * *cleaner* - Array of cleaning profiles x, with one for each round
+    
+    import multiprocessing
     
     num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
     
-    filename = 'move=' + move + '_shots=' + str(shots) + '_sim=' + str(sim) + '.txt'
-        
     oneProbSamples = resultsLoad ( 'oneProbs', move, shots, sim, device )
     sameProbSamples = resultsLoad ( 'sameProbs', move, shots, sim, device )
     gateSamples = resultsLoad ( 'gates', move, shots, sim, device )
     
+    maxScore = len(oneProbSamples[0])
+    
+    # the most correlated neighbour of each qubit doesn't depend on the profile, so it is found for all samples and rounds here
+    oneProbs, sameProbs, fracs = getDataArrays( oneProbSamples, sameProbSamples, gateSamples, pairs )
+    data = { 'pairs':pairs, 'oneProbs':oneProbs, 'fracs':fracs, 'partners':getCleaningPartners( oneProbs, sameProbs, pairs ) }
+    
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers>1:
+        pool = multiprocessing.Pool( workers, initializer=setCleaningData, initargs=(data,) )
+        evaluate = lambda tasks: pool.map( cleaningCorrectness, tasks )
+    else:
+        setCleaningData( data )
+        evaluate = lambda tasks: [ cleaningCorrectness(task) for task in tasks ]
+        
+    # the workers are stopped even if the search fails, so that they aren't left running
+    try:
+        
+        # start with whichever of the default profile and no cleaning is best
+        starts = [ [0.45,0.55,0]*num, [1,0,0]*num ]
+        results = evaluate( [ [score,x] for score in range(maxScore) for x in starts ] )
+        cleaner = []
+        best = []
+        for score in range(maxScore):
+            j = numpy.argmax( results[2*score:2*score+2] )
+            cleaner.append( starts[j][:] )
+            best.append( results[2*score+j] )
+        steps = [step]*maxScore
+        
+        for sweep in range(sweeps):
+            
+            # try changing each value for each active qubit, for all rounds
+            tasks = []
+            changes = []
+            for score in range(maxScore):
+                for n in pos.keys():
+                    for k in range(3):
+                        for sign in [-1,+1]:
+                            x = cleaner[score][:]
+                            x[3*n+k] += sign * steps[score] * (1 - 0.9*(k==2)) # smaller changes for the constant
+                            tasks.append( [score,x] )
+                            changes.append( [score,n,x[3*n:3*n+3]] )
+            results = evaluate( tasks )
+            
+            # for each round, find the best change for each qubit
+            bestChanges = [ {} for _ in range(maxScore) ]
+            for result, ( score, n, values ) in zip( results, changes ):
+                if result>best[score] and ( n not in bestChanges[score] or result>bestChanges[score][n][0] ):
+                    bestChanges[score][n] = [ result, values ]
+            
+            # then try them all together
+            tasks = []
+            for score in range(maxScore):
+                x = cleaner[score][:]
+                for n in bestChanges[score]:
+                    x[3*n:3*n+3] = bestChanges[score][n][1]
+                tasks.append( [score,x] )
+            results = evaluate( tasks )
+            
+            # keep the best of the combined changes and the best single change
+            for score in range(maxScore):
+                if bestChanges[score]:
+                    n = max( bestChanges[score], key=lambda n: bestChanges[score][n][0] )
+                    if results[score]>=bestChanges[score][n][0]:
+                        cleaner[score] = tasks[score][1]
+                        best[score] = results[score]
+                    else:
+                        cleaner[score][3*n:3*n+3] = bestChanges[score][n][1]
+                        best[score] = bestChanges[score][n][0]
+                else:
+                    steps[score] = steps[score]/2
+                    
+            print("Sweep " + str(sweep+1) + " of " + str(sweeps) + " complete. Average correctness for each round: " + str([ round(b,3) for b in best ]))
+    finally:
+        if workers>1:
+            pool.terminate()
+            pool.join()
+    
+    # save the profiles (replacing any that already exist), while holding the lock so that the catalog isn't changed by another process at the same time
+    filename = resultsFiles.getFilename( resultsPath, device, 'cleaner', move, shots, sim )
+    with open( filename+'.tmp', 'w' ) as saveFile:
+        saveFile.write( str(cleaner)+'\n' )
+    with resultsFiles.lockResults( resultsPath ):
+        os.replace( filename+'.tmp', filename )
+        catalog.removeFromCatalog( resultsPath, device, 'cleaner', move, shots, sim )
+        catalog.updateCatalog( resultsPath, device, 'cleaner', move, shots, sim, str(cleaner) )
+    
+    return cleaner
+
+
+def getQualityArrays ( device, move, shots, sim, cleanup, mitigated=False, folder='' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim*, *cleanup*, *mitigated*, *folder* - See ProcessData().
+    #
+    # Process:
+    # * The data is loaded from file and the quality of each round of each sample is calculated (see calculateQualityArrays()).
+    # * The data for all samples and rounds is cleaned and processed at once (see getCleaningPartners(), cleanOneProbs() and calculateQualityArrays()).
+    # 
+    # Output:
+    # * *fuzz*, *correct*, *difference* - Arrays with a value for each sample and round (see calculateQualityArrays() ).
+    
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+        
+    suffix = 'Mitigated'*mitigated
+    oneProbSamples = resultsLoad ( 'oneProbs'+suffix, move, shots, sim, device, folder=folder )
+    sameProbSamples = resultsLoad ( 'sameProbs'+suffix, move, shots, sim, device, folder=folder )
+    gateSamples = resultsLoad ( 'gates', move, shots, sim, device, folder=folder )
+    
     # find number of round in samples (assume same for all)
     maxScore = len(oneProbSamples[0])
     
+    oneProbs, sameProbs, fracs = getDataArrays( oneProbSamples, sameProbSamples, gateSamples, pairs )
+    
     if cleanup:
         cleaner = getCleaningProfile ( device, move, shots, sim, num, maxScore )
+        oneProbs = cleanOneProbs( cleaner, oneProbs, getCleaningPartners( oneProbs, sameProbs, pairs ) )
+    
+    return calculateQualityArrays( oneProbs, fracs, pairs )
+
+
+def ProcessData ( device, move, shots, sim, cleanup, mitigated=False, folder='', xeb=False ):
     
-    # find number of samples
-    samples = len(oneProbSamples)
+    # Input:
+    # * *device* - String specifying the device on which the game is played.
+    # * *move* - String describing the way moves were chosen for the results to be loaded.
+    # * *shots* - Number of shots used in the results to be loaded.
+    # * *sim* - Boolean denoting whether a simulator was used for the results to be loaded.- 
+    # * *cleanup* - Boolean determining whether error mitigation post-processing is used
+    # * *mitigated* - Boolean determining whether the data with readout error mitigation (saved by GetData with *mitigate=True*) is used
+    # * *folder* - Subfolder of the device folder from which the data is loaded (such as 'downsampled' for data made by DownsampleData() )
+    # * *xeb* - Boolean determining whether the XEB fidelity is also calculated, from the raw results of each round (see getXEBArray() )
+    #
+    # Process:
+    # * The inputs specify data for a given set of runs that are loaded from file, and then used to calculate quantities that tell us how well the game was implemented. These are then returned as outputs.
+    # 
+    # Output:
+    # * *fuzzAvs* - Array of the average and variance of the fuzz (see calculateFuzz() ) for each round
+    # * *correctFracs* - Array of fractionCorrect (see calculateQuality() ) for each round
+    # * *differenceFracs* - Array of fracDifference (see calculateQuality() ) for each round
+    # * *xebAvs* - Only given if *xeb=True*. Array of the average and variance of the XEB fidelity (see calculateXEB() ) for each round (nan if there are no raw results)
     
-    fuzzAvs = [[0]*2 for _ in range(maxScore)]
+    # calculate everything for all samples and rounds at once
+    fuzz, correct, difference = getQualityArrays( device, move, shots, sim, cleanup, mitigated=mitigated, folder=folder )
     
-    for oneProbSample, sameProbSample, gateSample in zip(oneProbSamples, sameProbSamples, gateSamples):
-        for score in range(len(oneProbSample)):
-            if cleanup:
-                oneProb = CleanData ( cleaner[score], oneProbSample[score], sameProbSample[score], pairs )
-            else:
-                oneProb = oneProbSample[score]
-            fuzz = calculateFuzz ( oneProb, pairs, gateSample[2*score].keys() )
-            fuzzAvs[score][0] += fuzz/samples
-            fuzzAvs[score][1] += fuzz**2/samples
-    for fuzzAv in fuzzAvs:
-        fuzzAv[1] -= fuzzAv[0]**2
-                
+    fuzzAvs = []
     correctFracs = []
     differenceFracs = []
-    for score in range(1,maxScore+1):
-        if cleanup:
-            x = cleaner[score-1]
-        else:
-            x = []
-        fractionCorrect, fracDifference = CalculateQuality( x, oneProbSamples, sameProbSamples, gateSamples, pairs, score )
-        correctFracs.append(fractionCorrect)
-        differenceFracs.append(fracDifference)
+    for score in range(fuzz.shape[1]):
+        for quantity, averages in [ [fuzz,fuzzAvs], [correct,correctFracs], [difference,differenceFracs] ]:
+            mean = quantity[:,score].mean()
+            averages.append( [ float(mean), float( (quantity[:,score]**2).mean() - mean**2 ) ] )
+
+    if xeb:
+        fidelity = getXEBArray( device, move, shots, sim, folder=folder )
+        xebAvs = []
+        for score in range(fuzz.shape[1]):
+            values = fidelity[:,score][ ~numpy.isnan( fidelity[:,score] ) ] if score<fidelity.shape[1] else []
+            mean = numpy.mean( values ) if len(values) else math.nan
+            xebAvs.append( [ float(mean), float( numpy.mean( numpy.square(values) ) - mean**2 ) if len(values) else math.nan ] )
+        return fuzzAvs, correctFracs, differenceFracs, xebAvs
 
     return fuzzAvs, correctFracs, differenceFracs
 
-def PlotGraphSet ( devices, sims_to_use ):
+
+def bootstrapIntervals ( quantities, replicates=2000, confidence=0.95, seed=0, chunk=250 ):
+    
+    # Input:
+    # * *quantities* - List of arrays, each with a value for each sample and round (such as the output of calculateQualityArrays() ).
+    # * *replicates* - Number of times the samples are resampled.
+    # * *confidence* - Probability that the interval should cover the true mean.
+    # * *seed* - Seed for the random number generator used for resampling, so that the same intervals are found every time.
+    # * *chunk* - Number of replicates done at once (to limit the memory used).
+    #
+    # Process:
+    # * Each replicate picks as many samples as there are, at random and with replacement. This is done by choosing how many times each sample is picked (with a multinomial distribution).
+    #   The mean for each round is then the matrix product of these counts with the values of the quantities, so all replicates, rounds and quantities are done together.
+    # * The intervals are the percentiles of these means that leave (1-confidence)/2 of them on either side.
+    #
+    # Output:
+    # * *intervals* - List with an array for each quantity, with intervals[k][score] as the lower and upper end of the interval for round *score* (numbered from 0).
+    
+    values = numpy.concatenate( [ numpy.asarray(quantity,dtype=float) for quantity in quantities ], axis=1 )
+    samples = values.shape[0]
+    
+    generator = numpy.random.RandomState( seed )
+    
+    means = []
+    for start in range(0,replicates,chunk):
+        counts = generator.multinomial( samples, [1/samples]*samples, size=min(chunk,replicates-start) )
+        means.append( counts.dot( values ) / samples )
+    means = numpy.concatenate( means )
+    
+    ends = numpy.percentile( means, [ 50*(1-confidence), 50*(1+confidence) ], axis=0 ).T
+    
+    intervals = []
+    start = 0
+    for quantity in quantities:
+        rounds = numpy.shape(quantity)[1]
+        intervals.append( ends[start:start+rounds] )
+        start += rounds
+    
+    return intervals
+
+
+def BootstrapData ( device, move, shots, sim, cleanup, mitigated=False, replicates=2000, confidence=0.95, seed=0, folder='' ):
+    
+    # Input:
+    # * *device*, *move*, *shots*, *sim*, *cleanup*, *mitigated*, *folder* - See ProcessData().
+    # * *replicates*, *confidence*, *seed* - See bootstrapIntervals().
+    #
+    # Process:
+    # * Bootstrap confidence intervals are found for the means calculated by ProcessData().
+    # 
+    # Output:
+    # * *fuzzIntervals* - Array with the lower and upper end of the interval for the average fuzz in each round
+    # * *correctIntervals* - The same for the average fraction of pairs that are correct for MWPM
+    # * *differenceIntervals* - The same for the average difference between measured and correct frac values
+    
+    fuzz, correct, difference = getQualityArrays( device, move, shots, sim, cleanup, mitigated=mitigated, folder=folder )
+    
+    fuzzIntervals, correctIntervals, differenceIntervals = bootstrapIntervals( [fuzz,correct,difference], replicates=replicates, confidence=confidence, seed=seed )
+    
+    return fuzzIntervals.tolist(), correctIntervals.tolist(), differenceIntervals.tolist()
+
+
+# data loaded by tournamentTask, kept so that each process loads the data for each run only once
+tournamentData = {}
+
+
+def tournamentTask ( task ):
+    
+    # Input:
+    # * *task* - List of [ device, move, shots, sim, folder, resultsPath, botMoves, start, stop, seed ].
+    #
+    # Process:
+    # * Every round of the games numbered from *start* up to (but not including) *stop* in the given data is replayed, and each bot in *botMoves* guesses the pairs for it (see guessPairs() ).
+    #   Bots that make random choices are given a generator made from *seed* and the game (see getGameSeed() ), so their guesses don't depend on how the games are split into tasks.
+    #
+    # Output:
+    # * *task* - The task, so that the caller knows which one has finished.
+    # * *guesses* - Dictionary with the bots as keys, and lists (for each game) of lists (for each round) of the guessed positions of pairs as values.
+    
+    global resultsPath
+    
+    device, move, shots, sim, folder, resultsPath, botMoves, start, stop, seed = task
+    num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+    
+    key = ( resultsPath, device, move, shots, sim, folder )
+    if key not in tournamentData:
+        oneProbSamples = resultsLoad ( 'oneProbs', move, shots, sim, device, folder=folder )
+        sameProbSamples = resultsLoad ( 'sameProbs', move, shots, sim, device, folder=folder )
+        gateSamples = resultsLoad ( 'gates', move, shots, sim, device, folder=folder )
+        tournamentData[key] = getDataArrays( oneProbSamples, sameProbSamples, gateSamples, pairs )
+    oneProbs, sameProbs, fracs = tournamentData[key]
+    
+    guesses = {}
+    for botMove in botMoves:
+        guesses[botMove] = []
+        for j in range(start,stop):
+            generator = random.Random( getGameSeed( seed, device, move, shots, sim, j ) )
+            guesses[botMove].append( [ [ int(k) for k in guessPairs( botMove, pairs, oneProbs[j,s], sameProbs[j,s], numpy.nonzero( ~numpy.isnan( fracs[j,s] ) )[0], generator ) ] for s in range(fracs.shape[1]) ] )
+    
+    return task, guesses
+
+
+def matchingCacheFilename ( device, move, shots, sim, botMove, folder='' ):
+    
+    # Returns the filename of the file in which the guesses of a bot are cached by RunTournament() (these are not results files, and so are not in the catalog).
+    
+    return os.path.join( resultsPath, device, folder, 'matchings', 'matchings_bot=' + botMove + '_move=' + move + '_shots=' + str(shots) + '_sim=' + str(sim) + '.cache' )
+
+
+def RunTournament ( devices, sims=[True,False], botMoves=None, workers=1, chunk=50, seed=0, folder='' ):
+    
+    # Input:
+    # * *devices* - List of devices whose saved data is used.
+    # * *sims* - List of sims for which saved data is used.
+    # * *botMoves* - List of the bots to compare (by their moves, see registerBot() ). By default, all bots are used.
+    # * *workers* - Number of processes to use.
+    # * *chunk* - Number of games replayed in each task given to a process.
+    # * *seed* - Seed used for the random choices of bots (see tournamentTask() ).
+    # * *folder* - Subfolder of the device folders from which the data is used.
+    #
+    # Process:
+    # * Every game saved for the given devices and sims (as listed in the catalog) is replayed by every bot, with the games split into tasks that are done in parallel.
+    # * Guesses of bots registered with *cache=True* are saved (see matchingCacheFilename() ), along with the checksums of the data they come from. They are used again if the data hasn't changed, so only new bots need their guesses to be worked out.
+    # * For each bot, the fraction of the pairs of each puzzle that it guessed correctly is found (which, for move='B', is the MWPM correctness of ProcessData() ).
+    #
+    # Output:
+    # * *tables* - Dictionary with ( device, move, shots, sim ) as keys for each set of data. Each value is a dictionary with bots as keys, and a list of the average and variance of the correctness for each round as values.
+    
+    if botMoves is None:
+        botMoves = list( bots.keys() )
+    
+    # find all the data that can be used
+    specs = []
+    for entry in sorted( catalog.loadCatalog( resultsPath ).values(), key=lambda entry: ( entry['device'], entry['move'], entry['shots'], entry['sim'] ) ):
+        if entry['fileType']=='oneProbs' and entry['device'] in devices and entry['sim'] in sims and entry['folder']==folder:
+            if catalog.dataAvailable( resultsPath, entry['device'], entry['move'], entry['shots'], entry['sim'], folder=folder ):
+                specs.append( [ entry['device'], entry['move'], entry['shots'], entry['sim'], entry['samples'] ] )
+    
+    # use cached guesses where possible, and make tasks for the rest
+    guesses = {}
+    needed = {}
+    tasks = []
+    for device, move, shots, sim, samples in specs:
+        spec = ( device, move, shots, sim )
+        checksum = [ catalog.catalogEntry( resultsPath, device, fileType, move, shots, sim, folder=folder )['checksum'] for fileType in ['oneProbs','sameProbs','gates'] ]
+        guesses[spec] = {}
+        needed[spec] = []
+        for botMove in botMoves:
+            filename = matchingCacheFilename( device, move, shots, sim, botMove, folder=folder )
+            if bots[botMove]['cache'] and os.path.exists(filename):
+                with open(filename) as cacheFile:
+                    cached = eval( cacheFile.read() )
+                if cached['checksum']==checksum:
+                    guesses[spec][botMove] = cached['guesses']
+                    continue
+            guesses[spec][botMove] = [None]*samples
+            needed[spec].append( botMove )
+        if needed[spec]:
+            for start in range(0,samples,chunk):
+                tasks.append( [ device, move, shots, sim, folder, resultsPath, needed[spec], start, min(start+chunk,samples), seed ] )
+    
+    if workers>1:
+        import multiprocessing
+        pool = multiprocessing.Pool( workers )
+        done = pool.imap_unordered( tournamentTask, tasks )
+    else:
+        done = ( tournamentTask( task ) for task in tasks )
+    # the workers are stopped even if a task fails, so that they aren't left running
+    try:
+        for task, taskGuesses in done:
+            for botMove in taskGuesses:
+                guesses[ tuple(task[0:4]) ][botMove][task[7]:task[8]] = taskGuesses[botMove]
+    finally:
+        if workers>1:
+            pool.terminate()
+            pool.join()
+    
+    # save the new guesses for the bots that are cached
+    for device, move, shots, sim, samples in specs:
+        spec = ( device, move, shots, sim )
+        checksum = [ catalog.catalogEntry( resultsPath, device, fileType, move, shots, sim, folder=folder )['checksum'] for fileType in ['oneProbs','sameProbs','gates'] ]
+        for botMove in needed[spec]:
+            if bots[botMove]['cache']:
+                filename = matchingCacheFilename( device, move, shots, sim, botMove, folder=folder )
+                if not os.path.isdir( os.path.dirname(filename) ):
+                    os.makedirs( os.path.dirname(filename) )
+                with open( filename+'.tmp', 'w' ) as cacheFile:
+                    cacheFile.write( str( {'checksum':checksum, 'guesses':guesses[spec][botMove]} )+'\n' )
+                os.replace( filename+'.tmp', filename )
+    
+    # the fraction of the pairs of each puzzle that were guessed
+    tables = {}
+    for device, move, shots, sim, samples in specs:
+        num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+        gateSamples = resultsLoad ( 'gates', move, shots, sim, device, folder=folder )
+        rounds = int( (len(gateSamples[0])+1)/2 )
+        used = numpy.array( [ [ ~numpy.isnan( pairArray( gateSample[2*s], pairs, default=math.nan ) ) for s in range(rounds) ] for gateSample in gateSamples ] )
+        spec = ( device, move, shots, sim )
+        tables[spec] = {}
+        for botMove in botMoves:
+            correct = numpy.array( [ [ used[j,s,guessed].sum()/used[j,s].sum() for s, guessed in enumerate(gameGuesses) ] for j, gameGuesses in enumerate(guesses[spec][botMove]) ] )
+            mean = correct.mean( axis=0 )
+            tables[spec][botMove] = [ [ float(mean[s]), float( (correct[:,s]**2).mean() - mean[s]**2 ) ] for s in range(rounds) ]
+    
+    return tables
+
+
+def processTask ( task ):
+    
+    # Input:
+    # * *task* - List of [ device, move, shots, sim, cleanup, intervals, resultsPath, xeb ].
+    #
+    # Process:
+    # * ProcessData() is run for the given data, as well as BootstrapData() if *intervals=True*. This is used by PlotGraphSet() to process many sets of data in parallel.
+    #
+    # Output:
+    # * *processed* - Output of ProcessData(), followed by that of BootstrapData() (or None if not used).
+    
+    global resultsPath
+    
+    device, move, shots, sim, cleanup, intervals, resultsPath, xeb = task
+    
+    processed = ProcessData( device, move, shots, sim, cleanup, xeb=xeb )
+    if intervals:
+        return processed + ( BootstrapData( device, move, shots, sim, cleanup ), )
+    else:
+        return processed + ( None, )
+
+def PlotGraphSet ( devices, sims_to_use, saveDir=None, intervals=False, workers=1, xeb=False ):
     
     # Input:
     # * *devices* - Any array of devices
     # * *sims_to_used* - An array of sims
+    # * *saveDir* - If given, the graphs are saved as png files in this folder instead of being shown on screen
+    # * *intervals* - If True, the error bars show 95% bootstrap confidence intervals for the averages (see BootstrapData() )
+    # * *workers* - Number of processes used to process the data
+    # * *xeb* - If True, the XEB fidelity is also plotted for all runs with saved raw results (see calculateXEB() )
     #
     # Process:
     # * For a given set of devices and sims, all the processed data produced by ProcessData() is plotted
+    # * Only data listed in the catalog of results is used, so missing runs are simply left out
     # 
     # Output:
-    # * None are returned, but graphs are printed to screen
+    # * None are returned, but graphs are printed to screen (or saved to file)
     
     # what follows assumes that 'devices' is a list, so ensure this is true
     if type(devices) is not list:
@@ -1417,10 +3433,14 @@ def PlotGraphSet ( devices, sims_to_use ):
     yc = []
     Yd = []
     yd = []
+    If = []
+    Ic = []
+    Id = []
     labels = []
     
     cleanup_for_sim = {True:[False],False:[False,True]}
 
+    tasks = []
     for device in devices:
         
         num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
@@ -1429,23 +3449,71 @@ def PlotGraphSet ( devices, sims_to_use ):
             for cleanup in cleanup_for_sim[sim]:
                 for move in runs[sim]['move']:
                     for shots in runs[sim]['shots']:
-
-                        maxScore = runs[sim]['maxScore']
-                        fuzzAvs, correctFracs, differenceFracs = ProcessData( device, move, shots, sim, cleanup )
-
-                        Yf.append( [fuzzAvs[j][0] for j in range(maxScore) ] + [math.nan]*(maxMaxScore-maxScore) )
-                        yf.append( [fuzzAvs[j][1] for j in range(maxScore) ] + [math.nan]*(maxMaxScore-maxScore) )
-                        Yc.append( [correctFracs[j][0] for j in range(maxScore) ] + [math.nan]*(maxMaxScore-maxScore) )
-                        yc.append( [correctFracs[j][1] for j in range(maxScore) ] + [math.nan]*(maxMaxScore-maxScore) )
-                        Yd.append( [differenceFracs[j][0] for j in range(maxScore) ] + [math.nan]*(maxMaxScore-maxScore) )
-                        yd.append( [differenceFracs[j][1] for j in range(maxScore) ] + [math.nan]*(maxMaxScore-maxScore) )
-
-
+                        
+                        # skip any runs for which there is no data
+                        if not catalog.dataAvailable( resultsPath, device, move, shots, sim ):
+                            continue
+                        
+                        tasks.append( [ device, move, shots, sim, cleanup, intervals, resultsPath, xeb ] )
+                        
                         labels.append( device*(sim==False) + ('simulated '+str(device))*sim + ', ' + 'correct'*(move=='C') + 'random'*(move=='R') + ' pairing,\nshots = ' + str(shots) + ' (mitigated)'*cleanup  )
+    
+    # process the data for all runs (in parallel, if more than one worker is used)
+    if workers>1:
+        import multiprocessing
+        pool = multiprocessing.Pool( workers )
+        # the workers are stopped even if a task fails, so that they aren't left running
+        try:
+            processed = pool.map( processTask, tasks )
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        processed = [ processTask( task ) for task in tasks ]
+    
+    Yx = []
+    yx = []
+    labelsX = []
+    for processedRun, label, task in zip( processed, labels, tasks ):
+        
+        fuzzAvs, correctFracs, differenceFracs = processedRun[0:3]
+        bootstrapped = processedRun[-1]
+        
+        maxScore = len(fuzzAvs)
+        padding = [math.nan]*(maxMaxScore-maxScore)
+        
+        Yf.append( [fuzzAvs[j][0] for j in range(maxScore) ] + padding )
+        yf.append( [fuzzAvs[j][1] for j in range(maxScore) ] + padding )
+        Yc.append( [correctFracs[j][0] for j in range(maxScore) ] + padding )
+        yc.append( [correctFracs[j][1] for j in range(maxScore) ] + padding )
+        Yd.append( [differenceFracs[j][0] for j in range(maxScore) ] + padding )
+        yd.append( [differenceFracs[j][1] for j in range(maxScore) ] + padding )
+        
+        if intervals:
+            for I, quantityIntervals in zip( [If,Ic,Id], bootstrapped ):
+                I.append( quantityIntervals + [[math.nan,math.nan]]*(maxMaxScore-maxScore) )
+        
+        # only runs with raw results have an XEB fidelity (which is the same with and without cleanup, so only runs without are used)
+        if xeb and not task[4] and not all( math.isnan(xebAv[0]) for xebAv in processedRun[3] ):
+            Yx.append( [processedRun[3][j][0] for j in range(maxScore) ] + padding )
+            yx.append( [processedRun[3][j][1] for j in range(maxScore) ] + padding )
+            labelsX.append( label )
+            
+    filenames = {'fuzz':None, 'mwpm':None, 'diff':None, 'xeb':None}
+    if saveDir is not None:
+        if not os.path.exists(saveDir):
+            os.makedirs(saveDir)
+        for graph in filenames:
+            filenames[graph] = saveDir + '/' + '_'.join(devices) + '_sim=' + '_'.join([str(sim) for sim in sims_to_use]) + '_' + graph + '.png'
+    
+    if not intervals:
+        If, Ic, Id = None, None, None
             
-    MakeGraph(X,Yf,yf,["Game round","Average Fuzz"],labels=labels)
-    MakeGraph(X,Yc,yc,["Game round","Average correctness for MWPM"],labels=labels)
-    MakeGraph(X,Yd,yd,["Game round","Average difference from correct values"],labels=labels)
+    MakeGraph(X,Yf,yf,["Game round","Average Fuzz"],labels=labels,filename=filenames['fuzz'],intervals=If)
+    MakeGraph(X,Yc,yc,["Game round","Average correctness for MWPM"],labels=labels,filename=filenames['mwpm'],intervals=Ic)
+    MakeGraph(X,Yd,yd,["Game round","Average difference from correct values"],labels=labels,filename=filenames['diff'],intervals=Id)
+    if Yx:
+        MakeGraph(X,Yx,yx,["Game round","Average XEB fidelity"],labels=labelsX,filename=filenames['xeb'])
 
 def PlayGame ( ):
     
@@ -1460,7 +3528,7 @@ def PlayGame ( ):
     # Output:
     # * None returned, but the game is played onscreen.
     
-    clear_output()
+    clearOutput()
     print("")
     print("")
     print("            __   _  _   __   __ _  ____  _  _  _  _               ")          
@@ -1494,16 +3562,25 @@ def PlayGame ( ):
         input("> The noisier that a quantum processor is, the more infuriatingly steep the difficulty curve will be...\n")
         input("> So the quality of the processor is direcly proportional to how much fun you have playing on it...\n")
         input("> Now choose a device to test out...\n")
+    # only offer devices for which the catalog says there is data to play with
+    playableDevices = []
+    for device in supportedDevices():
+        num, area, entangleType, pairs, pos, example, sdk, runs = getLayout( device )
+        for sim in [True,False]:
+            if runs[sim]['shots'] and catalog.dataAvailable( resultsPath, device, 'C', min(runs[sim]['shots']), sim ):
+                if device not in playableDevices:
+                    playableDevices.append(device)
+    
     deviceNotChosen = True
     attempt = 0
     deviceList = ""
-    for device in supportedDevices():
+    for device in playableDevices:
         deviceList += device + " "
     while deviceNotChosen:
         message = "> The devices you can play on are\n\n  " + deviceList + "\n\n> Type the one you'd like below...\n"
         message = "\n> I'm afraid I didn't understand that.\n"*(attempt>0) + message
         device = input(message)
-        if device in supportedDevices():
+        if device in playableDevices:
             deviceNotChosen = False
         else:
             attempt += 1
@@ -1529,6 +3606,9 @@ def PlayGame ( ):
             
     s = str.upper(input("> Do you want to play a game using data from the real device? (y/n)...\n"))
     sim = (s!='Y')
+    if sim==False and not ( runs[False]['shots'] and catalog.dataAvailable( resultsPath, device, 'C', min(runs[False]['shots']), False ) ):
+        input("> There is no saved data from the real device, so you'll have to make do with a simulated run...\n")
+        sim = True
     if sim:
         input("> The following game data will be from a simulated run...\n")
     
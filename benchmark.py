@@ -0,0 +1,275 @@
+'''
+Benchmarks for the time taken by various parts of the game.
+
+Run this file directly to print the results:
+
+    python benchmark.py                    # run all benchmarks
+    python benchmark.py --save             # also save the results as the baseline
+    python benchmark.py --compare          # compare the results to the saved baseline, and flag anything that got slower
+    python benchmark.py --devices ibmqx4   # only run benchmarks for the given devices
+
+Each benchmark is run several times, and the best time per call is used. Random number generators are seeded before each one, so the same work is done every time.
+Benchmarks that need an SDK that is not installed are skipped.
+'''
+
+import os, sys, subprocess, time, random, argparse
+
+path = os.path.dirname(os.path.abspath(__file__))
+
+# devices used for the benchmarks, covering real devices and pattern devices of all types
+benchmarkDevices = ['ibmqx4','ibmqx5','19Q-Acorn','line5','line19','ladder10','ladder20','square9','square16','web5','web11']
+
+# shot numbers for which processResults is timed
+benchmarkShots = [100,1000,10000]
+
+# file in which the baseline is saved
+baselineFile = path + '/benchmarkBaseline.txt'
+
+# modules that are only needed to show things on screen, and so should not be imported by headless runs
+screenModules = ['matplotlib.pyplot','networkx','IPython']
+
+
+def importTime ( module='QuantumAwesomeness', repeats=5 ):
+
+    # Input:
+    # * *module* - Name of the module whose import is to be timed.
+    # * *repeats* - Number of times to repeat the import (each in a fresh Python process).
+    #
+    # Process:
+    # * A new Python process is started for each repeat, and the time taken to import the module is measured within it.
+    #   The peak memory use of the process and the screen-related modules that have been imported are also recorded.
+    #
+    # Output:
+    # * *timing* - Dictionary with the best and mean import times (in seconds), the peak memory (in MB) and a list of the screen modules that were imported.
+
+    script = '''
+import sys, time
+sys.path.insert(0,%r)
+start = time.perf_counter()
+import %s
+duration = time.perf_counter() - start
+try:
+    import resource
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+except ImportError:
+    memory = 0
+print( repr( [ duration, memory, [ name for name in %r if name in sys.modules ] ] ) )
+''' % ( path, module, screenModules )
+
+    durations = []
+    memory = 0
+    loaded = []
+    for _ in range(repeats):
+        output = subprocess.check_output( [sys.executable, '-c', script], cwd=path )
+        duration, memory, loaded = eval( output.decode().strip().split('\n')[-1] )
+        durations.append( duration )
+
+    timing = { 'best':min(durations), 'mean':sum(durations)/len(durations), 'memory':memory, 'screenModules':loaded }
+
+    return timing
+
+
+def timeCall ( function, minTime=0.2, repeats=3 ):
+
+    # Input:
+    # * *function* - Function (with no arguments) to be timed.
+    # * *minTime* - The function is called as many times as needed for each timing to take at least this long (in seconds).
+    # * *repeats* - Number of timings to make.
+    #
+    # Output:
+    # * *best* - The shortest time per call (in seconds) from the timings.
+
+    random.seed(0)
+    import numpy
+    numpy.random.seed(0)
+
+    # find how many calls are needed to take minTime
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        duration = time.perf_counter() - start
+        if duration>=minTime or calls>=1000000:
+            break
+        calls = max( 2*calls, int( calls*minTime/max(duration,1e-9) ) )
+
+    best = duration/calls
+    for _ in range(repeats-1):
+        random.seed(0)
+        numpy.random.seed(0)
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min( best, (time.perf_counter() - start)/calls )
+
+    return best
+
+
+def makeResultsRaw ( num, outcomes=1024 ):
+
+    # Makes a made up resultsRaw (see getResults() in QuantumAwesomeness.py) for *num* qubits, with at most *outcomes* possible bit strings.
+
+    strings = set()
+    while len(strings)<min( outcomes, 2**num ):
+        strings.add( ''.join( random.choice('01') for _ in range(num) ) )
+    weights = [ random.random() for _ in strings ]
+    total = sum(weights)
+
+    return { string: weight/total for string, weight in zip( sorted(strings), weights ) }
+
+
+def runBenchmarks ( devices=benchmarkDevices, minTime=0.2, verbose=True ):
+
+    # Input:
+    # * *devices* - List of devices to run benchmarks for.
+    # * *minTime* - See timeCall().
+    # * *verbose* - Whether to print the results as they are found.
+    #
+    # Process:
+    # * The following are timed for each device (where possible):
+    #     - getLayout
+    #     - a round of the game on the simulator (entangle, including getResults), for rounds 1 and 5
+    #     - processResults for a simulated run, for each of the shot numbers in benchmarkShots
+    #     - getDisjointPairs, using the example oneProb for the device
+    #     - CleanData, using the example oneProb for the device
+    #     - resultsLoad and ProcessData for the saved data of a simulated run with correct moves
+    #   The time taken to import QuantumAwesomeness is also measured.
+    #
+    # Output:
+    # * *timings* - Dictionary with names of benchmarks as keys and times (in seconds) as values.
+
+    import QuantumAwesomeness as qa
+    from devices import getLayout
+
+    timings = {}
+
+    def record ( name, function ):
+        try:
+            timings[name] = timeCall( function, minTime=minTime )
+            if verbose:
+                print( "%-45s %12.6f s" % ( name, timings[name] ) )
+        except ImportError as e:
+            if verbose:
+                print( "%-45s skipped (%s)" % ( name, e ) )
+
+    timing = importTime( repeats=3 )
+    timings['import'] = timing['best']
+    if verbose:
+        print( "%-45s %12.6f s" % ( 'import', timings['import'] ) )
+
+    for device in devices:
+
+        random.seed(0)
+        num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+        oneProb = [ 0 if value is None else value for value in example ]
+        sameProb = { p: random.random() for p in pairs }
+
+        record( 'getLayout|'+device, lambda: getLayout(device) )
+
+        # a game with the same moves every time, to be simulated up to round 1 and round 5
+        gates = []
+        conjugates = []
+        for _ in range(5):
+            matchingPairs = qa.getDisjointPairs( pairs, [], {} )
+            gates.append( { p: random.random()/2 for p in matchingPairs } )
+            gates.append( { p: -random.random()/2 for p in matchingPairs } )
+            conjugates.append( [ [ random.choice(['X','Y']), random.random() ] for _ in range(num) ] )
+        for rounds in [1,5]:
+            record( 'entangle|'+device+'|rounds='+str(rounds), lambda: qa.entangle( device, 'C', 100, True, gates[0:2*rounds-1], conjugates ) )
+
+        resultsRaw = makeResultsRaw( num )
+        for shots in benchmarkShots:
+            record( 'processResults|'+device+'|shots='+str(shots), lambda: qa.processResults( resultsRaw, num, pairs, True, shots ) )
+
+        record( 'getDisjointPairs|'+device, lambda: qa.getDisjointPairs( pairs, oneProb, {} ) )
+
+        x = [0.45,0.55,0]*num
+        record( 'CleanData|'+device, lambda: qa.CleanData( x, oneProb, sameProb, pairs ) )
+
+        shots = min( runs[True]['shots'] )
+        if qa.catalog.dataAvailable( qa.resultsPath, device, 'C', shots, True ):
+            record( 'resultsLoad|'+device, lambda: qa.resultsLoad( 'oneProbs', 'C', shots, True, device ) )
+            record( 'ProcessData|'+device, lambda: qa.ProcessData( device, 'C', shots, True, False ) )
+
+    return timings
+
+
+def saveBaseline ( timings, filename=baselineFile ):
+
+    # Saves the timings from runBenchmarks() to file, with one benchmark per line.
+
+    with open( filename, 'w' ) as saveFile:
+        for name in sorted( timings.keys() ):
+            saveFile.write( str( [ name, timings[name] ] )+'\n' )
+
+
+def loadBaseline ( filename=baselineFile ):
+
+    # Loads timings saved by saveBaseline().
+
+    timings = {}
+    with open( filename ) as saveFile:
+        for line in saveFile:
+            if line.strip():
+                name, duration = eval(line)
+                timings[name] = duration
+
+    return timings
+
+
+def compareTimings ( timings, baseline, tolerance=0.25 ):
+
+    # Input:
+    # * *timings* - New timings from runBenchmarks().
+    # * *baseline* - Old timings to compare with.
+    # * *tolerance* - Fraction by which the time can change before it is flagged.
+    #
+    # Output:
+    # * *slower* - List of the benchmarks that took more than (1+tolerance) times as long as the baseline.
+    # * *lines* - The comparison as lines of text, ready to print.
+
+    slower = []
+    lines = [ "%-45s %12s %12s %8s" % ( 'benchmark', 'baseline', 'now', 'ratio' ) ]
+    for name in sorted( timings.keys() ):
+        if name in baseline and baseline[name]>0:
+            ratio = timings[name]/baseline[name]
+            flag = ''
+            if ratio>1+tolerance:
+                flag = '  SLOWER'
+                slower.append(name)
+            elif ratio<1/(1+tolerance):
+                flag = '  faster'
+            lines.append( "%-45s %12.6f %12.6f %8.2f%s" % ( name, baseline[name], timings[name], ratio, flag ) )
+        else:
+            lines.append( "%-45s %12s %12.6f" % ( name, '-', timings[name] ) )
+
+    return slower, lines
+
+
+if __name__=='__main__':
+
+    parser = argparse.ArgumentParser( description="Time the main parts of the game." )
+    parser.add_argument( '--devices', nargs='+', default=benchmarkDevices, help="devices to run benchmarks for" )
+    parser.add_argument( '--min-time', type=float, default=0.2, help="minimum time (in seconds) for each timing" )
+    parser.add_argument( '--save', action='store_true', help="save the results as the baseline" )
+    parser.add_argument( '--compare', action='store_true', help="compare the results with the baseline" )
+    parser.add_argument( '--baseline', default=baselineFile, help="file for the baseline" )
+    parser.add_argument( '--tolerance', type=float, default=0.25, help="fractional slowdown allowed before a benchmark is flagged" )
+    args = parser.parse_args()
+
+    timings = runBenchmarks( devices=args.devices, minTime=args.min_time )
+
+    if args.compare:
+        slower, lines = compareTimings( timings, loadBaseline( args.baseline ), tolerance=args.tolerance )
+        print("")
+        for line in lines:
+            print(line)
+        if slower:
+            print("\n" + str(len(slower)) + " benchmarks are slower than the baseline")
+
+    if args.save:
+        saveBaseline( timings, filename=args.baseline )
+
+    if args.compare and slower:
+        sys.exit(1)
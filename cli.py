@@ -0,0 +1,438 @@
+'''
+Command line access to the functions used in the notebooks, so that data can be collected and analysed without Jupyter.
+
+    python cli.py collect ibmqx4 --sim False
+    python cli.py process ibmqx4 --sim True False --output processed
+    python cli.py plot line5 line11 --sim True --output graphs
+    python cli.py convert ibmqx4 --output json
+    python cli.py spectrum ibmqx4 --output processed
+    python cli.py evaluate line5 --strategies C B R I --samples 20
+    python cli.py tournament ibmqx4 line5 --bots B I --workers 4
+    python cli.py synthesize ibmqx4 --sim False --games 100000
+    python cli.py merge ibmqx4
+
+Unless told otherwise, the runs specified for each device in devices.getLayout() are used.
+Use 'python cli.py <command> --help' to see all options.
+'''
+
+import argparse, os, sys, json, multiprocessing
+
+import QuantumAwesomeness as qa
+import resultsCatalog as catalog
+import resultsFiles
+from devices import getLayout
+
+
+def parseSim ( string ):
+
+    # Turns the strings 'True' and 'False' into booleans (as used for the *sim* argument everywhere else).
+
+    if string.lower() in ['true','t','1']:
+        return True
+    elif string.lower() in ['false','f','0']:
+        return False
+    raise argparse.ArgumentTypeError( "sim should be True or False, not " + string )
+
+
+def getSpecs ( devices, sims, moves=None, shotsList=None ):
+
+    # Input:
+    # * *devices* - List of devices.
+    # * *sims* - List of booleans denoting simulated or real runs.
+    # * *moves*, *shotsList* - If given, these replace the lists given in the runs specification of each device.
+    #
+    # Output:
+    # * *specs* - List of [ device, move, shots, sim, samples, maxScore ] for each run, as specified by devices.getLayout().
+
+    specs = []
+    for device in devices:
+        num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+        for sim in sims:
+            for move in ( moves or runs[sim]['move'] ):
+                for shots in ( shotsList or runs[sim]['shots'] ):
+                    specs.append( [ device, move, shots, sim, runs[sim]['samples'], runs[sim]['maxScore'] ] )
+
+    return specs
+
+
+def collectSpec ( task ):
+
+    # Input:
+    # * *task* - List of [ spec, batchSize, seed, resultsPath, mitigate, target, storeConjugates, resume, correlations, writer ], where spec is as described in getSpecs().
+    #
+    # Process:
+    # * GetData() is run for the given spec, in batches of batchSize games. If a seed is given, it is used as the seed for the run (see getGameSeed() in QuantumAwesomeness.py).
+    # * If a target is given, GetData() is run just once with the number of samples as a maximum, since it needs to see all games to decide when to stop.
+    # * If resume is True, games already saved count towards the number of samples, and the first call of GetData() picks up any game that was in progress.
+    #
+    # Output:
+    # * *spec* - The spec, so that the caller knows which one has finished.
+
+    spec, batchSize, seed, resultsPath, mitigate, target, storeConjugates, resume, correlations, writer = task
+    device, move, shots, sim, samples, maxScore = spec
+
+    qa.resultsPath = resultsPath
+
+    if resume:
+        entry = catalog.catalogEntry( resultsPath, device, 'oneProbs', move, shots, sim )
+        if entry is not None:
+            samples = max( 0, samples-entry['samples'] )
+
+    if target is not None:
+        batchSize = samples
+
+    batch = 0
+    done = 0
+    while done<samples:
+        size = min( batchSize, samples-done )
+        samplesRun = qa.GetData( device, move, shots, sim, size, maxScore, mitigate=mitigate, target=target, seed=seed, storeConjugates=storeConjugates, resume=resume and batch==0, correlations=correlations, writer=writer )
+        done += size
+        if samplesRun<size:
+            break
+        batch += 1
+
+    return spec
+
+
+def collect ( args ):
+
+    # Runs GetData() for the required specs, with a separate process for each spec when more than one worker is used.
+    # GetData() locks the results folder while saving each game, so the processes can safely share it (and its catalog).
+
+    specs = getSpecs( args.devices, args.sim, moves=args.move, shotsList=args.shots )
+    for spec in specs:
+        if args.samples is not None:
+            spec[4] = args.samples
+        if args.max_score is not None:
+            spec[5] = args.max_score
+
+    # the game seeds depend on the spec as well as the seed, so the same seed can be used for all specs
+    tasks = []
+    for spec in specs:
+        tasks.append( [ spec, args.batch_size, args.seed, args.output, args.mitigate, args.target, not args.no_conjugates, args.resume, args.correlations, args.writer ] )
+
+    if args.workers>1:
+        pool = multiprocessing.Pool( args.workers )
+        for spec in pool.imap_unordered( collectSpec, tasks ):
+            print("Finished " + str(spec))
+        pool.close()
+        pool.join()
+    else:
+        for task in tasks:
+            collectSpec( task )
+
+
+def processSpec ( task ):
+
+    # Input:
+    # * *task* - List of [ spec, cleanup, resultsPath, mitigated, xeb ].
+    #
+    # Output:
+    # * *task* and the output of ProcessData() for the given spec.
+
+    spec, cleanup, resultsPath, mitigated, xeb = task
+    device, move, shots, sim, samples, maxScore = spec
+
+    qa.resultsPath = resultsPath
+
+    return task, qa.ProcessData( device, move, shots, sim, cleanup, mitigated=mitigated, xeb=xeb )
+
+
+def merge ( args ):
+
+    # Merges the shards saved by GetData() into the main results files, after checking that they are aligned (see resultsFiles.mergeShards() ).
+
+    for device in args.devices:
+        for shard, move, shots, sim, games, problems in resultsFiles.mergeShards( args.results, device, remove=not args.keep ):
+            print( "Merged " + str(games) + " games from shard " + shard + " for " + str( [device,move,shots,sim] ) )
+            for problem in problems:
+                print( "    " + problem + " (shard kept)" )
+
+
+def process ( args ):
+
+    # Runs ProcessData() for the required specs (in parallel, if more than one worker is used) and saves the output in the output folder.
+    # The file for each spec contains a single line: [ fuzzAvs, correctFracs, differenceFracs ] (followed by xebAvs, with --xeb).
+
+    tasks = []
+    for spec in getSpecs( args.devices, args.sim, moves=args.move, shotsList=args.shots ):
+        device, move, shots, sim, samples, maxScore = spec
+        fileTypes = ['oneProbs','sameProbs','gates']
+        if args.mitigated:
+            fileTypes = ['oneProbsMitigated','sameProbsMitigated','gates']
+        if not catalog.dataAvailable( args.results, device, move, shots, sim, fileTypes=fileTypes ):
+            print("No data for " + str(spec[0:4]) + ", so it will be skipped")
+            continue
+        for cleanup in [False,True]*args.cleanup + [False]*(not args.cleanup):
+            tasks.append( [ spec, cleanup, args.results, args.mitigated, args.xeb ] )
+
+    if args.workers>1:
+        pool = multiprocessing.Pool( args.workers )
+        processed = pool.map( processSpec, tasks )
+        pool.close()
+        pool.join()
+    else:
+        processed = [ processSpec( task ) for task in tasks ]
+
+    for task, output in processed:
+        spec, cleanup, resultsPath, mitigated, xeb = task
+        device, move, shots, sim, samples, maxScore = spec
+        folder = os.path.join( args.output, device )
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        filename = 'processed_move=' + move + '_shots=' + str(shots) + '_sim=' + str(sim) + '_cleanup=' + str(cleanup) + '_mitigated'*mitigated + '.txt'
+        with open( os.path.join(folder,filename), 'w' ) as saveFile:
+            saveFile.write( str(list(output))+'\n' )
+        print("Saved " + os.path.join(folder,filename))
+
+
+def spectrum ( args ):
+
+    # Runs SpectrumData() for the required specs that have saved results, prints the average order of the correlations for each round, and saves the output in the output folder.
+    # The file for each spec contains a single line: [ weightAvs, orderAvs ].
+
+    qa.resultsPath = args.results
+
+    for spec in getSpecs( args.devices, args.sim, moves=args.move, shotsList=args.shots ):
+        device, move, shots, sim, samples, maxScore = spec
+        if not catalog.dataAvailable( args.results, device, move, shots, sim, fileTypes=['results'] ):
+            print("No results for " + str(spec[0:4]) + ", so it will be skipped")
+            continue
+
+        weightAvs, orderAvs = qa.SpectrumData( device, move, shots, sim )
+        print( "Average order of correlations for " + str(spec[0:4]) + ": " + str( [ round(order[0],3) for order in orderAvs ] ) )
+
+        folder = os.path.join( args.output, device )
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        filename = 'spectrum_move=' + move + '_shots=' + str(shots) + '_sim=' + str(sim) + '.txt'
+        with open( os.path.join(folder,filename), 'w' ) as saveFile:
+            saveFile.write( str([weightAvs,orderAvs])+'\n' )
+        print("Saved " + os.path.join(folder,filename))
+
+
+def evaluate ( args ):
+
+    # Runs EvaluateStrategies() for each device, prints how each strategy does, and saves the output in the output folder.
+    # The file for each device contains a single line: the dictionary given by EvaluateStrategies().
+
+    for device in args.devices:
+        num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+        shots = args.shots or runs[True]['shots'][0]
+        samples = args.samples or runs[True]['samples']
+        maxScore = args.max_score or runs[True]['maxScore']
+
+        evaluationAvs = qa.EvaluateStrategies( device, shots, samples, maxScore, strategies=args.strategies, trunk=args.trunk, seed=args.seed )
+        for strategy in evaluationAvs:
+            print( device + ", strategy " + strategy + ": fuzz of next puzzle = " + str( [ round(fuzz[0],3) for fuzz in evaluationAvs[strategy]['fuzz'] ] ) )
+
+        folder = os.path.join( args.output, device )
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        filename = 'strategies_trunk=' + args.trunk + '_shots=' + str(shots) + '.txt'
+        with open( os.path.join(folder,filename), 'w' ) as saveFile:
+            saveFile.write( str(evaluationAvs)+'\n' )
+        print("Saved " + os.path.join(folder,filename))
+
+
+def tournament ( args ):
+
+    # Runs RunTournament() for the given devices, prints the average correctness of each bot for each round, and saves the output in the output folder.
+    # The file for each set of data contains a single line: the dictionary of bots and correctness given by RunTournament().
+
+    qa.resultsPath = args.results
+
+    tables = qa.RunTournament( args.devices, sims=args.sim, botMoves=args.bots, workers=args.workers, chunk=args.chunk, seed=args.seed, folder=args.folder )
+
+    for spec in sorted(tables):
+        device, move, shots, sim = spec
+        print( str(spec) )
+        print( "    round  " + "  ".join( [ botMove.rjust(6) for botMove in tables[spec] ] ) )
+        rounds = len( list(tables[spec].values())[0] )
+        for s in range(rounds):
+            print( "    " + str(s+1).rjust(5) + "  " + "  ".join( [ str( round(tables[spec][botMove][s][0],3) ).rjust(6) for botMove in tables[spec] ] ) )
+
+        folder = os.path.join( args.output, device )
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        filename = 'tournament_move=' + move + '_shots=' + str(shots) + '_sim=' + str(sim) + '.txt'
+        with open( os.path.join(folder,filename), 'w' ) as saveFile:
+            saveFile.write( str(tables[spec])+'\n' )
+        print("Saved " + os.path.join(folder,filename))
+
+
+def synthesize ( args ):
+
+    # Runs SyntheticData() for the required specs that have saved data, to make games from a noise model fitted to them.
+
+    qa.resultsPath = args.results
+
+    # synthetic games are those of a player who guessed correctly, and so are only made for move='C'
+    for spec in getSpecs( args.devices, args.sim, moves=args.move or ['C'], shotsList=args.shots ):
+        device, move, shots, sim, samples, maxScore = spec
+        if move!='C':
+            print("Synthetic games can only be made for move='C', so " + str(spec[0:4]) + " will be skipped")
+            continue
+        if not catalog.dataAvailable( args.results, device, move, shots, sim ):
+            print("No data for " + str(spec[0:4]) + ", so it will be skipped")
+            continue
+
+        games = qa.SyntheticData( device, move, shots, sim, args.games, folder=args.folder, batch=args.batch_size, seed=args.seed )
+        print( "Saved " + str(games) + " synthetic games for " + str(spec[0:4]) + " in " + os.path.join( args.results, device, args.folder ) )
+
+
+def plot ( args ):
+
+    # Makes the graphs of PlotGraphSet() and saves them in the output folder.
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    qa.resultsPath = args.results
+    qa.PlotGraphSet( args.devices, args.sim, saveDir=args.output, intervals=args.intervals, workers=args.workers, xeb=args.xeb )
+
+
+def convert ( args ):
+
+    # Converts results files into JSON, with one JSON array per line (corresponding to the lines of the original files).
+    # The converted files are put in the output folder, with the same structure as the results folder.
+
+    catalogEntries = catalog.loadCatalog( args.results ).values()
+
+    for entry in sorted( catalogEntries, key=lambda entry: ( entry['device'], entry['folder'], entry['fileType'] ) ):
+
+        if args.devices and entry['device'] not in args.devices:
+            continue
+
+        filename = entry['fileType'] + '_move=' + entry['move'] + '_shots=' + str(entry['shots']) + '_sim=' + str(entry['sim'])
+        inFolder = os.path.join( args.results, entry['device'], entry['folder'] )
+        outFolder = os.path.join( args.output, entry['device'], entry['folder'] )
+        if not os.path.exists(outFolder):
+            os.makedirs(outFolder)
+
+        with open( os.path.join(inFolder,filename+'.txt') ) as inFile:
+            with open( os.path.join(outFolder,filename+'.json'), 'w' ) as outFile:
+                for line in inFile:
+                    if line.strip():
+                        outFile.write( json.dumps( eval(line) ) + '\n' )
+
+        print("Converted " + os.path.join(inFolder,filename+'.txt'))
+
+
+def makeParser ( ):
+
+    # Sets up the argument parser for all commands.
+
+    parser = argparse.ArgumentParser( description="Collect and analyse data for Quantum Awesomeness without using notebooks." )
+    commands = parser.add_subparsers( dest='command' )
+
+    def addRunOptions ( command, simDefault ):
+        command.add_argument( 'devices', nargs='+', help="devices to use" )
+        command.add_argument( '--sim', nargs='+', type=parseSim, default=simDefault, help="whether to use simulated (True) or real (False) runs" )
+        command.add_argument( '--move', nargs='+', default=None, help="moves to use (default: as given by getLayout)" )
+        command.add_argument( '--shots', nargs='+', type=int, default=None, help="shots to use (default: as given by getLayout)" )
+        command.add_argument( '--workers', type=int, default=1, help="number of processes to use" )
+
+    command = commands.add_parser( 'collect', help="run games with GetData() and save the results" )
+    addRunOptions( command, [True] )
+    command.add_argument( '--samples', type=int, default=None, help="number of games (default: as given by getLayout)" )
+    command.add_argument( '--max-score', type=int, default=None, help="number of rounds per game (default: as given by getLayout)" )
+    command.add_argument( '--batch-size', type=int, default=10, help="number of games for each call of GetData()" )
+    command.add_argument( '--seed', type=int, default=None, help="seed for the run, from which the seed of each game is made and saved" )
+    command.add_argument( '--no-conjugates', action='store_true', help="don't save conjugates (they can be regenerated from the game seeds when --seed is used)" )
+    command.add_argument( '--target', type=float, default=None, help="stop once the confidence intervals for fuzz and correctness are narrower than this (--samples is then the maximum)" )
+    command.add_argument( '--resume', action='store_true', help="carry on from where a previous collection stopped, counting games already saved towards --samples" )
+    command.add_argument( '--mitigate', action='store_true', help="run calibration circuits with each game, and save data with readout error mitigation" )
+    command.add_argument( '--correlations', action='store_true', help="also save the correlations between all pairs of qubits for each round" )
+    command.add_argument( '--writer', default=None, help="name for this collection, needed when several collections add to the same results at once (use the same name with --resume)" )
+    command.add_argument( '--output', default=qa.resultsPath, help="results folder to save to" )
+    command.set_defaults( function=collect )
+
+    command = commands.add_parser( 'merge', help="merge shards of results saved by many writers into the main files" )
+    command.add_argument( 'devices', nargs='+', help="devices whose shards are merged" )
+    command.add_argument( '--results', default=qa.resultsPath, help="results folder" )
+    command.add_argument( '--keep', action='store_true', help="move merged games to a 'merged' folder in each shard, rather than removing them" )
+    command.set_defaults( function=merge )
+
+    command = commands.add_parser( 'process', help="process saved results with ProcessData()" )
+    addRunOptions( command, [True,False] )
+    command.add_argument( '--cleanup', action='store_true', help="also process with error mitigation" )
+    command.add_argument( '--mitigated', action='store_true', help="process the data with readout error mitigation" )
+    command.add_argument( '--xeb', action='store_true', help="also find the XEB fidelity from the saved raw results" )
+    command.add_argument( '--results', default=qa.resultsPath, help="results folder to load from" )
+    command.add_argument( '--output', default='processed', help="folder to save processed data to" )
+    command.set_defaults( function=process )
+
+    command = commands.add_parser( 'spectrum', help="find how correlations spread through the device from saved results with SpectrumData()" )
+    addRunOptions( command, [False] )
+    command.add_argument( '--results', default=qa.resultsPath, help="results folder to load from" )
+    command.add_argument( '--output', default='processed', help="folder to save the spectra to" )
+    command.set_defaults( function=spectrum )
+
+    command = commands.add_parser( 'evaluate', help="compare guessing strategies on the same simulated games with EvaluateStrategies()" )
+    command.add_argument( 'devices', nargs='+', help="devices to use" )
+    command.add_argument( '--strategies', nargs='+', default=None, help="moves whose guesses are compared (default: all bots)" )
+    command.add_argument( '--trunk', default='C', help="move used to carry on each game" )
+    command.add_argument( '--shots', type=int, default=None, help="shots for each puzzle (default: as given by getLayout for simulated runs)" )
+    command.add_argument( '--samples', type=int, default=None, help="number of games (default: as given by getLayout for simulated runs)" )
+    command.add_argument( '--max-score', type=int, default=None, help="number of rounds per game (default: as given by getLayout for simulated runs)" )
+    command.add_argument( '--seed', type=int, default=None, help="seed from which the seed of each game is made" )
+    command.add_argument( '--output', default='processed', help="folder to save the comparisons to" )
+    command.set_defaults( function=evaluate )
+
+    command = commands.add_parser( 'tournament', help="replay all saved games with every bot using RunTournament()" )
+    command.add_argument( 'devices', nargs='+', help="devices whose saved games are used" )
+    command.add_argument( '--sim', nargs='+', type=parseSim, default=[True,False], help="whether to use simulated (True) or real (False) runs" )
+    command.add_argument( '--bots', nargs='+', default=None, help="moves of the bots to compare (default: all bots)" )
+    command.add_argument( '--workers', type=int, default=1, help="number of processes to use" )
+    command.add_argument( '--chunk', type=int, default=50, help="number of games replayed in each task" )
+    command.add_argument( '--seed', type=int, default=0, help="seed for bots that make random choices" )
+    command.add_argument( '--folder', default='', help="subfolder of the device folders from which the games are used" )
+    command.add_argument( '--results', default=qa.resultsPath, help="results folder to load from (the guesses of bots are cached here)" )
+    command.add_argument( '--output', default='processed', help="folder to save the tables to" )
+    command.set_defaults( function=tournament )
+
+    command = commands.add_parser( 'synthesize', help="make games from a noise model fitted to saved data with SyntheticData()" )
+    addRunOptions( command, [False] )
+    command.add_argument( '--games', type=int, default=10000, help="number of games to make for each spec" )
+    command.add_argument( '--batch-size', type=int, default=10000, help="number of games made at once" )
+    command.add_argument( '--seed', type=int, default=0, help="seed for the noise model and games" )
+    command.add_argument( '--folder', default='synthetic', help="subfolder of the device folders in which the games are saved" )
+    command.add_argument( '--results', default=qa.resultsPath, help="results folder with the saved data (the games are saved here too)" )
+    command.set_defaults( function=synthesize )
+
+    command = commands.add_parser( 'plot', help="save the graphs made by PlotGraphSet() to file" )
+    command.add_argument( 'devices', nargs='+', help="devices to use" )
+    command.add_argument( '--sim', nargs='+', type=parseSim, default=[True,False], help="whether to use simulated (True) or real (False) runs" )
+    command.add_argument( '--results', default=qa.resultsPath, help="results folder to load from" )
+    command.add_argument( '--output', default='graphs', help="folder to save graphs to" )
+    command.add_argument( '--intervals', action='store_true', help="show bootstrap confidence intervals as error bars" )
+    command.add_argument( '--xeb', action='store_true', help="also plot the XEB fidelity for runs with saved raw results" )
+    command.add_argument( '--workers', type=int, default=1, help="number of processes to use" )
+    command.set_defaults( function=plot )
+
+    command = commands.add_parser( 'convert', help="convert results files to JSON" )
+    command.add_argument( 'devices', nargs='*', help="devices to convert (default: all)" )
+    command.add_argument( '--results', default=qa.resultsPath, help="results folder to load from" )
+    command.add_argument( '--output', default='json', help="folder to save converted files to" )
+    command.set_defaults( function=convert )
+
+    return parser
+
+
+def main ( argv=None ):
+
+    parser = makeParser()
+    args = parser.parse_args( argv )
+
+    if args.command is None:
+        parser.print_help()
+        return 1
+
+    args.function( args )
+
+    return 0
+
+
+if __name__=='__main__':
+    sys.exit( main() )
@@ -7,7 +7,7 @@ This means that the notebooks/GetData.ipynb must have already been run (sim=True
 The getLayout() function is where the details of a device must be entered, including name, number of qubits, connectivity, SDK, etc.
 '''
 
-from devicePrep import *
+from devicePrep import makeExample, makeLayout
 
 def supportedDevices ():
 
@@ -298,6 +298,7 @@ def getLayout (device):
     else:
         
         area,  pairs, pos, example = makeLayout (device)
+        num = len(pos)
         entangleType = "CZ"
         sdk = "QISKit" # any could be used, but QISKit is the best sdk
         runs = {True:{'shots':[100],'move':['C','R'],'maxScore':20,'samples':100},False:{'shots':[],'move':[],'maxScore':0,'samples':0}}
@@ -0,0 +1,366 @@
+'''
+Probability distributions for the outcomes of running a circuit, stored as numpy arrays rather than dictionaries of bit strings.
+
+Each outcome is given an integer code, in which bit v (the bit with value 2**v) is the result for qubit v.
+A distribution is a dictionary with:
+    - 'num': the number of qubits.
+    - 'codes': array of the codes of the outcomes (in increasing order), or None if the distribution is dense.
+    - 'probs': array of the probability of each outcome. For a dense distribution, there is one for every possible outcome, with the code as the position.
+    - 'shots': the number of shots that the probabilities come from, or None if they are exact (such as from a statevector simulator).
+
+Whether a distribution is dense or sparse is decided by makeDistribution(), depending on how many outcomes it has (see maxDenseQubits and denseFraction).
+Bit strings (such as '0101', with character v as the result for qubit v) are only made when the results are saved, using toStrings(). Saved results are read back with fromStrings().
+
+    import distributions
+    distribution = distributions.fromCounts( codes, counts, num )
+    oneProb = distributions.oneProbs( distribution )
+    results = distributions.toStrings( distribution )
+
+The Z correlators of a distribution (the averages of products of Z=+1/-1 for sets of qubits) are given by the Walsh-Hadamard transform of the probabilities (see zCorrelators() ).
+How much they add up to for sets of each size is given by correlatorWeights(), which shows how far correlations have spread through the device.
+'''
+
+import numpy
+
+# distributions are only made dense for up to this many qubits (a dense distribution needs 2^num numbers)
+maxDenseQubits = 20
+
+# a distribution is made dense when the fraction of all possible outcomes that occur is at least this (sparse distributions need a code as well as a probability for each outcome)
+denseFraction = 0.5
+
+# codes for more qubits than this do not fit in 64 bit integers, and so are stored as Python integers (in arrays with dtype=object)
+maxIntegerQubits = 62
+
+
+def isDistribution ( results ):
+
+    # Returns True if *results* is a distribution, rather than a dictionary of bit strings or a job id.
+
+    return type(results) is dict and 'codes' in results and 'probs' in results and 'num' in results
+
+
+def codeType ( num ):
+
+    # Returns the dtype used for the codes of outcomes for *num* qubits.
+
+    return numpy.int64 if num<=maxIntegerQubits else object
+
+
+def makeDistribution ( codes, probs, num, shots=None ):
+
+    # Input:
+    # * *codes* - Array of outcome codes (which may contain repeats).
+    # * *probs* - Array of the corresponding probabilities (those of repeated codes are added together).
+    # * *num* - The number of qubits.
+    # * *shots* - Number of shots that the probabilities come from (or None if they are exact).
+    #
+    # Process:
+    # * The probabilities are added up for each code, and stored densely or sparsely (see denseFraction).
+    #
+    # Output:
+    # * *distribution* - Dictionary as described at the top of this file.
+
+    codes = numpy.asarray( codes, dtype=codeType(num) ).reshape(-1)
+    probs = numpy.asarray( probs, dtype=float ).reshape(-1)
+
+    support, inverse = numpy.unique( codes, return_inverse=True )
+    summed = numpy.bincount( inverse, weights=probs, minlength=len(support) )
+
+    if num<=maxDenseQubits and len(support)>=denseFraction*2**num:
+        dense = numpy.zeros( 2**num )
+        dense[support] = summed
+        return {'num':num, 'codes':None, 'probs':dense, 'shots':shots}
+    else:
+        return {'num':num, 'codes':support, 'probs':summed, 'shots':shots}
+
+
+def fromCounts ( codes, counts, num ):
+
+    # Makes a distribution from the number of shots that gave each outcome (see makeDistribution() ).
+
+    counts = numpy.asarray( counts, dtype=float )
+    shots = int( counts.sum() )
+
+    return makeDistribution( codes, counts/max(shots,1), num, shots=shots )
+
+
+def fromMeasurements ( measurements, num, qubits=None ):
+
+    # Input:
+    # * *measurements* - Array (or list of lists) with measurements[s][j] as the result of shot s for the jth measured qubit.
+    # * *num* - The number of qubits.
+    # * *qubits* - List of the qubits that were measured, in the order of the columns of *measurements* (by default, all of them in order). Any others are given the result 0.
+    #
+    # Output:
+    # * *distribution* - Distribution of the fraction of shots for which each outcome occurred.
+
+    measurements = numpy.asarray( measurements, dtype=bool ).reshape( -1, num if qubits is None else len(qubits) )
+
+    if qubits is None:
+        bits = measurements
+    else:
+        bits = numpy.zeros( ( len(measurements), num ), dtype=bool )
+        bits[:,qubits] = measurements
+
+    return fromCounts( getCodes( bits ), numpy.ones( len(bits) ), num )
+
+
+def fromStrings ( results, num=None, shots=None ):
+
+    # Input:
+    # * *results* - Dictionary with bit strings as keys (with character v as the result for qubit v) and probabilities as values, as saved in results files.
+    # * *num* - The number of qubits (by default, the length of the strings).
+    # * *shots* - See makeDistribution().
+    #
+    # Output:
+    # * *distribution* - The same results as a distribution.
+
+    strings = list( results.keys() )
+    if num is None:
+        num = len( strings[0] ) if strings else 0
+
+    # the strings are reversed so that the first character is the least significant bit
+    codes = [ int( string[0:num][::-1], 2 ) if num>0 else 0 for string in strings ]
+
+    return makeDistribution( codes, [ results[string] for string in strings ], num, shots=shots )
+
+
+def getSupport ( distribution ):
+
+    # Returns arrays of the codes and probabilities of the outcomes that have non-zero probability.
+
+    if distribution['codes'] is None:
+        codes = numpy.nonzero( distribution['probs'] )[0]
+        return codes, distribution['probs'][codes]
+    else:
+        nonzero = distribution['probs']!=0
+        return distribution['codes'][nonzero], distribution['probs'][nonzero]
+
+
+def getBits ( codes, num ):
+
+    # Returns a boolean array with bits[j,v] as the result for qubit v in the outcome with code codes[j].
+
+    return ( ( numpy.asarray( codes, dtype=codeType(num) )[:,None] >> numpy.arange(num).astype( codeType(num) ) ) & 1 ).astype(bool)
+
+
+def getCodes ( bits ):
+
+    # Returns the codes of the outcomes given by a boolean array with bits[j,v] as the result for qubit v in the jth outcome (the reverse of getBits() ).
+
+    bits = numpy.asarray( bits, dtype=bool )
+    num = bits.shape[1]
+
+    return bits.astype( codeType(num) ).dot( numpy.ones( num, dtype=codeType(num) ) << numpy.arange(num).astype( codeType(num) ) )
+
+
+def toStrings ( distribution, cutoff=0 ):
+
+    # Input:
+    # * *distribution* - See makeDistribution().
+    # * *cutoff* - Outcomes with probabilities no larger than this are left out.
+    #
+    # Output:
+    # * *results* - Dictionary with bit strings as keys (with character v as the result for qubit v) and probabilities as values, as saved in results files.
+
+    codes, probs = getSupport( distribution )
+    keep = probs>cutoff
+    codes, probs = codes[keep], probs[keep]
+
+    characters = numpy.array( ['0','1'] )[ getBits( codes, distribution['num'] ).astype(int) ]
+
+    return { ''.join(string): prob for string, prob in zip( characters.tolist(), probs.tolist() ) }
+
+
+def sample ( distribution, shots, generator=numpy.random ):
+
+    # Input:
+    # * *distribution* - See makeDistribution().
+    # * *shots* - Number of samples to take.
+    # * *generator* - Random number generator (numpy.random, or a numpy.random.RandomState).
+    #
+    # Output:
+    # * *sampled* - Distribution of the sampled outcomes, with probabilities given by the fraction of shots for which each occurred.
+
+    codes, probs = getSupport( distribution )
+
+    samples = generator.choice( len(codes), size=shots, p=probs/probs.sum() )
+
+    return fromCounts( codes, numpy.bincount( samples, minlength=len(codes) ), distribution['num'] )
+
+
+def pairMarginal ( distribution, v0, v1 ):
+
+    # Returns a 2x2 array with the probabilities for the results of qubits v0 and v1 (which must be different) in a dense distribution.
+
+    num = distribution['num']
+    low, high = min(v0,v1), max(v0,v1)
+
+    # with the code as position, bit v of the code is an axis of length 2 when the probabilities are reshaped like this
+    marginal = distribution['probs'].reshape( 2**(num-high-1), 2, 2**(high-low-1), 2, 2**low ).sum( axis=(0,2,4) )
+
+    return marginal if v0>v1 else marginal.T
+
+
+def oneProbs ( distribution ):
+
+    # Returns an array with the probability that each qubit gives the result 1.
+
+    num = distribution['num']
+
+    if distribution['codes'] is None:
+        return numpy.array( [ distribution['probs'].reshape( 2**(num-v-1), 2, 2**v )[:,1,:].sum() for v in range(num) ] )
+
+    codes, probs = getSupport( distribution )
+
+    return probs.dot( getBits( codes, num ) )
+
+
+def sameProbs ( distribution, q0, q1 ):
+
+    # Returns an array with the probability that the qubits q0[k] and q1[k] give the same result, for each k.
+
+    if distribution['codes'] is None:
+        return numpy.array( [ numpy.trace( pairMarginal( distribution, v0, v1 ) ) for v0, v1 in zip( q0, q1 ) ] )
+
+    codes, probs = getSupport( distribution )
+    bits = getBits( codes, distribution['num'] )
+
+    return probs.dot( bits[:,q0]==bits[:,q1] )
+
+
+def sameMatrix ( distribution ):
+
+    # Input:
+    # * *distribution* - See makeDistribution().
+    #
+    # Process:
+    # * With B as the matrix of bits for each outcome and W as the diagonal matrix of their probabilities, the single product B^T W B gives the probability that both qubits give 1, for every pair of qubits at once.
+    #   Together with the oneProbs (its diagonal), this fixes the probability that they give the same result.
+    #
+    # Output:
+    # * *same* - Array with same[v0,v1] as the probability that qubits v0 and v1 give the same result (and so 1 on the diagonal).
+
+    codes, probs = getSupport( distribution )
+    bits = getBits( codes, distribution['num'] ).astype(float)
+
+    both = bits.T.dot( bits*probs[:,None] )
+    one = numpy.diag( both )
+
+    return 1 - one[:,None] - one[None,:] + 2*both
+
+
+def walshHadamard ( values ):
+
+    # Returns the Walsh-Hadamard transform of an array of 2^num values, with transformed[S] as the sum of values[x]*(-1)^(number of bits set in both x and S).
+    # This is done with a butterfly for each bit, which takes O(num*2^num) steps.
+
+    transformed = numpy.array( values, dtype=float )
+    num = len(transformed).bit_length() - 1
+
+    for v in range(num):
+        transformed = transformed.reshape( 2**(num-v-1), 2, 2**v )
+        transformed = numpy.concatenate( [ transformed[:,0:1,:] + transformed[:,1:2,:], transformed[:,0:1,:] - transformed[:,1:2,:] ], axis=1 )
+
+    return transformed.reshape(-1)
+
+
+def getDense ( distribution ):
+
+    # Returns the probabilities of a distribution as a dense array (with the code as position).
+
+    if distribution['codes'] is None:
+        return distribution['probs']
+
+    dense = numpy.zeros( 2**distribution['num'] )
+    dense[ distribution['codes'] ] = distribution['probs']
+
+    return dense
+
+
+def zCorrelators ( distribution ):
+
+    # Input:
+    # * *distribution* - See makeDistribution(). This must have no more than maxDenseQubits qubits.
+    #
+    # Output:
+    # * *correlators* - Array with correlators[S] as the average of the product of Z for the qubits whose bits are set in S, for every set S (so correlators[0] is 1).
+
+    if distribution['num']>maxDenseQubits:
+        raise ValueError( "Correlators can only be found for all sets of up to " + str(maxDenseQubits) + " qubits (use correlatorWeights instead)" )
+
+    return walshHadamard( getDense( distribution ) )
+
+
+def krawtchouk ( num ):
+
+    # Returns a table with table[d][k] as the sum of (-1)^(number of bits set in both x and S) over all sets S of k qubits, for any x with d bits set.
+    # These are the coefficients of z^k in (1-z)^d (1+z)^(num-d), and are calculated as Python integers so that they are exact.
+
+    table = []
+    for d in range(num+1):
+        poly = [1]
+        for factor in [-1]*d + [1]*(num-d):
+            poly = [ a + factor*b for a, b in zip( poly+[0], [0]+poly ) ]
+        table.append( poly )
+
+    return table
+
+
+def correlatorWeights ( distribution, unbiased=True, chunk=1024 ):
+
+    # Input:
+    # * *distribution* - See makeDistribution().
+    # * *unbiased* - Boolean determining whether the weights are corrected for the statistical noise of a finite number of shots.
+    #                Each squared correlator from N shots is too large by (1-c^2)/N on average, and so is replaced by (N*c^2-1)/(N-1). Nothing is done for exact distributions.
+    # * *chunk* - Number of outcomes dealt with at once for large distributions (to limit the memory used).
+    #
+    # Process:
+    # * For up to maxDenseQubits qubits, all correlators are found (see zCorrelators() ) and their squares are added up for each number of qubits.
+    # * For more qubits, the sum of squared correlators for sets of k qubits is found from pairs of outcomes instead. For outcomes x and y, the sum over these sets of the product of their signs
+    #   depends only on the number d of bits in which they differ (see krawtchouk() ). So only the probability that two outcomes differ by d bits is needed, which takes O(outcomes^2) steps.
+    #
+    # Output:
+    # * *weights* - Array with weights[k] as the sum of squares of the correlators for all sets of k qubits (so weights[0] is 1).
+
+    num = distribution['num']
+    shots = distribution['shots']
+
+    if num<=maxDenseQubits:
+
+        correlators = zCorrelators( distribution )
+        orders = numpy.zeros( 2**num, dtype=int )
+        for v in range(num):
+            orders += ( numpy.arange( 2**num ) >> v ) & 1
+        weights = numpy.bincount( orders, weights=correlators**2, minlength=num+1 )
+
+    else:
+
+        codes, probs = getSupport( distribution )
+        spins = 1 - 2*getBits( codes, num ).astype(float)
+
+        # the probability that two outcomes differ in d bits, for each d
+        distances = numpy.zeros( num+1 )
+        for start in range( 0, len(codes), chunk ):
+            overlaps = spins[start:start+chunk].dot( spins.T )
+            differing = numpy.rint( ( num - overlaps )/2 ).astype(int)
+            distances += numpy.bincount( differing.reshape(-1), weights=( probs[start:start+chunk,None]*probs[None,:] ).reshape(-1), minlength=num+1 )
+
+        # these are multiples of 1/shots^2, and so are made into integers to use the exact table (the correction for the noise can then also be done exactly)
+        table = krawtchouk( num )
+        if shots is not None:
+            distances = [ int( round( distance*shots**2 ) ) for distance in distances ]
+            sums = [ sum( distances[d]*table[d][k] for d in range(num+1) ) for k in range(num+1) ]
+            if unbiased and shots>1:
+                return numpy.array( [ ( sums[k] - shots*table[0][k] )/( shots*(shots-1) ) for k in range(num+1) ] )
+            else:
+                return numpy.array( [ sums[k]/shots**2 for k in range(num+1) ] )
+        else:
+            weights = numpy.array( [ sum( distances[d]*table[d][k] for d in range(num+1) ) for k in range(num+1) ] )
+
+    # there are krawtchouk(num)[0][k] sets of k qubits
+    if unbiased and shots is not None and shots>1:
+        sets = numpy.array( [ float(number) for number in krawtchouk( num )[0] ] )
+        weights = ( shots*weights - sets )/( shots - 1 )
+
+    return weights
@@ -0,0 +1,380 @@
+'''
+A server that lets many people play the game at once over HTTP (such as at an event booth), using the games saved for the supported devices.
+
+    python gameServer.py                          # serve all saved games on port 8080
+    python gameServer.py --port 8000 --devices ibmqx4 ibmqx5
+
+As for runGame() with dataNeeded=False, the puzzles are those of saved move='C' runs. All of them are loaded when the server starts, and kept as numpy arrays:
+the oneProbs of each game and round, and which pairs were used to make each puzzle. No circuits are run and no files are read while playing, so each request takes very little time.
+
+Requests and replies are JSON:
+    GET  /games                                       -> {device: [ {'shots':..., 'sim':..., 'games':..., 'rounds':...}, ... ], ...}
+    POST /new    {"device":"ibmqx4"}                  -> {'session':..., 'device':..., 'pairs':{...}, 'positions':{...}, 'round':1, 'rounds':..., 'puzzle':[oneProb of each qubit]}
+    POST /guess  {"session":..., "pairs":["A","D"]}   -> {'round':..., 'guessed':[...], 'correct':[...], 'answer':[...], 'score':..., 'total':..., 'puzzle':[...]}
+For /new, "shots", "sim" and "game" can also be given to choose which saved game is played. The reply to /guess has no 'puzzle' once the game is over, and 'finished' is then True.
+Sessions that are not used for sessionTimeout seconds are forgotten.
+
+The server uses asyncio from the standard library, with a simple HTTP/1.1 implementation that keeps connections open between requests. Everything runs on one thread, since every request is handled without waiting for anything.
+See loadTest.py for a load test.
+'''
+
+import asyncio, json, random, secrets, time, argparse, sys, traceback
+
+import numpy
+
+import QuantumAwesomeness as qa
+import resultsCatalog as catalog
+from devices import supportedDevices, getLayout
+
+# sessions that have not been used for this long (in seconds) are forgotten
+sessionTimeout = 3600
+
+# largest request body (in bytes) that will be read
+maxBody = 65536
+
+reasons = {200:'OK', 204:'No Content', 400:'Bad Request', 404:'Not Found', 405:'Method Not Allowed', 413:'Payload Too Large', 500:'Internal Server Error'}
+
+
+def loadGames ( resultsPath, devices=None ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    # * *devices* - List of devices whose games are loaded (by default, those given by supportedDevices() ).
+    #
+    # Process:
+    # * For every move='C' run of these devices in the catalog with oneProbs and gates files, the oneProbs and the pairs used for each puzzle are loaded.
+    #   Games are cut down to the smallest number of rounds in the run, so that each run can be held in a single array.
+    #
+    # Output:
+    # * *games* - Dictionary with devices as keys. Each value is a dictionary with:
+    #     - 'pairs', 'positions': the pairs that can be guessed (with fake pairs left out) and the positions of the qubits, as given by getLayout()
+    #     - 'names': the names of all pairs, in the order of getPairIndex()
+    #     - 'runs': a list with a dictionary for each run, with its 'shots' and 'sim', 'oneProbs' (a float32 array with oneProbs[j,s,n] for qubit n in round s of game j) and 'answers' (a boolean array with answers[j,s,k] as True if the kth pair was used to make the puzzle)
+
+    if devices is None:
+        devices = supportedDevices()
+
+    qa.resultsPath = resultsPath
+
+    games = {}
+    for device in devices:
+
+        num, area, entangleType, pairs, pos, example, sdk, runs = getLayout(device)
+        index = qa.getPairIndex( pairs )
+
+        games[device] = { 'pairs':{ p:pairs[p] for p in pairs if p[0:4]!='fake' }, 'positions':{ str(n):list(pos[n]) for n in pos }, 'names':index['names'], 'runs':[] }
+
+        for entry in sorted( catalog.loadCatalog( resultsPath ).values(), key=lambda entry: ( entry['shots'], entry['sim'] ) ):
+            if entry['device']==device and entry['fileType']=='oneProbs' and entry['move']=='C' and entry['folder']=='':
+                if catalog.dataAvailable( resultsPath, device, 'C', entry['shots'], entry['sim'], fileTypes=['oneProbs','gates'] ):
+
+                    oneProbSamples = qa.resultsLoad( 'oneProbs', 'C', entry['shots'], entry['sim'], device )
+                    gateSamples = qa.resultsLoad( 'gates', 'C', entry['shots'], entry['sim'], device )
+                    rounds = min( [ len(oneProbSample) for oneProbSample in oneProbSamples ] )
+
+                    oneProbs = numpy.array( [ oneProbSample[0:rounds] for oneProbSample in oneProbSamples ], dtype=numpy.float32 )
+                    answers = numpy.array( [ [ [ p in gateSample[2*score] for p in index['names'] ] for score in range(rounds) ] for gateSample in gateSamples ], dtype=bool )
+
+                    games[device]['runs'].append( { 'shots':entry['shots'], 'sim':entry['sim'], 'oneProbs':oneProbs, 'answers':answers } )
+
+        if not games[device]['runs']:
+            del games[device]
+
+    return games
+
+
+def describeGames ( games ):
+
+    # Returns the devices in *games* (see loadGames() ), with the shots, sim, number of games and number of rounds of each run.
+
+    return { device: [ { 'shots':run['shots'], 'sim':run['sim'], 'games':run['oneProbs'].shape[0], 'rounds':run['oneProbs'].shape[1] } for run in games[device]['runs'] ] for device in games }
+
+
+def getPuzzle ( run, game, score ):
+
+    # Returns the oneProbs for round *score* (numbered from 0) of the given game, as a list of floats rounded to 3 decimal places.
+
+    return run['oneProbs'][game,score].astype(float).round(3).tolist()
+
+
+def newSession ( games, sessions, request, generator=random ):
+
+    # Input:
+    # * *games* - Games loaded by loadGames().
+    # * *sessions* - Dictionary of sessions, to which the new one is added.
+    # * *request* - Dictionary with the 'device', and optionally the 'shots', 'sim' and 'game' to be played.
+    # * *generator* - Random number generator used to choose the run and game, if they are not given.
+    #
+    # Output:
+    # * *status* - HTTP status code.
+    # * *reply* - Dictionary to be sent back (see the top of this file), or with an 'error' if the request could not be done.
+
+    device = request.get('device')
+    if type(device) is not str:
+        return 400, { 'error':"The device should be given as a string" }
+    if device not in games:
+        return 404, { 'error':"There are no games for device " + str(device) }
+
+    runs = [ run for run in games[device]['runs'] if request.get('shots',run['shots'])==run['shots'] and request.get('sim',run['sim'])==run['sim'] ]
+    if not runs:
+        return 404, { 'error':"There are no games for device " + device + " with the given shots and sim" }
+    run = generator.choice( runs )
+
+    game = request.get('game')
+    if game is None:
+        game = generator.randrange( run['oneProbs'].shape[0] )
+    elif type(game) is not int or not 0<=game<run['oneProbs'].shape[0]:
+        return 400, { 'error':"The game should be a number from 0 to " + str(run['oneProbs'].shape[0]-1) }
+
+    session = secrets.token_hex(8)
+    sessions[session] = { 'device':device, 'run':run, 'game':game, 'score':0, 'correct':0, 'total':0, 'time':time.monotonic() }
+
+    return 200, { 'session':session, 'device':device, 'shots':run['shots'], 'sim':run['sim'], 'game':game,
+                  'pairs':games[device]['pairs'], 'positions':games[device]['positions'],
+                  'round':1, 'rounds':run['oneProbs'].shape[1], 'puzzle':getPuzzle( run, game, 0 ) }
+
+
+def guessSession ( games, sessions, request ):
+
+    # Input:
+    # * *games*, *sessions* - See newSession().
+    # * *request* - Dictionary with the 'session' and a list of the names of the guessed 'pairs' (which must not share qubits).
+    #
+    # Process:
+    # * The guessed pairs are compared to those used to make the puzzle, and the session moves on to the next round.
+    #
+    # Output:
+    # * *status*, *reply* - See newSession().
+
+    if type( request.get('session') ) is not str:
+        return 400, { 'error':"The session should be given as a string" }
+    session = sessions.get( request['session'] )
+    if session is None:
+        return 404, { 'error':"There is no such session (it may have timed out)" }
+    session['time'] = time.monotonic()
+
+    pairs = games[ session['device'] ]['pairs']
+    guessed = request.get('pairs',[])
+    if type(guessed) is not list or any( type(p) is not str or p not in pairs for p in guessed ):
+        return 400, { 'error':"Pairs should be a list of the names of pairs of the device" }
+    qubits = [ n for p in guessed for n in pairs[p] ]
+    if len(set(qubits))<len(qubits):
+        return 400, { 'error':"Guessed pairs cannot share qubits" }
+
+    run = session['run']
+    rounds = run['oneProbs'].shape[1]
+    names = games[ session['device'] ]['names']
+    answer = [ names[k] for k in numpy.nonzero( run['answers'][ session['game'], session['score'] ] )[0] ]
+    correct = sorted( set(guessed) & set(answer) )
+
+    session['score'] += 1
+    session['correct'] += len(correct)
+    session['total'] += len(answer)
+
+    reply = { 'round':session['score'], 'guessed':sorted(guessed), 'correct':correct, 'answer':sorted(answer), 'score':session['correct'], 'total':session['total'], 'finished':session['score']>=rounds }
+    if reply['finished']:
+        del sessions[ request['session'] ]
+    else:
+        reply['puzzle'] = getPuzzle( run, session['game'], session['score'] )
+
+    return 200, reply
+
+
+def expireSessions ( sessions, timeout=sessionTimeout ):
+
+    # Removes sessions that have not been used for *timeout* seconds, and returns how many were removed.
+
+    now = time.monotonic()
+    expired = [ session for session in sessions if now-sessions[session]['time']>timeout ]
+    for session in expired:
+        del sessions[session]
+
+    return len(expired)
+
+
+def handleRequest ( games, sessions, method, target, body ):
+
+    # Input:
+    # * *games*, *sessions* - See newSession().
+    # * *method*, *target* - The method and path of the HTTP request.
+    # * *body* - Bytes of the body of the request.
+    #
+    # Output:
+    # * *status*, *reply* - See newSession(). The reply is None for requests with no body in the reply.
+
+    path = target.split('?')[0]
+
+    if method=='OPTIONS':
+        return 204, None
+
+    if path=='/games':
+        if method!='GET':
+            return 405, { 'error':"Use GET for /games" }
+        return 200, describeGames( games )
+
+    if path in ['/new','/guess']:
+        if method!='POST':
+            return 405, { 'error':"Use POST for " + path }
+        try:
+            request = json.loads( body.decode('utf-8') or '{}' )
+        except ValueError:
+            return 400, { 'error':"The body should be JSON" }
+        if type(request) is not dict:
+            return 400, { 'error':"The body should be a JSON object" }
+        if path=='/new':
+            return newSession( games, sessions, request )
+        else:
+            return guessSession( games, sessions, request )
+
+    return 404, { 'error':"Unknown path " + path }
+
+
+async def readRequest ( reader ):
+
+    # Reads an HTTP request from the stream, and returns the method, target, HTTP version, headers (with lower case names) and body, or None if the connection was closed.
+    # A ValueError is raised if the request is not valid.
+
+    line = await reader.readline()
+    if not line:
+        return None
+
+    parts = line.decode('latin-1').split()
+    if len(parts)!=3:
+        raise ValueError( "Invalid request line" )
+    method, target, version = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in [b'\r\n',b'\n',b'']:
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[ name.strip().lower() ] = value.strip()
+
+    length = int( headers.get('content-length','0') )
+    if length>maxBody:
+        raise ValueError( "Request body is too large" )
+    body = await reader.readexactly( length ) if length else b''
+
+    return method, target, version, headers, body
+
+
+def makeResponse ( status, reply, keepAlive ):
+
+    # Returns the bytes of an HTTP response with the given status and JSON reply.
+
+    body = b'' if reply is None else json.dumps( reply ).encode('utf-8')
+
+    head = 'HTTP/1.1 ' + str(status) + ' ' + reasons[status] + '\r\n'
+    head += 'Content-Type: application/json\r\n'
+    head += 'Content-Length: ' + str(len(body)) + '\r\n'
+    head += 'Access-Control-Allow-Origin: *\r\n'
+    head += 'Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n'
+    head += 'Access-Control-Allow-Headers: Content-Type\r\n'
+    head += 'Connection: ' + ( 'keep-alive' if keepAlive else 'close' ) + '\r\n\r\n'
+
+    return head.encode('latin-1') + body
+
+
+def makeHandler ( games, sessions ):
+
+    # Returns the function that asyncio.start_server() calls for each connection. Requests on the connection are handled one at a time until either side closes it.
+
+    async def handleConnection ( reader, writer ):
+        try:
+            while True:
+                try:
+                    request = await readRequest( reader )
+                except ( ValueError, asyncio.IncompleteReadError ) as error:
+                    status = 413 if 'large' in str(error) else 400
+                    writer.write( makeResponse( status, { 'error':str(error) or "Incomplete request" }, False ) )
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, target, version, headers, body = request
+                connection = headers.get('connection','').lower()
+                keepAlive = connection!='close' if version=='HTTP/1.1' else connection=='keep-alive'
+
+                # a bug in handling one request shouldn't drop the connection without a reply
+                try:
+                    status, reply = handleRequest( games, sessions, method, target, body )
+                except Exception:
+                    traceback.print_exc()
+                    status, reply = 500, { 'error':"The server could not handle the request" }
+                writer.write( makeResponse( status, reply, keepAlive ) )
+                await writer.drain()
+
+                if not keepAlive:
+                    break
+        except ( ConnectionError, asyncio.CancelledError ):
+            pass
+        finally:
+            writer.close()
+
+    return handleConnection
+
+
+async def expireLoop ( sessions, interval=60 ):
+
+    # Removes old sessions (see expireSessions() ) every *interval* seconds.
+
+    while True:
+        await asyncio.sleep( interval )
+        expireSessions( sessions )
+
+
+async def serve ( games, host='0.0.0.0', port=8080, ready=None ):
+
+    # Input:
+    # * *games* - Games loaded by loadGames().
+    # * *host*, *port* - Address on which the server listens.
+    # * *ready* - If given, this function is called once the server is listening.
+    #
+    # Process:
+    # * The server runs until it is cancelled.
+
+    sessions = {}
+    server = await asyncio.start_server( makeHandler( games, sessions ), host, port, backlog=1024 )
+    expiry = asyncio.ensure_future( expireLoop( sessions ) )
+
+    if ready is not None:
+        ready()
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        expiry.cancel()
+
+
+def main ( argv=None ):
+
+    parser = argparse.ArgumentParser( description="Serve saved games of Quantum Awesomeness over HTTP, so that many people can play at once." )
+    parser.add_argument( '--host', default='0.0.0.0', help="address to listen on" )
+    parser.add_argument( '--port', type=int, default=8080, help="port to listen on" )
+    parser.add_argument( '--devices', nargs='+', default=None, help="devices whose games are served (default: all supported devices)" )
+    parser.add_argument( '--results', default=qa.resultsPath, help="results folder from which games are loaded" )
+    args = parser.parse_args( argv )
+
+    start = time.perf_counter()
+    games = loadGames( args.results, devices=args.devices )
+    for device, runs in describeGames( games ).items():
+        print( device + ": " + ", ".join( [ str(run['games']) + " games with shots=" + str(run['shots']) + " and sim=" + str(run['sim']) for run in runs ] ) )
+    print( "Loaded in " + str( round( time.perf_counter()-start, 2 ) ) + "s" )
+
+    def ready ( ):
+        print( "Serving on " + args.host + ":" + str(args.port) )
+        sys.stdout.flush()
+
+    try:
+        asyncio.run( serve( games, host=args.host, port=args.port, ready=ready ) )
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__=='__main__':
+    sys.exit( main() )
@@ -0,0 +1,173 @@
+'''
+Load test for gameServer.py, in which many players play whole games at once.
+
+    python loadTest.py --start                       # start a local server, and play 300 games at once against it
+    python loadTest.py --port 8080 --sessions 1000   # use a server that is already running
+
+Each player keeps one connection open, starts a game on a random device and guesses pairs for every round (choosing pairs of qubits with similar oneProbs, as a quick stand in for a person).
+The time taken for each request is recorded, and the number of requests per second and the percentiles of these times are printed at the end.
+Only the standard library is used, so that the load test can be run on any machine.
+'''
+
+import asyncio, json, random, time, argparse, subprocess, sys, os
+
+path = os.path.dirname(os.path.abspath(__file__))
+
+
+async def request ( reader, writer, method, target, payload=None ):
+
+    # Sends an HTTP request on an open connection, and returns the status and the decoded JSON reply.
+
+    body = b'' if payload is None else json.dumps( payload ).encode('utf-8')
+    head = method + ' ' + target + ' HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: ' + str(len(body)) + '\r\n\r\n'
+    writer.write( head.encode('latin-1') + body )
+    await writer.drain()
+
+    status = int( (await reader.readline()).split()[1] )
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in [b'\r\n',b'\n',b'']:
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower()=='content-length':
+            length = int(value)
+    reply = json.loads( await reader.readexactly( length ) ) if length else None
+
+    return status, reply
+
+
+def guessPairs ( pairs, puzzle, generator ):
+
+    # Input:
+    # * *pairs* - Dictionary with the names of pairs as keys and their qubits as values.
+    # * *puzzle* - List of the oneProb of each qubit.
+    # * *generator* - Random number generator used to break ties.
+    #
+    # Output:
+    # * *guessed* - Names of pairs that don't share qubits, chosen greedily from those whose qubits have the most similar oneProbs.
+
+    order = sorted( pairs, key=lambda p: ( abs( puzzle[pairs[p][0]]-puzzle[pairs[p][1]] ), generator.random() ) )
+    guessed = []
+    used = set()
+    for p in order:
+        if pairs[p][0] not in used and pairs[p][1] not in used:
+            guessed.append( p )
+            used.update( pairs[p] )
+
+    return guessed
+
+
+async def player ( host, port, devices, games, timings, errors, generator ):
+
+    # Plays *games* whole games on one connection, adding the time for each request to *timings* and any failed requests to *errors*.
+    # The fraction of pairs guessed correctly in each game is returned.
+
+    reader, writer = await asyncio.open_connection( host, port )
+    fractions = []
+    try:
+        for _ in range(games):
+            start = time.perf_counter()
+            status, reply = await request( reader, writer, 'POST', '/new', { 'device':generator.choice(devices) } )
+            timings.append( time.perf_counter()-start )
+            if status!=200:
+                errors.append( [status,reply] )
+                continue
+
+            session, pairs = reply['session'], reply['pairs']
+            while 'puzzle' in reply:
+                start = time.perf_counter()
+                status, reply = await request( reader, writer, 'POST', '/guess', { 'session':session, 'pairs':guessPairs( pairs, reply['puzzle'], generator ) } )
+                timings.append( time.perf_counter()-start )
+                if status!=200:
+                    errors.append( [status,reply] )
+                    break
+            if status==200:
+                fractions.append( reply['score']/reply['total'] )
+    finally:
+        writer.close()
+
+    return fractions
+
+
+def percentile ( values, q ):
+
+    # Returns the *q*th percentile of *values* (taking the nearest value, rather than interpolating).
+
+    values = sorted(values)
+    return values[ min( len(values)-1, int( q/100*len(values) ) ) ]
+
+
+async def runLoadTest ( host, port, sessions, games, seed=0 ):
+
+    # Input:
+    # * *host*, *port* - Address of the server.
+    # * *sessions* - Number of players who play at once.
+    # * *games* - Number of games played by each player.
+    # * *seed* - Seed for the random choices of the players.
+    #
+    # Output:
+    # * *report* - Dictionary with the number of 'requests' and 'errors', the 'duration' of the test (in seconds), the 'rate' of requests per second,
+    #              the 'latency' percentiles (in milliseconds) as a dictionary with 50, 95 and 99 as keys, and the average fraction of pairs guessed correctly ('correct').
+
+    reader, writer = await asyncio.open_connection( host, port )
+    status, described = await request( reader, writer, 'GET', '/games' )
+    writer.close()
+    devices = sorted( described.keys() )
+
+    timings = []
+    errors = []
+    start = time.perf_counter()
+    fractions = await asyncio.gather( *[ player( host, port, devices, games, timings, errors, random.Random( seed+s ) ) for s in range(sessions) ] )
+    duration = time.perf_counter() - start
+
+    fractions = [ fraction for playerFractions in fractions for fraction in playerFractions ]
+
+    return { 'requests':len(timings), 'errors':len(errors), 'duration':duration, 'rate':len(timings)/duration,
+             'latency':{ q:1000*percentile( timings, q ) for q in [50,95,99] }, 'correct':sum(fractions)/max(1,len(fractions)) }
+
+
+def startServer ( port, devices=None ):
+
+    # Starts gameServer.py in a new process, and waits until it is listening.
+
+    command = [ sys.executable, os.path.join(path,'gameServer.py'), '--host', '127.0.0.1', '--port', str(port) ]
+    if devices:
+        command += [ '--devices' ] + devices
+    server = subprocess.Popen( command, stdout=subprocess.PIPE, cwd=path )
+
+    for line in server.stdout:
+        if line.decode().startswith('Serving'):
+            return server
+    raise RuntimeError( "The server stopped before it started listening" )
+
+
+def main ( argv=None ):
+
+    parser = argparse.ArgumentParser( description="Load test for gameServer.py." )
+    parser.add_argument( '--host', default='127.0.0.1', help="address of the server" )
+    parser.add_argument( '--port', type=int, default=8080, help="port of the server" )
+    parser.add_argument( '--sessions', type=int, default=300, help="number of players who play at once" )
+    parser.add_argument( '--games', type=int, default=1, help="number of games played by each player" )
+    parser.add_argument( '--seed', type=int, default=0, help="seed for the random choices of the players" )
+    parser.add_argument( '--start', action='store_true', help="start a local server for the test (and stop it afterwards)" )
+    parser.add_argument( '--devices', nargs='+', default=None, help="devices to load, when the server is started with --start" )
+    args = parser.parse_args( argv )
+
+    server = startServer( args.port, args.devices ) if args.start else None
+    try:
+        report = asyncio.run( runLoadTest( args.host, args.port, args.sessions, args.games, seed=args.seed ) )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print( str(report['requests']) + " requests (" + str(report['errors']) + " errors) in " + str( round(report['duration'],2) ) + "s: " + str( round(report['rate']) ) + " requests per second" )
+    print( "Latency: " + ", ".join( [ "p" + str(q) + " = " + str( round(report['latency'][q],2) ) + "ms" for q in report['latency'] ] ) )
+    print( "Fraction of pairs guessed correctly: " + str( round(report['correct'],3) ) )
+
+    return 1 if report['errors'] else 0
+
+
+if __name__=='__main__':
+    sys.exit( main() )
@@ -0,0 +1,183 @@
+'''
+Mitigation of readout errors, using the results of calibration circuits.
+
+Two calibration circuits are run: one that prepares all qubits in state 0, and one that prepares them all in state 1.
+The oneProb for each (see processResults() in QuantumAwesomeness.py) gives the probability that each qubit is read out as 1 when prepared as 0 or 1.
+From these a 2x2 confusion matrix is made for each qubit, with A[v][i][j] the probability that qubit v is read out as i when prepared as j.
+
+Readout errors are assumed to be independent for each qubit, so that the confusion matrix for the whole device is the tensor product of those for each qubit.
+Its inverse is then the tensor product of the inverses, which is applied one qubit at a time. The 2^n x 2^n matrix is never formed.
+Since the columns of each inverse sum to 1, applying it commutes with taking marginals. So the oneProb and sameProb values can be mitigated directly,
+using only the one and two qubit marginals, for any number of qubits. Full distributions of results (see distributions.py) can also be mitigated, for up to maxQubits qubits.
+
+    import mitigation
+    inverses = mitigation.inverseMatrices( mitigation.confusionMatrices( oneProb0, oneProb1 ) )
+    oneProb = mitigation.mitigateOneProbs( oneProb, inverses )
+    results = mitigation.mitigateDistribution( results, inverses )
+'''
+
+import numpy
+
+import distributions
+
+# confusion matrices with determinants smaller than this are not inverted (such as for dead qubits, which always give 0), and the identity is used instead
+minDeterminant = 1e-6
+
+# the largest number of qubits for which a full distribution is mitigated (this needs 2^n numbers)
+maxQubits = 24
+
+
+def confusionMatrices ( oneProb0, oneProb1 ):
+
+    # Input:
+    # * *oneProb0* - List of the probability that each qubit is read out as 1 when all are prepared as 0.
+    # * *oneProb1* - The same for when all are prepared as 1.
+    #
+    # Output:
+    # * *confusion* - Array with confusion[v,i,j] as the probability that qubit v is read out as i when prepared as j.
+
+    oneProb0 = numpy.asarray( oneProb0, dtype=float )
+    oneProb1 = numpy.asarray( oneProb1, dtype=float )
+
+    confusion = numpy.empty( oneProb0.shape + (2,2) )
+    confusion[...,0,0] = 1 - oneProb0
+    confusion[...,1,0] = oneProb0
+    confusion[...,0,1] = 1 - oneProb1
+    confusion[...,1,1] = oneProb1
+
+    return confusion
+
+
+def inverseMatrices ( confusion ):
+
+    # Input:
+    # * *confusion* - Array of confusion matrices, as given by confusionMatrices().
+    #
+    # Output:
+    # * *inverses* - Array of their inverses. Where a matrix cannot be inverted, the identity is used (so that no mitigation is done for that qubit).
+
+    determinant = confusion[...,0,0]*confusion[...,1,1] - confusion[...,0,1]*confusion[...,1,0]
+    invertible = numpy.abs(determinant) > minDeterminant
+    safe = numpy.where( invertible, determinant, 1 )
+
+    inverses = numpy.empty( confusion.shape )
+    inverses[...,0,0] = confusion[...,1,1] / safe
+    inverses[...,1,1] = confusion[...,0,0] / safe
+    inverses[...,0,1] = -confusion[...,0,1] / safe
+    inverses[...,1,0] = -confusion[...,1,0] / safe
+
+    inverses[~invertible] = numpy.eye(2)
+
+    return inverses
+
+
+def mitigateOneProbs ( oneProbs, inverses ):
+
+    # Input:
+    # * *oneProbs* - Array whose last axis has an entry for each qubit (such as a single oneProb, or those for many rounds and samples).
+    # * *inverses* - Array of inverse confusion matrices for each qubit, as given by inverseMatrices().
+    #
+    # Output:
+    # * *mitigated* - Array of the same shape, with mitigated values (restricted to lie between 0 and 1).
+
+    oneProbs = numpy.asarray( oneProbs, dtype=float )
+
+    mitigated = inverses[:,1,0]*(1-oneProbs) + inverses[:,1,1]*oneProbs
+
+    return numpy.clip( mitigated, 0, 1 )
+
+
+def pairMarginals ( oneProbs, sameProbs, q0, q1 ):
+
+    # Input:
+    # * *oneProbs* - Array whose last axis has an entry for each qubit.
+    # * *sameProbs* - Array whose last axis has an entry for each pair.
+    # * *q0*, *q1* - Arrays of the two qubits in each pair.
+    #
+    # Process:
+    # * The probabilities for the four possible outcomes of each pair are found. These are fixed by the oneProb values of the two qubits and the sameProb of the pair.
+    #
+    # Output:
+    # * *marginals* - Array with marginals[...,k,a,b] as the probability that the two qubits of the kth pair are read out as a and b.
+
+    oneProbs = numpy.asarray( oneProbs, dtype=float )
+    sameProbs = numpy.asarray( sameProbs, dtype=float )
+
+    prob0 = oneProbs[...,q0]
+    prob1 = oneProbs[...,q1]
+
+    both = ( prob0 + prob1 + sameProbs - 1 )/2
+
+    marginals = numpy.empty( sameProbs.shape + (2,2) )
+    marginals[...,1,1] = both
+    marginals[...,1,0] = prob0 - both
+    marginals[...,0,1] = prob1 - both
+    marginals[...,0,0] = sameProbs - both
+
+    return marginals
+
+
+def mitigateSameProbs ( oneProbs, sameProbs, inverses, q0, q1 ):
+
+    # Input:
+    # * *oneProbs*, *sameProbs*, *q0*, *q1* - See pairMarginals(). These should be the raw values.
+    # * *inverses* - Array of inverse confusion matrices for each qubit, as given by inverseMatrices().
+    #
+    # Output:
+    # * *mitigated* - Array of the same shape as *sameProbs*, with mitigated values (restricted to lie between 0 and 1).
+
+    marginals = pairMarginals( oneProbs, sameProbs, q0, q1 )
+
+    # apply the tensor product of the inverses for the two qubits of each pair
+    marginals = numpy.einsum( '...kab,kia,kjb->...kij', marginals, inverses[q0], inverses[q1] )
+
+    return numpy.clip( marginals[...,0,0] + marginals[...,1,1], 0, 1 )
+
+
+def nearestDistribution ( quasiProbs ):
+
+    # Input:
+    # * *quasiProbs* - Array of numbers that sum to 1, but may be negative (as can happen after mitigation).
+    #
+    # Output:
+    # * *probs* - The closest probability distribution to *quasiProbs* (in terms of Euclidean distance).
+
+    ordered = numpy.sort( quasiProbs )[::-1]
+    cumulative = numpy.cumsum( ordered ) - 1
+    positions = numpy.arange( 1, len(ordered)+1 )
+    last = numpy.nonzero( ordered - cumulative/positions > 0 )[0][-1]
+    shift = cumulative[last]/(last+1)
+
+    return numpy.maximum( quasiProbs - shift, 0 )
+
+
+def mitigateDistribution ( results, inverses, cutoff=1e-12 ):
+
+    # Input:
+    # * *results* - Distribution of the results for a round (see distributions.py).
+    # * *inverses* - Array of inverse confusion matrices for each qubit, as given by inverseMatrices().
+    # * *cutoff* - Probabilities smaller than this are left out of the output.
+    #
+    # Process:
+    # * The results are made dense, and the inverse for each qubit is applied along the axis for its bit of the codes.
+    #   The result is then made into a probability distribution with nearestDistribution().
+    #
+    # Output:
+    # * *mitigated* - Distribution with mitigated probabilities (and the same number of shots as *results*).
+
+    num = results['num']
+    if num>maxQubits:
+        raise ValueError( "Full distributions can only be mitigated for up to " + str(maxQubits) + " qubits (use mitigateOneProbs and mitigateSameProbs instead)" )
+
+    codes, probs = distributions.getSupport( results )
+    probs = numpy.bincount( numpy.asarray( codes, dtype=numpy.int64 ), weights=probs, minlength=2**num ).astype(float)
+
+    # bit v of the code is the result for qubit v, and so is the middle axis when reshaped like this
+    for v in range(num):
+        probs = probs.reshape( 2**(num-v-1), 2, 2**v )
+        probs = numpy.einsum( 'ij,ajb->aib', inverses[v], probs )
+    probs = nearestDistribution( probs.reshape(-1) )
+
+    kept = numpy.nonzero( probs>cutoff )[0]
+
+    return distributions.makeDistribution( kept, probs[kept], num, shots=results['shots'] )
@@ -0,0 +1,207 @@
+'''
+Optional timing of the different stages of the game.
+
+When enabled, the functions listed in *stages* are replaced (within QuantumAwesomeness) by versions that record the wall and CPU time they take, and how often they are called.
+These are recorded separately for each game and round. When not enabled, the original functions are used, so there is no cost.
+
+    import QuantumAwesomeness as qa
+    import profiling
+    profiling.enable()
+    qa.runGame( 'ibmqx4', 'C', 100, True, maxScore=5 )
+    profiling.disable()
+    profiling.saveReport( 'timing.json' )
+    profiling.saveFolded( 'timing.folded' ) # for use with flamegraph.pl or speedscope
+'''
+
+import time, json, functools
+
+# the functions of QuantumAwesomeness that are timed
+stages = ['entangle','implementGate','getResults','processResults','getMatching','printPuzzle']
+
+enabled = False
+
+# originals of the functions that have been replaced
+originals = {}
+
+# records[ ( game, round, stage, substage, ... ) ] = [ wall, cpu, calls ]
+# the stage names form a stack, so that time spent in implementGate within entangle is recorded as ( game, round, 'entangle', 'implementGate' )
+records = {}
+
+# games[ game ] = [ wall, cpu, rounds ]
+games = {}
+
+current = {'game':0, 'round':0, 'stack':[]}
+
+
+def reset ( ):
+
+    # Forget everything recorded so far.
+
+    records.clear()
+    games.clear()
+    current['game'] = 0
+    current['round'] = 0
+    current['stack'] = []
+
+
+def timed ( stage, function ):
+
+    # Input:
+    # * *stage* - Name under which the time is recorded.
+    # * *function* - Function to be timed.
+    #
+    # Output:
+    # * *wrapper* - Function that does the same as *function*, but records the time taken.
+
+    @functools.wraps(function)
+    def wrapper ( *args, **kwargs ):
+        current['stack'].append( stage )
+        key = ( current['game'], current['round'] ) + tuple( current['stack'] )
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            return function( *args, **kwargs )
+        finally:
+            record = records.setdefault( key, [0,0,0] )
+            record[0] += time.perf_counter() - wall
+            record[1] += time.process_time() - cpu
+            record[2] += 1
+            current['stack'].pop()
+
+    return wrapper
+
+
+def timedGame ( function ):
+
+    # As timed(), but for runGame. The total time for the game is recorded.
+
+    @functools.wraps(function)
+    def wrapper ( *args, **kwargs ):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            return function( *args, **kwargs )
+        finally:
+            games[ current['game'] ] = [ time.perf_counter() - wall, time.process_time() - cpu, current['round'] ]
+
+    return wrapper
+
+
+def newRound ( score ):
+
+    # Called by runGame() at the start of each round, so that times can be recorded for each round.
+    # The first round is taken to be the start of a new game. This means that games are counted even when runGame() is not the timed version
+    # (which happens when it has been imported with 'from QuantumAwesomeness import *' before enable() is called).
+
+    if score==1:
+        current['game'] += 1
+    current['round'] = score
+
+
+def enable ( ):
+
+    # Replaces the functions listed in *stages* (and runGame) with timed versions.
+
+    global enabled
+
+    if enabled:
+        return
+
+    import QuantumAwesomeness as qa
+
+    for stage in stages:
+        originals[stage] = getattr( qa, stage )
+        setattr( qa, stage, timed( stage, originals[stage] ) )
+    originals['runGame'] = qa.runGame
+    qa.runGame = timedGame( qa.runGame )
+
+    enabled = True
+
+
+def disable ( ):
+
+    # Puts the original functions back.
+
+    global enabled
+
+    if not enabled:
+        return
+
+    import QuantumAwesomeness as qa
+
+    for name in originals:
+        setattr( qa, name, originals[name] )
+    originals.clear()
+
+    enabled = False
+
+
+def report ( ):
+
+    # Output:
+    # * *summary* - Dictionary containing
+    #     - 'stages': total wall time, CPU time and calls for each stage (including time spent in stages called within it).
+    #     - 'rounds': the same for each round of each game (as a list of dictionaries, for easy conversion to JSON).
+    #     - 'games': total wall and CPU time for each game, and the number of rounds.
+
+    summary = {'stages':{}, 'rounds':[], 'games':[]}
+
+    rounds = {}
+    for key, record in records.items():
+        game, score, stack = key[0], key[1], key[2:]
+        stage = stack[-1]
+        # if a stage calls itself (directly or not), only count the outermost call to avoid counting time twice
+        outermost = stage not in stack[:-1]
+        for totals in [ summary['stages'].setdefault( stage, {'wall':0, 'cpu':0, 'calls':0} ),
+                        rounds.setdefault( (game,score), {} ).setdefault( stage, {'wall':0, 'cpu':0, 'calls':0} ) ]:
+            if outermost:
+                totals['wall'] += record[0]
+                totals['cpu'] += record[1]
+            totals['calls'] += record[2]
+
+    for game, score in sorted(rounds.keys()):
+        summary['rounds'].append( {'game':game, 'round':score, 'stages':rounds[game,score]} )
+
+    for game in sorted(games.keys()):
+        wall, cpu, score = games[game]
+        summary['games'].append( {'game':game, 'wall':wall, 'cpu':cpu, 'rounds':score} )
+
+    return summary
+
+
+def saveReport ( filename ):
+
+    # Saves the output of report() as JSON.
+
+    with open( filename, 'w' ) as saveFile:
+        json.dump( report(), saveFile, indent=1, sort_keys=True )
+
+
+def folded ( ):
+
+    # Output:
+    # * *lines* - The records in the 'folded stacks' format used to make flame graphs: the stack as names separated by ';', followed by the time in microseconds.
+    #             The times are those spent in the last stage of the stack only (and not in those it calls), as is expected for this format.
+
+    selfTimes = {}
+    for key, record in records.items():
+        selfTimes[key] = selfTimes.get( key, 0 ) + record[0]
+        parent = key[:-1]
+        if len(parent)>2:
+            selfTimes[parent] = selfTimes.get( parent, 0 ) - record[0]
+
+    lines = []
+    for key in sorted( selfTimes.keys() ):
+        stack = [ 'game ' + str(key[0]), 'round ' + str(key[1]) ] + list( key[2:] )
+        lines.append( ';'.join(stack) + ' ' + str( max( 0, int( round( 1e6*selfTimes[key] ) ) ) ) )
+
+    return lines
+
+
+def saveFolded ( filename ):
+
+    # Saves the output of folded() to file.
+
+    with open( filename, 'w' ) as saveFile:
+        for line in folded():
+            saveFile.write( line+'\n' )
@@ -0,0 +1,358 @@
+'''
+Functions to keep an index of the data stored in the results folder.
+
+The catalog is stored as results/catalog.txt, with one line for each file. Each line is a dictionary describing a file:
+    - 'device', 'fileType', 'move', 'shots' and 'sim' are the details used to create its filename (see resultsLoad() in QuantumAwesomeness.py).
+    - 'folder' is the subfolder of the device folder in which the file lives ('' if none, or something like 'maxScore=5').
+    - 'samples' is the number of lines (and so games) in the file.
+    - 'rounds' is the largest number of rounds played in any of these games.
+    - 'bytes' is the size of the file.
+    - 'checksum' is an md5 hash chained over the lines of the file, so that it can be updated as each line is appended.
+
+The catalog is kept up to date by GetData(), so that anything wanting to know what data exists can look it up without opening (or failing to open) the files themselves.
+If the catalog is lost or out of date, buildCatalog() will make a new one from scratch.
+'''
+
+import os, re, hashlib
+
+catalogFile = 'catalog.txt'
+
+# loaded catalogs are kept here, along with the modification time of the file they were loaded from
+catalogCache = {}
+
+# filenames of results are of the form fileType_move=M_shots=S_sim=B.txt
+filenamePattern = re.compile( r'^([A-Za-z]+)_move=([A-Z]+)_shots=([0-9]+)_sim=(True|False)\.txt$' )
+
+
+def catalogKey ( device, fileType, move, shots, sim, folder='' ):
+
+    # Input:
+    # * *device*, *fileType*, *move*, *shots*, *sim* - Details that specify a results file (see resultsLoad() in QuantumAwesomeness.py).
+    # * *folder* - Subfolder of the device folder in which the file lives ('' if none).
+    #
+    # Output:
+    # * *key* - Tuple used as the key for the file in the catalog.
+
+    return ( device, folder, fileType, move, int(shots), bool(sim) )
+
+
+def countRounds ( fileType, sample ):
+
+    # Input:
+    # * *fileType* - String describing type of file the sample comes from.
+    # * *sample* - A single line of the file, after evaluation.
+    #
+    # Output:
+    # * *rounds* - Number of rounds in the game (gates has two slices for each round, calibration is for the whole game, other files have one entry per round).
+
+    if fileType=='calibration':
+        return 0
+
+    try:
+        rounds = len(sample)
+    except TypeError:
+        return 0
+
+    if fileType=='gates':
+        rounds = int( (rounds+1)/2 )
+
+    return rounds
+
+
+def chainChecksum ( checksum, line ):
+
+    # Returns the checksum of a file after *line* has been appended to a file whose checksum was *checksum*.
+
+    return hashlib.md5( (checksum+line).encode('utf-8') ).hexdigest()
+
+
+def describeFile ( filename ):
+
+    # Input:
+    # * *filename* - Full path of a results file.
+    #
+    # Process:
+    # * The file is read through once to count the samples and rounds, and calculate the checksum.
+    #
+    # Output:
+    # * *entry* - Dictionary with the 'samples', 'rounds', 'bytes' and 'checksum' for the file.
+
+    entry = {'samples':0, 'rounds':0, 'bytes':os.path.getsize(filename), 'checksum':''}
+
+    fileType = os.path.basename(filename).split('_')[0]
+
+    with open(filename) as saveFile:
+        for line in saveFile:
+            if line.strip()=='':
+                continue
+            line = line.rstrip('\n')
+            entry['samples'] += 1
+            entry['checksum'] = chainChecksum( entry['checksum'], line )
+            try:
+                rounds = countRounds( fileType, eval(line) )
+            except Exception:
+                rounds = 0
+            entry['rounds'] = max( entry['rounds'], rounds )
+
+    return entry
+
+
+def buildCatalog ( resultsPath ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    #
+    # Process:
+    # * Every file in the results folder (and subfolders of the device folders) is looked at, and a catalog is made and saved.
+    #
+    # Output:
+    # * *catalog* - Dictionary with keys given by catalogKey() and entries as described at the top of this file.
+
+    catalog = {}
+
+    if os.path.isdir(resultsPath):
+        for device in sorted(os.listdir(resultsPath)):
+
+            devicePath = os.path.join(resultsPath,device)
+            if not os.path.isdir(devicePath):
+                continue
+
+            # the files for the device itself, and those in any subfolders
+            for root, dirs, files in os.walk(devicePath):
+                dirs.sort()
+                folder = os.path.relpath(root,devicePath)
+                if folder=='.':
+                    folder = ''
+                for filename in sorted(files):
+                    match = filenamePattern.match(filename)
+                    if match:
+                        fileType, move, shots, sim = match.groups()
+                        key = catalogKey( device, fileType, move, shots, sim=='True', folder=folder )
+                        entry = describeFile( os.path.join(root,filename) )
+                        catalog[key] = makeEntry( key, entry )
+
+    saveCatalog( resultsPath, catalog )
+
+    return catalog
+
+
+def makeEntry ( key, entry ):
+
+    # Combines a catalog key and the description of the file (from describeFile) into a full catalog entry.
+
+    device, folder, fileType, move, shots, sim = key
+
+    fullEntry = {'device':device, 'folder':folder, 'fileType':fileType, 'move':move, 'shots':shots, 'sim':sim}
+    for quantity in ['samples','rounds','bytes','checksum']:
+        fullEntry[quantity] = entry[quantity]
+
+    return fullEntry
+
+
+def saveCatalog ( resultsPath, catalog ):
+
+    # Writes the catalog to file (first to a temporary file, which then replaces the old one, so that the catalog file is never left half written).
+
+    if not os.path.isdir(resultsPath):
+        os.makedirs(resultsPath)
+
+    filename = os.path.join(resultsPath,catalogFile)
+
+    with open(filename+'.tmp','w') as saveFile:
+        for key in sorted(catalog.keys()):
+            saveFile.write( str(catalog[key])+'\n' )
+    os.replace( filename+'.tmp', filename )
+
+    catalogCache[resultsPath] = ( os.path.getmtime(filename), catalog )
+
+
+def loadCatalog ( resultsPath ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    #
+    # Process:
+    # * The catalog is loaded from file, unless an up to date version has already been loaded. If there is no catalog file, one is made.
+    #
+    # Output:
+    # * *catalog* - See buildCatalog().
+
+    filename = os.path.join(resultsPath,catalogFile)
+
+    if not os.path.exists(filename):
+        return buildCatalog( resultsPath )
+
+    mtime = os.path.getmtime(filename)
+    if resultsPath in catalogCache and catalogCache[resultsPath][0]==mtime:
+        return catalogCache[resultsPath][1]
+
+    catalog = {}
+    with open(filename) as saveFile:
+        for line in saveFile:
+            if line.strip():
+                entry = eval(line)
+                key = catalogKey( entry['device'], entry['fileType'], entry['move'], entry['shots'], entry['sim'], folder=entry['folder'] )
+                catalog[key] = entry
+
+    catalogCache[resultsPath] = ( mtime, catalog )
+
+    return catalog
+
+
+def updateCatalog ( resultsPath, device, fileType, move, shots, sim, line, folder='' ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    # * *device*, *fileType*, *move*, *shots*, *sim*, *folder* - Details that specify the results file (see catalogKey()).
+    # * *line* - String that has just been appended to the file (without the newline).
+    #
+    # Process:
+    # * The catalog entry for the file is updated to account for the new line, without needing to read the rest of the file (see extendCatalog()).
+    #
+    # Output:
+    # * *entry* - The updated catalog entry for the file.
+
+    return extendCatalog( resultsPath, device, fileType, move, shots, sim, [line], folder=folder )
+
+
+def extendCatalog ( resultsPath, device, fileType, move, shots, sim, lines, folder='' ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    # * *device*, *fileType*, *move*, *shots*, *sim*, *folder* - Details that specify the results file (see catalogKey()).
+    # * *lines* - List of strings that have just been appended to the file (without the newlines).
+    #
+    # Process:
+    # * The catalog entry for the file is updated to account for the new lines, without needing to read the rest of the file, and the catalog is saved once.
+    # * If there is no catalog yet, one is built from scratch (which will already include the new lines).
+    #
+    # Output:
+    # * *entry* - The updated catalog entry for the file.
+
+    key = catalogKey( device, fileType, move, shots, sim, folder=folder )
+
+    if not os.path.exists( os.path.join(resultsPath,catalogFile) ):
+        return buildCatalog( resultsPath ).get(key)
+
+    catalog = loadCatalog( resultsPath )
+
+    if key in catalog:
+        entry = catalog[key]
+    else:
+        entry = makeEntry( key, {'samples':0, 'rounds':0, 'bytes':0, 'checksum':''} )
+
+    for line in lines:
+        entry['samples'] += 1
+        entry['checksum'] = chainChecksum( entry['checksum'], line )
+        try:
+            entry['rounds'] = max( entry['rounds'], countRounds( fileType, eval(line) ) )
+        except Exception:
+            pass
+    filename = os.path.join( resultsPath, device, folder, fileType+'_move='+move+'_shots='+str(shots)+'_sim='+str(sim)+'.txt' )
+    if os.path.exists(filename):
+        entry['bytes'] = os.path.getsize(filename)
+    else:
+        entry['bytes'] += sum( [ len(line)+1 for line in lines ] )
+
+    catalog[key] = entry
+    saveCatalog( resultsPath, catalog )
+
+    return entry
+
+
+def catalogEntry ( resultsPath, device, fileType, move, shots, sim, folder='' ):
+
+    # Returns the catalog entry for the given file, or None if the file is not in the catalog.
+
+    return loadCatalog( resultsPath ).get( catalogKey( device, fileType, move, shots, sim, folder=folder ) )
+
+
+def dataAvailable ( resultsPath, device, move, shots, sim, fileTypes=['oneProbs','sameProbs','gates'], folder='' ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify a set of results (see catalogKey()).
+    # * *fileTypes* - List of the types of file that are required.
+    #
+    # Output:
+    # * *available* - Boolean denoting whether all the required files exist, with at least one sample in each.
+
+    catalog = loadCatalog( resultsPath )
+    for fileType in fileTypes:
+        entry = catalog.get( catalogKey( device, fileType, move, shots, sim, folder=folder ) )
+        if entry is None or entry['samples']==0:
+            return False
+
+    return True
+
+
+def refreshCatalog ( resultsPath, device, folder='' ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    # * *device*, *folder* - Specify the folder whose files should be looked at again.
+    #
+    # Process:
+    # * The entries for all files in the given folder are remade by reading the files. This is useful when files have been written by something other than GetData(), or by many processes at once.
+    #
+    # Output:
+    # * *catalog* - The updated catalog.
+
+    catalog = dict( loadCatalog( resultsPath ) )
+
+    for key in list(catalog.keys()):
+        if key[0]==device and key[1]==folder:
+            del catalog[key]
+
+    folderPath = os.path.join(resultsPath,device,folder)
+    if os.path.isdir(folderPath):
+        for filename in sorted(os.listdir(folderPath)):
+            match = filenamePattern.match(filename)
+            if match:
+                fileType, move, shots, sim = match.groups()
+                key = catalogKey( device, fileType, move, shots, sim=='True', folder=folder )
+                catalog[key] = makeEntry( key, describeFile( os.path.join(folderPath,filename) ) )
+
+    saveCatalog( resultsPath, catalog )
+
+    return catalog
+
+
+def removeFromCatalog ( resultsPath, device, fileType, move, shots, sim, folder='' ):
+
+    # Removes the entry for the given file from the catalog (for use when a file is to be replaced rather than appended to).
+
+    catalog = loadCatalog( resultsPath )
+
+    key = catalogKey( device, fileType, move, shots, sim, folder=folder )
+    if key in catalog:
+        del catalog[key]
+        saveCatalog( resultsPath, catalog )
+
+
+def replaceEntries ( resultsPath, device, move, shots, sim, entries, folder='' ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify a set of results (see catalogKey()).
+    # * *entries* - Dictionary with file types as keys, and descriptions of the files (with 'samples', 'rounds', 'bytes' and 'checksum', as given by describeFile()) as values.
+    #
+    # Process:
+    # * The entries for all files of the results are replaced by those given. This is for files that are written all at once, so that their descriptions are already known without reading them again.
+    #
+    # Output:
+    # * *catalog* - The updated catalog.
+
+    catalog = dict( loadCatalog( resultsPath ) )
+
+    for key in list(catalog.keys()):
+        if key[0:2]==(device,folder) and key[3:]==( move, int(shots), bool(sim) ):
+            del catalog[key]
+
+    for fileType in entries:
+        key = catalogKey( device, fileType, move, shots, sim, folder=folder )
+        catalog[key] = makeEntry( key, entries[fileType] )
+
+    saveCatalog( resultsPath, catalog )
+
+    return catalog
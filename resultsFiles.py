@@ -0,0 +1,603 @@
+'''
+Functions to write to the results folder safely, even when many processes (or notebooks) are collecting data at once.
+
+Each game is saved as one line in each of several files (oneProbs, sameProbs, gates, etc), and these must stay aligned: line j of each must be for the same game.
+To make sure of this, appendSample() writes all the lines for a game as a single step:
+    - A lock is held on the results folder (using fcntl, where available), so that only one process writes at a time.
+    - Before anything is written, the lines and the current sizes of the files are saved to a journal. If the process dies part way through,
+      the next process to write will find the journal, cut the files back to their old sizes and write the lines again (see recoverJournal() ).
+    - The catalog (see resultsCatalog.py) is updated while the lock is held.
+    - A game can only be added if it has a line for every type of file already saved for those results, and no others (so that runs with different options can't be mixed).
+
+Alternatively, each writer can save to its own 'shard': a subfolder of the device folder such as 'shards/worker3'.
+These can be merged into the main files afterwards with mergeShards(), which first checks that the files of each shard are aligned (see validateAlignment() ).
+
+The raw results of each round are saved as bit strings in the results file only if they are small enough (see storeResults() ).
+Otherwise only the most likely outcomes are put in the results file, and the full results are saved in a compressed 'spill' file in the device folder.
+
+    import resultsFiles
+    resultsFiles.appendSample( resultsPath, 'ibmqx4', 'C', 8192, False, {'oneProbs':oneProbs, 'sameProbs':sameProbs, 'gates':gates} )
+    resultsFiles.mergeShards( resultsPath, 'ibmqx4' )
+'''
+
+import os, contextlib, hashlib, io
+
+import numpy
+
+import resultsCatalog as catalog
+import distributions
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # not available on Windows, where no locking is done
+
+lockFile = '.lock'
+journalFile = '.journal'
+
+# the numbers of games that have been handed out by reserveSample() are kept here (see GetData() in QuantumAwesomeness.py)
+reservationsFile = 'reservations.txt'
+
+# the order in which files are written, and then checked for alignment (files not listed here come after these, in alphabetical order)
+fileTypeOrder = ['oneProbs','sameProbs','gates','conjugates','seeds','results','calibration','oneProbsMitigated','sameProbsMitigated','resultsMitigated','correlations']
+
+# files with an entry for each round (gates has two for each round, and the rest have one for the whole game)
+roundFileTypes = ['oneProbs','sameProbs','conjugates','oneProbsMitigated','sameProbsMitigated','correlations']
+
+# the largest number of characters that the results of a round can take up in a results file (see storeResults)
+resultsBudget = 10000
+
+# characters taken up in a results file by each outcome, in addition to its bit string (for the probability, quotes, colon, comma and spaces)
+outcomeCharacters = 28
+
+# subfolder of each device folder in which the full results are saved, when they are too big for the results file
+spillFolder = 'spill'
+
+# subfolder of each shard in which games are kept once they have been merged (when they are not removed, see mergeShards)
+mergedFolder = 'merged'
+
+
+def getFilename ( resultsPath, device, fileType, move, shots, sim, folder='' ):
+
+    # Returns the full path of the results file with the given details (see resultsLoad() in QuantumAwesomeness.py).
+
+    return os.path.join( resultsPath, device, folder, fileType+'_move='+move+'_shots='+str(shots)+'_sim='+str(sim)+'.txt' )
+
+
+@contextlib.contextmanager
+def lockResults ( resultsPath ):
+
+    # Holds a lock on the results folder for as long as the 'with' block lasts. Any journal left by a process that died while writing is dealt with first.
+
+    if not os.path.isdir(resultsPath):
+        os.makedirs(resultsPath)
+
+    with open( os.path.join(resultsPath,lockFile), 'a' ) as lock:
+        if fcntl is not None:
+            fcntl.flock( lock.fileno(), fcntl.LOCK_EX )
+        try:
+            recoverJournal( resultsPath )
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock( lock.fileno(), fcntl.LOCK_UN )
+
+
+@contextlib.contextmanager
+def claimFile ( filename ):
+
+    # Holds a lock on *filename* (using a separate '.lock' file) for as long as the 'with' block lasts, so that only one process at a time can use it.
+    # Rather than waiting, a ValueError is raised if another process already holds the lock.
+
+    if not os.path.isdir( os.path.dirname(filename) ):
+        os.makedirs( os.path.dirname(filename) )
+
+    with open( filename+'.lock', 'a' ) as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock( lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB )
+            except BlockingIOError:
+                raise ValueError( "Another process is already using " + filename )
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock( lock.fileno(), fcntl.LOCK_UN )
+
+
+def writeJournal ( resultsPath, journal ):
+
+    # Saves the journal (first to a temporary file, which then replaces the old one, so that it is never left half written).
+
+    filename = os.path.join(resultsPath,journalFile)
+    with open( filename+'.tmp', 'w' ) as saveFile:
+        saveFile.write( str(journal)+'\n' )
+        saveFile.flush()
+        os.fsync( saveFile.fileno() )
+    os.replace( filename+'.tmp', filename )
+
+
+def applyJournal ( journal ):
+
+    # Writes the lines listed in the journal, after cutting each file back to the size it had before (so that applying a journal twice does no harm).
+    # Then any files listed in 'replace' are replaced by their new versions (which were written before the journal), or removed if there is no new version.
+
+    for filename, size, line in journal['lines']:
+        with open( filename, 'a' ) as saveFile:
+            saveFile.truncate( size )
+            saveFile.write( line+'\n' )
+            saveFile.flush()
+            os.fsync( saveFile.fileno() )
+
+    for newFilename, filename in journal.get( 'replace', [] ):
+        if newFilename is None:
+            if os.path.exists( filename ):
+                os.remove( filename )
+        elif os.path.exists( newFilename ):
+            os.replace( newFilename, filename )
+
+
+def recoverJournal ( resultsPath ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    #
+    # Process:
+    # * If a journal exists, the writing of a sample (or a merge) was started but not known to be finished. It is written again, and the catalog entries for the folders it wrote to are remade from the files themselves.
+    #
+    # Output:
+    # * *recovered* - Boolean denoting whether there was a journal to recover.
+
+    filename = os.path.join(resultsPath,journalFile)
+    if not os.path.exists(filename):
+        return False
+
+    with open(filename) as saveFile:
+        journal = eval( saveFile.read() )
+
+    applyJournal( journal )
+    for folder in journal.get( 'folders', [ journal['folder'] ] ):
+        catalog.refreshCatalog( resultsPath, journal['device'], folder=folder )
+    os.remove( filename )
+
+    return True
+
+
+def orderFileTypes ( fileTypes ):
+
+    # Sorts the given file types into the order given by fileTypeOrder.
+
+    return [ fileType for fileType in fileTypeOrder if fileType in fileTypes ] + sorted( [ fileType for fileType in fileTypes if fileType not in fileTypeOrder ] )
+
+
+def appendSample ( resultsPath, device, move, shots, sim, data, folder='' ):
+
+    # Input:
+    # * *resultsPath* - Path of the results folder.
+    # * *device*, *move*, *shots*, *sim*, *folder* - Details that specify the results files (see resultsLoad() in QuantumAwesomeness.py).
+    # * *data* - Dictionary with file types as keys, and what is to be saved for the game in each file as values.
+    #
+    # Process:
+    # * A line is appended to each file, and the catalog is updated. This is done while holding a lock and using a journal, so that either all the files get the line or none do.
+    # * If files already exist for these results, the game must be saved to exactly the same types of file (or the files would no longer be aligned), and a ValueError is raised if not.
+    #
+    # Output:
+    # * *lines* - Dictionary with file types as keys and the lines that were written as values.
+
+    folderPath = os.path.join( resultsPath, device, folder )
+    if not os.path.isdir(folderPath):
+        os.makedirs(folderPath)
+
+    lines = {}
+    for fileType in data:
+        lines[fileType] = str(data[fileType])
+
+    with lockResults( resultsPath ):
+
+        existing = getFileTypes( resultsPath, device, move, shots, sim, folder=folder )
+        if existing and set(existing)!=set(lines.keys()):
+            raise ValueError( "A game with files " + str( orderFileTypes( lines.keys() ) ) + " cannot be added to results with files " + str(existing) + " (for device=" + device + ", move=" + move + ", shots=" + str(shots) + ", sim=" + str(sim) + ")" )
+
+        journal = {'device':device, 'folder':folder, 'lines':[]}
+        for fileType in orderFileTypes( lines.keys() ):
+            filename = getFilename( resultsPath, device, fileType, move, shots, sim, folder=folder )
+            size = os.path.getsize(filename) if os.path.exists(filename) else 0
+            journal['lines'].append( [ filename, size, lines[fileType] ] )
+
+        # the catalog is made (if there isn't one) before anything is written, so that the new lines are only counted once
+        catalog.loadCatalog( resultsPath )
+        writeJournal( resultsPath, journal )
+        applyJournal( journal )
+        for fileType in orderFileTypes( lines.keys() ):
+            catalog.updateCatalog( resultsPath, device, fileType, move, shots, sim, lines[fileType], folder=folder )
+        os.remove( os.path.join(resultsPath,journalFile) )
+
+    return lines
+
+
+def removeResults ( resultsPath, device, move, shots, sim, folder='' ):
+
+    # Removes all the files (and their catalog entries) for the given set of results, while holding the lock. This is for when data is to be remade rather than added to.
+
+    with lockResults( resultsPath ):
+        for fileType in getFileTypes( resultsPath, device, move, shots, sim, folder=folder ):
+            os.remove( getFilename( resultsPath, device, fileType, move, shots, sim, folder=folder ) )
+            catalog.removeFromCatalog( resultsPath, device, fileType, move, shots, sim, folder=folder )
+        clearReservations( resultsPath, device, move, shots, sim, folder=folder )
+
+
+def replaceResults ( resultsPath, device, move, shots, sim, entries, folder='' ):
+
+    # Input:
+    # * *resultsPath*, *device*, *move*, *shots*, *sim*, *folder* - Specify a set of results (see getFilename()).
+    # * *entries* - Dictionary with the types of the new files as keys, and their descriptions for the catalog as values (see resultsCatalog.replaceEntries()).
+    #               The new files must already have been written, with '.tmp' on the end of their filenames.
+    #
+    # Process:
+    # * This is for results that are remade all at once (such as by SyntheticData() and DownsampleData() in QuantumAwesomeness.py), rather than a game at a time.
+    #   While holding the lock, the new files replace the old ones, any other files for the results are removed (since they would no longer line up with the new games) and the catalog is updated.
+    #   So other processes see either all of the old results or all of the new ones.
+
+    with lockResults( resultsPath ):
+        for fileType in getFileTypes( resultsPath, device, move, shots, sim, folder=folder ):
+            if fileType not in entries:
+                os.remove( getFilename( resultsPath, device, fileType, move, shots, sim, folder=folder ) )
+        for fileType in entries:
+            filename = getFilename( resultsPath, device, fileType, move, shots, sim, folder=folder )
+            os.replace( filename+'.tmp', filename )
+        catalog.replaceEntries( resultsPath, device, move, shots, sim, entries, folder=folder )
+        clearReservations( resultsPath, device, move, shots, sim, folder=folder )
+
+
+def clearReservations ( resultsPath, device, move, shots, sim, folder='' ):
+
+    # Forgets the games reserved for the given results (see reserveSample() ), so that they are numbered from 0 again when the results are remade. This should be called while holding the lock.
+
+    reservations = loadReservations( resultsPath )
+    key = catalog.catalogKey( device, '', move, shots, sim, folder=folder )
+    if key in reservations:
+        del reservations[key]
+        saveReservations( resultsPath, reservations )
+
+
+def loadReservations ( resultsPath ):
+
+    # Returns a dictionary with the number of games reserved so far for each set of results (with keys given by resultsCatalog.catalogKey() with no file type).
+
+    filename = os.path.join( resultsPath, reservationsFile )
+    if not os.path.exists(filename):
+        return {}
+
+    with open(filename) as saveFile:
+        return eval( saveFile.read() )
+
+
+def saveReservations ( resultsPath, reservations ):
+
+    # Writes the reservations (first to a temporary file, which then replaces the old one, so that it is never left half written).
+
+    filename = os.path.join( resultsPath, reservationsFile )
+    with open( filename+'.tmp', 'w' ) as saveFile:
+        saveFile.write( str(reservations)+'\n' )
+    os.replace( filename+'.tmp', filename )
+
+
+def reserveSample ( resultsPath, device, move, shots, sim, folder='' ):
+
+    # Input:
+    # * *resultsPath*, *device*, *move*, *shots*, *sim*, *folder* - Specify a set of results (see getFilename()).
+    #
+    # Process:
+    # * While holding the lock, the next number is taken from those not yet handed out for the results. This starts from the number of games already saved, so that a single writer numbers its games by where they are saved.
+    #   Since the number is handed out before the game is played, many processes writing to the same results never get the same number.
+    #
+    # Output:
+    # * *sample* - Number reserved for the game.
+
+    with lockResults( resultsPath ):
+        reservations = loadReservations( resultsPath )
+        key = catalog.catalogKey( device, '', move, shots, sim, folder=folder )
+        entry = catalog.catalogEntry( resultsPath, device, 'oneProbs', move, shots, sim, folder=folder )
+        sample = max( reservations.get( key, 0 ), 0 if entry is None else entry['samples'] )
+        reservations[key] = sample + 1
+        saveReservations( resultsPath, reservations )
+
+    return sample
+
+
+def countGameRounds ( fileType, sample ):
+
+    # Returns the number of rounds in a game, as seen from a line of the given file type (or None if the file type doesn't say).
+
+    if fileType=='gates':
+        return int( (len(sample)+1)/2 )
+    elif fileType in roundFileTypes:
+        return len(sample)
+    else:
+        return None
+
+
+def getFileTypes ( resultsPath, device, move, shots, sim, folder='' ):
+
+    # Returns a list of the types of file that exist for the given set of results (in the order of orderFileTypes() ).
+
+    folderPath = os.path.join( resultsPath, device, folder )
+
+    fileTypes = []
+    if os.path.isdir(folderPath):
+        for filename in os.listdir(folderPath):
+            match = catalog.filenamePattern.match(filename)
+            if match and list( match.groups()[1:] )==[ move, str(shots), str(sim) ]:
+                fileTypes.append( match.groups()[0] )
+
+    return orderFileTypes( fileTypes )
+
+
+def validateAlignment ( resultsPath, device, move, shots, sim, folder='' ):
+
+    # Input:
+    # * *resultsPath*, *device*, *move*, *shots*, *sim*, *folder* - Details that specify a set of results files.
+    #
+    # Process:
+    # * The files are read line by line, and each line is checked to be complete (it must evaluate). The number of rounds given by each file is checked to agree for each game.
+    #
+    # Output:
+    # * *samples* - Dictionary with file types as keys, and lists of the (evaluated) lines as values. These only include games that are complete and consistent in all files.
+    # * *problems* - List of strings describing anything that was wrong.
+
+    samples = {}
+    problems = []
+    for fileType in getFileTypes( resultsPath, device, move, shots, sim, folder=folder ):
+        samples[fileType] = []
+        with open( getFilename( resultsPath, device, fileType, move, shots, sim, folder=folder ) ) as saveFile:
+            for j, line in enumerate(saveFile):
+                try:
+                    if not line.endswith('\n'):
+                        raise SyntaxError('no newline')
+                    samples[fileType].append( eval(line) )
+                except Exception:
+                    problems.append( fileType + ': line ' + str(j+1) + ' is incomplete or corrupted' )
+                    break
+
+    # only games that made it into every file are kept
+    if samples:
+        lengths = [ len(lines) for lines in samples.values() ]
+        games = min( lengths )
+        if max( lengths )!=games:
+            problems.append( 'files have different numbers of games: ' + str( { fileType: len(lines) for fileType, lines in samples.items() } ) )
+
+        for j in range(games):
+            rounds = set()
+            for fileType in samples:
+                gameRounds = countGameRounds( fileType, samples[fileType][j] )
+                if gameRounds is not None:
+                    rounds.add( gameRounds )
+            if len(rounds)>1:
+                problems.append( 'game ' + str(j+1) + ' has different numbers of rounds in different files' )
+                games = j
+                break
+
+        for fileType in samples:
+            samples[fileType] = samples[fileType][0:games]
+
+    return samples, problems
+
+
+def mergeShards ( resultsPath, device, shardFolder='shards', folder='', remove=True ):
+
+    # Input:
+    # * *resultsPath*, *device* - Specify the device folder.
+    # * *shardFolder* - Subfolder of the device folder that contains a folder for each shard.
+    # * *folder* - Subfolder of the device folder for the merged files ('' for the main files).
+    # * *remove* - Boolean determining whether games are removed from the shard once they have been merged. If not, they are moved to the subfolder given by mergedFolder of the shard.
+    #
+    # Process:
+    # * For each set of results in each shard, the files are checked with validateAlignment(). The games that are complete and consistent are appended to the merged files.
+    #   Incomplete games at the end of shard files (such as from a writer that was killed) are left out, and reported.
+    # * The merged games are taken out of the shard files, so that merging again adds nothing. Anything that was left out stays in the shard files, so that nothing is lost that could be fixed by hand.
+    #   Shard files with nothing left in them are removed.
+    # * For each set of results, all of this is done while holding the lock, in a single step with a journal (see appendSample() ). The new versions of the shard files are written first,
+    #   and the journal lists both the lines appended to the merged files and the shard files they replace. So a merge that dies part way through is finished by recoverJournal(), and games can't end up in both places.
+    #
+    # Output:
+    # * *report* - List of [ shard, move, shots, sim, games merged, problems ] for each set of results.
+
+    report = []
+
+    shardsPath = os.path.join( resultsPath, device, shardFolder )
+    if not os.path.isdir(shardsPath):
+        return report
+
+    for shard in sorted( os.listdir(shardsPath) ):
+
+        shardPath = os.path.join( shardsPath, shard )
+        if not os.path.isdir(shardPath):
+            continue
+
+        specs = set()
+        for filename in os.listdir(shardPath):
+            match = catalog.filenamePattern.match(filename)
+            if match:
+                fileType, move, shots, sim = match.groups()
+                specs.add( ( move, int(shots), sim=='True' ) )
+
+        for move, shots, sim in sorted(specs):
+
+            shardSubfolder = os.path.join( shardFolder, shard )
+            keptSubfolder = os.path.join( shardSubfolder, mergedFolder )
+
+            with lockResults( resultsPath ):
+
+                samples, problems = validateAlignment( resultsPath, device, move, shots, sim, folder=shardSubfolder )
+                # the files may have gone since they were listed (such as when taking the lock finished an earlier merge)
+                if not samples:
+                    continue
+
+                # the shard must have the same types of file as the files it is merged into, or they would no longer be aligned
+                existing = getFileTypes( resultsPath, device, move, shots, sim, folder=folder )
+                games = min( [ len(lines) for lines in samples.values() ] )
+                if existing and set(existing)!=set(samples.keys()):
+                    problems.append( 'shard has files ' + str( orderFileTypes( samples.keys() ) ) + ' but the merged files are ' + str(existing) )
+                    games = 0
+
+                report.append( [ shard, move, shots, sim, games, problems ] )
+
+                # nothing is changed if there are problems and no games to merge
+                if problems and not games:
+                    continue
+
+                journal = {'device':device, 'folder':folder, 'folders':[folder,shardSubfolder], 'lines':[], 'replace':[]}
+                merged = {}
+                for fileType in orderFileTypes( samples.keys() ):
+
+                    # the lines are used as they are in the shard (validateAlignment has checked that the first *games* are complete)
+                    shardFilename = getFilename( resultsPath, device, fileType, move, shots, sim, folder=shardSubfolder )
+                    with open( shardFilename ) as saveFile:
+                        lines = saveFile.readlines()
+                    merged[fileType] = [ line.rstrip('\n') for line in lines[0:games] ]
+
+                    if games:
+                        targets = [ getFilename( resultsPath, device, fileType, move, shots, sim, folder=folder ) ]
+                        if not remove:
+                            targets.append( getFilename( resultsPath, device, fileType, move, shots, sim, folder=keptSubfolder ) )
+                        for filename in targets:
+                            if not os.path.isdir( os.path.dirname(filename) ):
+                                os.makedirs( os.path.dirname(filename) )
+                            size = os.path.getsize(filename) if os.path.exists(filename) else 0
+                            journal['lines'].append( [ filename, size, '\n'.join( merged[fileType] ) ] )
+
+                    # what is left of the shard file is written now, but only replaces it when the journal is applied
+                    if len(lines)>games:
+                        with open( shardFilename+'.tmp', 'w' ) as saveFile:
+                            saveFile.writelines( lines[games:] )
+                        journal['replace'].append( [ shardFilename+'.tmp', shardFilename ] )
+                    else:
+                        journal['replace'].append( [ None, shardFilename ] )
+
+                if games and not remove:
+                    journal['folders'].append( keptSubfolder )
+
+                catalog.loadCatalog( resultsPath )
+                writeJournal( resultsPath, journal )
+                applyJournal( journal )
+                for fileType in merged:
+                    if games:
+                        catalog.extendCatalog( resultsPath, device, fileType, move, shots, sim, merged[fileType], folder=folder )
+                        if not remove:
+                            catalog.extendCatalog( resultsPath, device, fileType, move, shots, sim, merged[fileType], folder=keptSubfolder )
+                catalog.refreshCatalog( resultsPath, device, folder=shardSubfolder )
+                os.remove( os.path.join(resultsPath,journalFile) )
+
+        if remove and not os.listdir(shardPath):
+            os.rmdir(shardPath)
+
+    return report
+
+
+def spillResults ( resultsPath, device, results ):
+
+    # Input:
+    # * *resultsPath*, *device* - Specify the device folder.
+    # * *results* - Distribution to be saved (see distributions.py).
+    #
+    # Process:
+    # * The outcomes (packed into bytes) and their probabilities are saved in a compressed numpy file in the spill folder. The name of the file is a hash of its contents,
+    #   so saving the same results twice (such as for a checkpoint, and then for the finished game) makes only one file, and files from different processes never clash.
+    #
+    # Output:
+    # * *name* - Name of the file in the spill folder.
+
+    codes, probs = distributions.getSupport( results )
+    packed = numpy.packbits( distributions.getBits( codes, results['num'] ), axis=1 )
+    shots = -1 if results['shots'] is None else results['shots']
+
+    name = hashlib.md5( str( [ results['num'], shots ] ).encode('utf-8') + packed.tobytes() + probs.tobytes() ).hexdigest() + '.npz'
+
+    folderPath = os.path.join( resultsPath, device, spillFolder )
+    if not os.path.isdir(folderPath):
+        os.makedirs(folderPath)
+
+    filename = os.path.join( folderPath, name )
+    if not os.path.exists(filename):
+        # written to a temporary file first, so that the file is never left half written
+        with open( filename+'.tmp', 'wb' ) as saveFile:
+            numpy.savez_compressed( saveFile, num=results['num'], shots=shots, packed=packed, probs=probs )
+        os.replace( filename+'.tmp', filename )
+
+    return name
+
+
+def loadSpill ( resultsPath, device, name ):
+
+    # Returns the distribution saved by spillResults() with the given name (or None if the file does not exist).
+
+    filename = os.path.join( resultsPath, device, spillFolder, name )
+    if not os.path.exists(filename):
+        return None
+
+    with open( filename, 'rb' ) as saveFile:
+        saved = numpy.load( io.BytesIO( saveFile.read() ) )
+        num = int( saved['num'] )
+        shots = int( saved['shots'] )
+        bits = numpy.unpackbits( saved['packed'], axis=1 )[:,0:num]
+        probs = saved['probs']
+
+    return distributions.makeDistribution( distributions.getCodes( bits ), probs, num, shots=( None if shots<0 else shots ) )
+
+
+def storeResults ( resultsPath, device, results, budget=resultsBudget ):
+
+    # Input:
+    # * *resultsPath*, *device* - Specify the device folder.
+    # * *results* - Distribution of the results for a round (see distributions.py). Anything else (such as a job id) is stored as it is.
+    # * *budget* - Largest number of characters that the results should take up in the results file.
+    #
+    # Process:
+    # * The size of the results as bit strings is estimated from the number of outcomes, without making the strings.
+    #   If they fit in the budget, they are stored in full. If not, the most likely outcomes that fit are stored,
+    #   along with the total probability of the rest (the 'residual'). The full results are saved with spillResults().
+    #
+    # Output:
+    # * *entry* - What should be saved for the round in the results file: either a dictionary with bit strings as keys and probabilities as values,
+    #             or a dictionary with the most likely outcomes in this form as 'outcomes', along with the 'residual' and the name of the 'spill' file.
+
+    if not distributions.isDistribution( results ):
+        return results
+
+    codes, probs = distributions.getSupport( results )
+    perOutcome = results['num'] + outcomeCharacters
+
+    if len(codes)*perOutcome<=budget:
+        return distributions.toStrings( results )
+
+    # the most likely outcomes, with ties broken by code (so that the same ones are always kept)
+    kept = numpy.argsort( -probs, kind='mergesort' )[ 0:max( budget//perOutcome, 1 ) ]
+    dropped = numpy.ones( len(codes), dtype=bool )
+    dropped[kept] = False
+
+    top = distributions.makeDistribution( codes[kept], probs[kept], results['num'], shots=results['shots'] )
+
+    return { 'outcomes':distributions.toStrings( top ), 'residual':float( probs[dropped].sum() ), 'spill':spillResults( resultsPath, device, results ) }
+
+
+def loadResults ( resultsPath, device, entry, num=None, shots=None ):
+
+    # Input:
+    # * *resultsPath*, *device* - Specify the device folder.
+    # * *entry* - The results for a round, as stored by storeResults().
+    # * *num*, *shots* - The number of qubits and shots (used for entries stored as bit strings).
+    #
+    # Output:
+    # * *results* - The results as a distribution. If the full results were spilled but the spill file is missing, only the most likely outcomes are given.
+    #               Entries that are not results (such as job ids) are given as they are.
+
+    if type(entry) is not dict:
+        return entry
+
+    if 'spill' in entry:
+        results = loadSpill( resultsPath, device, entry['spill'] )
+        if results is None:
+            results = distributions.fromStrings( entry['outcomes'], num, shots=shots )
+        return results
+
+    return distributions.fromStrings( entry, num, shots=shots )
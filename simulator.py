@@ -0,0 +1,107 @@
+'''
+A simple statevector simulator, used to find the ideal output of the circuits of saved games (such as for cross entropy benchmarking, see CalculateXEB() in QuantumAwesomeness.py).
+
+Many circuits on the same number of qubits are simulated at once. The states are held in an array with a row for each circuit, and each gate can have a different angle for each circuit (an angle of 0 does nothing).
+As in distributions.py, the amplitude for the outcome with code x is at position x, and so bit v of the position is for qubit v.
+Gates are applied by reshaping the states so that the bits they act on have their own axes, so no matrices bigger than 2x2 are ever made.
+
+The gates are those used in the game (see implementGate() in QuantumAwesomeness.py), with angles given as fractions of pi:
+    - 'X' and 'Y' rotations of a single qubit by frac*pi, which are exp( -i*X*frac*pi/2 ) and exp( -i*Y*frac*pi/2 ).
+    - 'XX' rotations of a pair, which are exp( -i*XX*frac*pi/2 ). This is what the CX and CZ based circuits of implementGate() do.
+
+    import simulator
+    states = simulator.initialStates( games, num )
+    simulator.rotate( states, num, 0, isX, fracs )
+    simulator.rotatePair( states, num, 0, 1, fracs )
+    probs = simulator.probabilities( states )
+'''
+
+import numpy
+
+# the largest number of qubits that can be simulated (each state needs 2^num complex numbers)
+maxQubits = 24
+
+# the number of amplitudes held at once when many circuits are simulated (which sets how many circuits are simulated together)
+maxAmplitudes = 2**24
+
+
+def batchSize ( num ):
+
+    # Returns the number of circuits on *num* qubits that are simulated together.
+
+    return max( 1, maxAmplitudes//2**num )
+
+
+def initialStates ( batch, num ):
+
+    # Returns an array of *batch* states of *num* qubits, all in the state with every qubit 0.
+
+    if num>maxQubits:
+        raise ValueError( "States can only be simulated for up to " + str(maxQubits) + " qubits" )
+
+    states = numpy.zeros( ( batch, 2**num ), dtype=complex )
+    states[:,0] = 1
+
+    return states
+
+
+def rotate ( states, num, v, isX, fracs ):
+
+    # Input:
+    # * *states* - Array of states, as given by initialStates(). This is changed in place.
+    # * *num* - The number of qubits.
+    # * *v* - The qubit that is rotated.
+    # * *isX* - Boolean array that is True for the states for which an X rotation is done (and False for a Y rotation).
+    # * *fracs* - Array of the fraction of pi for the rotation of each state.
+    #
+    # Output:
+    # * *states* - The rotated states.
+
+    angles = numpy.asarray( fracs, dtype=float )*numpy.pi/2
+    cos = numpy.cos( angles )[:,None,None]
+    sin = numpy.sin( angles )[:,None,None]
+
+    # for X, the off diagonal elements of the matrix are -i*sin, and for Y they are -sin (above) and sin (below)
+    upper = numpy.where( numpy.asarray( isX )[:,None,None], -1j*sin, -sin )
+    lower = numpy.where( numpy.asarray( isX )[:,None,None], -1j*sin, sin )
+
+    reshaped = states.reshape( len(states), 2**(num-v-1), 2, 2**v )
+    zero = reshaped[:,:,0,:].copy()
+    one = reshaped[:,:,1,:]
+    reshaped[:,:,0,:] = cos*zero + upper*one
+    reshaped[:,:,1,:] = lower*zero + cos*one
+
+    return states
+
+
+def rotatePair ( states, num, v0, v1, fracs ):
+
+    # Input:
+    # * *states*, *num* - See rotate().
+    # * *v0*, *v1* - The two (different) qubits of the pair.
+    # * *fracs* - Array of the fraction of pi for the XX rotation of each state.
+    #
+    # Process:
+    # * Since XX flips both bits, exp( -i*XX*theta ) takes each amplitude to cos(theta) times itself minus i*sin(theta) times the amplitude with both bits flipped.
+    #
+    # Output:
+    # * *states* - The rotated states.
+
+    angles = numpy.asarray( fracs, dtype=float )*numpy.pi/2
+    low, high = min(v0,v1), max(v0,v1)
+
+    reshaped = states.reshape( len(states), 2**(num-high-1), 2, 2**(high-low-1), 2, 2**low )
+    flipped = reshaped[:,:,::-1,:,::-1,:].copy()
+
+    shape = (len(states),) + (1,)*5
+    reshaped *= numpy.cos( angles ).reshape( shape )
+    reshaped += -1j*numpy.sin( angles ).reshape( shape )*flipped
+
+    return states
+
+
+def probabilities ( states ):
+
+    # Returns an array with the probability of each outcome for each of the states.
+
+    return numpy.abs( states )**2
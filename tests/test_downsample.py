@@ -0,0 +1,82 @@
+'''
+Tests for the data made with fewer shots by downsampleCounts(), and for its replacement of old data (see resultsFiles.replaceResults() ).
+
+    python -m pytest tests
+'''
+
+import os, sys, shutil, tempfile, unittest
+import numpy
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
+
+import QuantumAwesomeness as qa
+import distributions
+import resultsFiles
+import resultsCatalog as catalog
+
+device = 'testDevice'
+spec = ( 'C', 100, True )
+
+
+def makeResults ( ):
+
+    # Returns a distribution of 1000 shots on 3 qubits, with an outcome that has no shots.
+
+    return distributions.fromCounts( numpy.array([0,1,2,3,5,7]), numpy.array([400,300,200,50,0,50]), 3 )
+
+
+class DownsampleTests ( unittest.TestCase ):
+
+    def test_counts ( self ):
+        generator = numpy.random.RandomState(0)
+        results = makeResults()
+        codes, probs = distributions.getSupport( results )
+        kept = []
+        for run in range(2000):
+            downsampled = qa.downsampleCounts( results, 100, generator )
+            self.assertEqual( downsampled['shots'], 100 )
+            newCodes, newProbs = distributions.getSupport( downsampled )
+            counts = dict( zip( newCodes.tolist(), numpy.rint( newProbs*100 ).astype(int).tolist() ) )
+            kept.append( [ counts.get( code, 0 ) for code in codes.tolist() ] )
+        kept = numpy.array( kept )
+        # no outcome keeps more shots than it had, and each keeps its share on average
+        self.assertTrue( numpy.all( kept <= numpy.rint( probs*1000 ) ) )
+        numpy.testing.assert_allclose( kept.mean(axis=0), probs*100, atol=0.5 )
+
+    def test_allShots ( self ):
+        results = makeResults()
+        downsampled = qa.downsampleCounts( results, 1000, numpy.random.RandomState(0) )
+        numpy.testing.assert_allclose( distributions.getSupport( downsampled )[1], distributions.getSupport( results )[1] )
+
+
+class ReplaceResultsTests ( unittest.TestCase ):
+
+    def setUp ( self ):
+        self.resultsPath = tempfile.mkdtemp()
+
+    def tearDown ( self ):
+        shutil.rmtree( self.resultsPath )
+
+    def test_replaceResults ( self ):
+        for j in range(3):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, { 'oneProbs':[[0.1*j]], 'gates':[{'A':0.1*j}] } )
+
+        # the new data has only one of the old file types
+        filename = resultsFiles.getFilename( self.resultsPath, device, 'oneProbs', *spec )
+        line = str( [[0.5]] )
+        with open( filename+'.tmp', 'w' ) as saveFile:
+            saveFile.write( line+'\n' )
+        entry = { 'samples':1, 'rounds':1, 'bytes':os.path.getsize( filename+'.tmp' ), 'checksum':catalog.chainChecksum( '', line ) }
+        resultsFiles.replaceResults( self.resultsPath, device, *spec, { 'oneProbs':entry } )
+
+        self.assertEqual( resultsFiles.getFileTypes( self.resultsPath, device, *spec ), ['oneProbs'] )
+        with open( filename ) as saveFile:
+            self.assertEqual( saveFile.read(), line+'\n' )
+        self.assertIsNone( catalog.catalogEntry( self.resultsPath, device, 'gates', *spec ) )
+        described = catalog.describeFile( filename )
+        entry = catalog.catalogEntry( self.resultsPath, device, 'oneProbs', *spec )
+        self.assertEqual( [ entry[quantity] for quantity in described ], list( described.values() ) )
+
+
+if __name__=='__main__':
+    unittest.main()
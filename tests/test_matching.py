@@ -0,0 +1,55 @@
+'''
+Tests for the matchings found by getMatching(), and the bots that use it.
+
+    python -m pytest tests
+'''
+
+import os, sys, unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
+
+import QuantumAwesomeness as qa
+
+# the puzzle of web11 game 47, round 8 (for move='C', shots=100, sim=True, counting from 0), for which the mutual information bot used to fail the optimality check of mwmatching
+oneProb = [0.06, 0.06, 0.01, 0.06, 0.23, 0.24, 0.01, 0.01, 0.08, 0.01, 0.01]
+sameProb = {'A': 0.88, 'B': 0.93, 'C': 0.88, 'D': 0.71, 'E': 0.70, 'F': 0.93, 'G': 0.93, 'H': 0.90, 'I': 0.95, 'J': 0.93, 'K': 0.93, 'L': 0.88, 'M': 0.81, 'N': 0.80,
+            'O': 0.93, 'P': 0.93, 'Q': 0.98, 'R': 0.93, 'S': 0.93, 'T': 0.93, 'U': 0.78, 'V': 0.77, 'W': 0.98, 'X': 1.00, 'Y': 0.91, 'Z': 0.98, '[': 0.98, '\\': 0.73,
+            ']': 0.72, '^': 0.95, '_': 0.93, '`': 0.86, 'a': 0.93, 'b': 0.93, 'c': 0.99, 'd': 0.76, 'e': 0.78, 'f': 0.79, 'g': 0.76, 'h': 0.76, 'i': 0.75, 'j': 0.77,
+            'k': 0.78, 'l': 0.75, 'm': 0.77, 'n': 0.98, 'o': 0.91, 'p': 0.98, 'q': 0.98, 'r': 0.91, 's': 0.98, 't': 0.98, 'u': 0.91, 'v': 0.91, 'w': 0.98}
+# the float values saved in the results file, which are slightly off from those above
+sameProb = { p: sameProb[p] + 4e-16 for p in sameProb }
+
+
+def checkMatching ( test, pairs, matching ):
+
+    # Checks that *matching* is a list of positions of pairs (in the order of getPairIndex() ) that don't share qubits.
+
+    index = qa.getPairIndex( pairs )
+    qubits = [ q for k in matching for q in [ index['q0'][k], index['q1'][k] ] ]
+    test.assertEqual( len(qubits), len(set(qubits)) )
+
+
+class MatchingTests ( unittest.TestCase ):
+
+    def test_mutualBotWeb11 ( self ):
+        num, area, entangleType, pairs, pos, example, sdk, runs = qa.getLayout('web11')
+        matching = qa.mutualBot( pairs, oneProb, sameProb, [], None )
+        checkMatching( self, pairs, matching )
+        self.assertEqual( len(matching), num//2 )
+
+    def test_floatWeights ( self ):
+        # weights that differ by far less than 1 should still be matched without errors, with the largest total weight
+        num, area, entangleType, pairs, pos, example, sdk, runs = qa.getLayout('web11')
+        weights = qa.calculateMutual( oneProb, sameProb, pairs )
+        matching = qa.getMatching( pairs, [], weights*1e-3 )
+        checkMatching( self, pairs, matching )
+        self.assertEqual( sorted( matching ), sorted( qa.getMatching( pairs, [], weights ) ) )
+
+    def test_mwpmBot ( self ):
+        num, area, entangleType, pairs, pos, example, sdk, runs = qa.getLayout('web11')
+        matching = qa.mwpmBot( pairs, oneProb, sameProb, [], None )
+        checkMatching( self, pairs, matching )
+
+
+if __name__=='__main__':
+    unittest.main()
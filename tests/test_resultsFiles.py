@@ -0,0 +1,218 @@
+'''
+Tests for the safe writing of results files: the journal, recovery from writers that were killed, shards and merging.
+
+    python -m pytest tests
+'''
+
+import os, sys, shutil, tempfile, multiprocessing, unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ) )
+
+import resultsFiles
+import resultsCatalog as catalog
+
+device = 'testDevice'
+spec = ( 'C', 100, True )
+fileTypes = ['oneProbs','sameProbs','gates']
+
+
+def makeGame ( j ):
+
+    # Returns the data for a game of one round, which is different for each *j*.
+
+    return { 'oneProbs':[[0.1*j,0.2]], 'sameProbs':[{'A':0.5+0.01*j}], 'gates':[{'A':0.01*j}] }
+
+
+def readLines ( resultsPath, fileType, folder='' ):
+
+    # Returns the lines of a results file (or an empty list if there is no file).
+
+    filename = resultsFiles.getFilename( resultsPath, device, fileType, *spec, folder=folder )
+    if not os.path.exists(filename):
+        return []
+    with open(filename) as saveFile:
+        return saveFile.read().splitlines()
+
+
+def killedAppend ( resultsPath, j ):
+
+    # Appends a game, but the process dies after writing only the first file.
+
+    def applyFirst ( journal ):
+        filename, size, line = journal['lines'][0]
+        with open( filename, 'a' ) as saveFile:
+            saveFile.truncate( size )
+            saveFile.write( line+'\n' )
+        os._exit(1)
+    resultsFiles.applyJournal = applyFirst
+    resultsFiles.appendSample( resultsPath, device, *spec, makeGame(j) )
+
+
+def killedMerge ( resultsPath ):
+
+    # Merges shards, but the process dies after the lines are appended to the merged files and before the shard files are replaced.
+
+    def applyLines ( journal ):
+        for filename, size, line in journal['lines']:
+            with open( filename, 'a' ) as saveFile:
+                saveFile.truncate( size )
+                saveFile.write( line+'\n' )
+        os._exit(1)
+    resultsFiles.applyJournal = applyLines
+    resultsFiles.mergeShards( resultsPath, device )
+
+
+def runKilled ( target, *args ):
+
+    # Runs *target* in a new process, and returns its exit code.
+
+    process = multiprocessing.get_context('fork').Process( target=target, args=args )
+    process.start()
+    process.join()
+    return process.exitcode
+
+
+class ResultsFilesTests ( unittest.TestCase ):
+
+    def setUp ( self ):
+        self.resultsPath = tempfile.mkdtemp()
+
+    def tearDown ( self ):
+        shutil.rmtree( self.resultsPath )
+
+    def checkCatalog ( self, folder='' ):
+        # the catalog entries should be the same as those made by reading the files
+        for fileType in fileTypes:
+            entry = catalog.catalogEntry( self.resultsPath, device, fileType, *spec, folder=folder )
+            filename = resultsFiles.getFilename( self.resultsPath, device, fileType, *spec, folder=folder )
+            if os.path.exists(filename):
+                described = catalog.describeFile( filename )
+                self.assertEqual( [ entry[quantity] for quantity in described ], list( described.values() ) )
+            else:
+                self.assertIsNone( entry )
+
+    def test_appendSample ( self ):
+        for j in range(3):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(j) )
+        for fileType in fileTypes:
+            self.assertEqual( readLines( self.resultsPath, fileType ), [ str( makeGame(j)[fileType] ) for j in range(3) ] )
+        self.checkCatalog()
+
+    def test_killedWriter ( self ):
+        resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(0) )
+        self.assertEqual( runKilled( killedAppend, self.resultsPath, 1 ), 1 )
+
+        # the files are out of line until the journal is recovered by the next writer
+        self.assertTrue( os.path.exists( os.path.join( self.resultsPath, resultsFiles.journalFile ) ) )
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs' ) ), 2 )
+        self.assertEqual( len( readLines( self.resultsPath, 'gates' ) ), 1 )
+
+        resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(2) )
+        self.assertFalse( os.path.exists( os.path.join( self.resultsPath, resultsFiles.journalFile ) ) )
+        for fileType in fileTypes:
+            self.assertEqual( readLines( self.resultsPath, fileType ), [ str( makeGame(j)[fileType] ) for j in range(3) ] )
+        self.checkCatalog()
+
+    def test_recoverTwice ( self ):
+        # applying a journal again (as when recovery itself is interrupted) does no harm
+        resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(0) )
+        runKilled( killedAppend, self.resultsPath, 1 )
+        with open( os.path.join( self.resultsPath, resultsFiles.journalFile ) ) as saveFile:
+            journal = eval( saveFile.read() )
+        resultsFiles.applyJournal( journal )
+        resultsFiles.recoverJournal( self.resultsPath )
+        self.assertEqual( [ len( readLines( self.resultsPath, fileType ) ) for fileType in fileTypes ], [2,2,2] )
+        self.checkCatalog()
+
+    def test_mismatchedFileTypes ( self ):
+        resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(0) )
+        game = makeGame(1)
+        game['seeds'] = 1
+        with self.assertRaises( ValueError ):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, game )
+        del game['gates']
+        del game['seeds']
+        with self.assertRaises( ValueError ):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, game )
+        self.assertEqual( [ len( readLines( self.resultsPath, fileType ) ) for fileType in fileTypes ], [1,1,1] )
+        self.assertFalse( os.path.exists( resultsFiles.getFilename( self.resultsPath, device, 'seeds', *spec ) ) )
+
+    def test_merge ( self ):
+        for j in range(3):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(j), folder=os.path.join('shards','a') )
+        for j in range(3,5):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(j), folder=os.path.join('shards','b') )
+
+        report = resultsFiles.mergeShards( self.resultsPath, device )
+        self.assertEqual( [ line[4] for line in report ], [3,2] )
+        self.assertEqual( sorted( readLines( self.resultsPath, 'oneProbs' ) ), sorted( [ str( makeGame(j)['oneProbs'] ) for j in range(5) ] ) )
+        self.assertFalse( os.path.exists( os.path.join( self.resultsPath, device, 'shards', 'a' ) ) )
+        self.checkCatalog()
+
+        # merging again adds nothing
+        self.assertEqual( resultsFiles.mergeShards( self.resultsPath, device ), [] )
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs' ) ), 5 )
+
+    def test_mergeKeep ( self ):
+        shard = os.path.join('shards','a')
+        for j in range(2):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(j), folder=shard )
+        resultsFiles.mergeShards( self.resultsPath, device, remove=False )
+        resultsFiles.mergeShards( self.resultsPath, device, remove=False )
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs' ) ), 2 )
+        self.assertEqual( readLines( self.resultsPath, 'gates', folder=os.path.join(shard,resultsFiles.mergedFolder) ), readLines( self.resultsPath, 'gates' ) )
+        self.assertEqual( readLines( self.resultsPath, 'gates', folder=shard ), [] )
+        self.checkCatalog( folder=os.path.join(shard,resultsFiles.mergedFolder) )
+
+    def test_mergeTornLine ( self ):
+        shard = os.path.join('shards','a')
+        for j in range(3):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(j), folder=shard )
+        # a writer that died without a journal (such as on a system without locking) leaves a torn line
+        with open( resultsFiles.getFilename( self.resultsPath, device, 'gates', *spec, folder=shard ), 'a' ) as saveFile:
+            saveFile.write( "[{'A': 0." )
+        with open( resultsFiles.getFilename( self.resultsPath, device, 'oneProbs', *spec, folder=shard ), 'a' ) as saveFile:
+            saveFile.write( str( makeGame(3)['oneProbs'] )+'\n' )
+
+        report = resultsFiles.mergeShards( self.resultsPath, device )
+        self.assertEqual( report[0][4], 3 )
+        self.assertTrue( report[0][5] )
+        # what could not be merged is kept in the shard, and merging again adds nothing
+        self.assertEqual( readLines( self.resultsPath, 'oneProbs', folder=shard ), [ str( makeGame(3)['oneProbs'] ) ] )
+        self.assertEqual( resultsFiles.mergeShards( self.resultsPath, device )[0][4], 0 )
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs' ) ), 3 )
+        self.checkCatalog()
+        self.checkCatalog( folder=shard )
+
+    def test_mergeMismatchedFileTypes ( self ):
+        resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(0) )
+        shard = os.path.join('shards','a')
+        game = makeGame(1)
+        game['seeds'] = 1
+        resultsFiles.appendSample( self.resultsPath, device, *spec, game, folder=shard )
+
+        report = resultsFiles.mergeShards( self.resultsPath, device )
+        self.assertEqual( report[0][4], 0 )
+        self.assertTrue( report[0][5] )
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs' ) ), 1 )
+        self.assertEqual( len( readLines( self.resultsPath, 'seeds', folder=shard ) ), 1 )
+
+    def test_killedMerge ( self ):
+        shard = os.path.join('shards','a')
+        for j in range(3):
+            resultsFiles.appendSample( self.resultsPath, device, *spec, makeGame(j), folder=shard )
+        self.assertEqual( runKilled( killedMerge, self.resultsPath ), 1 )
+
+        # the games are in both places until the journal is recovered, which finishes the merge
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs' ) ), 3 )
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs', folder=shard ) ), 3 )
+
+        self.assertEqual( resultsFiles.mergeShards( self.resultsPath, device ), [] )
+        self.assertEqual( len( readLines( self.resultsPath, 'oneProbs' ) ), 3 )
+        self.assertEqual( readLines( self.resultsPath, 'oneProbs', folder=shard ), [] )
+        self.checkCatalog()
+        self.checkCatalog( folder=shard )
+
+
+if __name__=='__main__':
+    unittest.main()